@@ -1,34 +1,41 @@
 import copy
 
-class ASTNode:
-    def __init__(self, label, children=None):
-        self.label = label
-        self.children = children or []
-    
-    def __repr__(self):
-        return f"<{self.label}>"
-
-    def print_ast(self, level=0):
-        print('.' * level + self.label)
-        for child in self.children:
-            child.print_ast(level + 1)
+from CSE_Machine.output import OutputWriter
+from CSE_Machine.trace import TraceWriter, format_state
+from CSE_Machine.int_tuple import IntTuple, TUPLE_TYPES, COMPACT_LENGTH, compact, append as append_int
+from flattener.peephole import (Superinstruction, VarConst, VarConstBranch, VarApply, ConstVarApply,
+                                BuiltinApply, fuse_builtin_calls, is_variable)
+from flattener.instructions import Variable, Lambda, Rec, Delay
+from utils.symbols import intern, symbol_name
 
 class Environment:
     def __init__(self, index=0, parent=None):
         self.index = index
-        self.bindings = {}
+        self.bindings = {}  # Symbol id (see utils/symbols.py) -> value
         self.parent = parent
         self.is_removed = False
 
-    def lookup(self, var):
-        if var in self.bindings:
-            return self.bindings[var]
-        elif self.parent:
-            return self.parent.lookup(var)
-        raise NameError(f"Unbound identifier: {var}")
+    def lookup(self, symbol):
+        env = self
+        while env is not None:
+            bindings = env.bindings
+            if symbol in bindings:
+                return bindings[symbol]
+            env = env.parent
+        raise NameError(f"Unbound identifier: {symbol_name(symbol)}")
+
+    def extend(self, symbol, value):
+        self.bindings[symbol] = value
 
-    def extend(self, var, value):
-        self.bindings[var] = value
+    def __getstate__(self):
+        # Symbol ids are per process, so pickles carry the names
+        state = self.__dict__.copy()
+        state['bindings'] = {symbol_name(symbol): value for symbol, value in self.bindings.items()}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.bindings = {intern(name): value for name, value in state['bindings'].items()}
     
     def set_removed(self, removed):
         self.is_removed = removed
@@ -38,62 +45,380 @@ class Environment:
 
 class Closure:
     def __init__(self, params, delta_id, env_index):
-        self.params = params  # list of variable names
+        self.params = params  # Symbol ids of the parameters
         self.delta_id = delta_id
         self.env_index = env_index  # Store environment index instead of reference
 
     def __repr__(self):
-        return f"<Closure λ{','.join(self.params)}^{self.delta_id}>"
+        return f"<Closure λ{','.join(symbol_name(p) for p in self.params)}^{self.delta_id}>"
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['params'] = [symbol_name(p) for p in self.params]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.params = [intern(name) for name in state['params']]
 
 class Eta:
     def __init__(self, closure):
         self.closure = closure  # The original closure from Y*
+        self.delta_id = closure.delta_id  # Mirrored so call sites can check either kind alike
+        self.env_index = closure.env_index
         
     def __repr__(self):
         return f"<Eta {self.closure}>"
 
+_EMPTY = object()  # Callee of a call site that has not cached anything yet
+
+class CallSite(str):
+    """
+    A γ instruction at one position of a control structure (it still equals
+    'γ'). Its inline cache remembers the kind (Closure or Eta) and delta of
+    the last function applied there, with its parameters and body ready to
+    push, so a call of the same function skips the callee type checks and
+    reversing the body. The last callee's environment is kept as well.
+    """
+    def __new__(cls, delta_id=None, position=None):
+        site = super().__new__(cls, 'γ')
+        site.delta_id = delta_id
+        site.position = position
+        site.cacheable = delta_id is not None  # γ pushed by the machine itself has no fixed site
+        site.kind = None
+        site.callee_delta = None
+        site.params = None
+        site.body = None
+        site.callee = _EMPTY
+        site.env = None
+        return site
+
+    def __reduce__(self):
+        return (CallSite, (self.delta_id, self.position))  # Caches stay with their machine
+
+GAMMA = CallSite()
+
+class EnvRemove(int):
+    """Marker below a call's body: pops the env with this index. Shown as 'env_remove_N'."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f'env_remove_{int(self)}'
+
+    def __repr__(self):
+        return repr(str(self))
+
+class Thunk:
+    """A delayed argument (lazy mode): delta_id evaluated in env_index at most once."""
+    def __init__(self, delta_id, env_index):
+        self.delta_id = delta_id
+        self.env_index = env_index
+        self.forced = False
+        self.value = None
+
+    def __repr__(self):
+        return f"<Thunk {self.value}>" if self.forced else f"<Thunk δ{self.delta_id}@e{self.env_index}>"
+
+class Force(str):
+    """
+    Marker below a thunk's delta, shown as 'force_N' for δN: memoizes the
+    value the delta left on the stack and returns to the forcing env.
+    """
+    def __new__(cls, thunk, reapply=None):
+        marker = super().__new__(cls, f'force_{thunk.delta_id}')
+        marker.thunk = thunk
+        marker.reapply = reapply  # Operands γ had popped, if it was forcing its argument
+        return marker
+
+    def __reduce__(self):
+        return (Force, (self.thunk, self.reapply))
+
+class Builtin:
+    """
+    A builtin function and the number of curried arguments it takes. Builtins
+    of the machine itself are implemented in apply_builtin; registered ones
+    carry a Python function that takes the arguments as machine values
+    (integers, strings, 'true'/'false', lists for tuples) and returns one.
+    With needs_machine, the function gets the executor first, so it can apply
+    RPAL functions it was given with machine.call.
+    """
+    def __init__(self, name, arity=1, function=None, needs_machine=False):
+        self.name = name
+        self.arity = arity
+        self.function = function
+        self.needs_machine = needs_machine
+
+    def __repr__(self):
+        return f"<Builtin {self.name}/{self.arity}>"
+
+class Partial:
+    """A builtin applied to fewer arguments than its arity, e.g. Conc 'a'."""
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __repr__(self):
+        return f"<Partial {self.name} {', '.join(repr(arg) for arg in self.args)}>"
+
+class Resume(str):
+    """Marker under a function applied by machine.call; popping it returns to the calling builtin."""
+
+RESUME = Resume('resume')
+
+class StepLimitReached(Exception):
+    """Unwinds builtins that were applying functions when the step budget ran out."""
+
+BUILTINS = {name: Builtin(name) for name in (
+    'Print', 'Isinteger', 'Isstring', 'Istuple', 'Isdummy',
+    'Istruthvalue', 'Isfunction', 'Stem', 'Stern',
+    'Order', 'Null', 'ItoS', 'print',
+)}
+BUILTINS['Conc'] = Builtin('Conc', 2)
+
+def register_builtin(name, function, arity=1):
+    """
+    Make a Python function callable from RPAL in every machine created afterwards.
+
+    Args:
+        name: The identifier RPAL programs call it by; it takes precedence over bindings of that name
+        function: Called with arity machine values once the builtin is fully applied
+        arity: Number of curried arguments
+    """
+    BUILTINS[name] = Builtin(name, arity, function)
+
+SUPERINSTRUCTIONS = frozenset((VarConst, VarConstBranch, VarApply, ConstVarApply, BuiltinApply))
+
 class CSEMachineExecutor:
-    def __init__(self, control_structures):
-        self.control_structures = control_structures
+    MAX_STEPS = 100000  # Default step budget, increased for deep recursion
+
+    def __init__(self, control_structures, max_steps=None, trace=True, track_peaks=False, profiler=None,
+                 output=None, trailing_newline=True, parallel=None, lazy=False, builtins=None, trace_file=None):
+        self.builtins = dict(BUILTINS)  # Name -> Builtin
+        if builtins:
+            self.builtins.update(builtins)  # Extra Builtin objects for this machine only
+        self.source_controls = control_structures  # As flattened; may grow (REPL)
+        self.control_structures = {}  # Decoded copies with a CallSite per γ
+        # Traces show the instructions superinstructions stand for; profiles count the fused ones
+        self.expand_superinstructions = trace
+        self.decode_controls()
+        self.output = output if output is not None else OutputWriter()  # Buffered Print output
+        self.trailing_newline = trailing_newline  # The CLI ends every run with a newline
+        self.max_steps = max_steps if max_steps is not None else self.MAX_STEPS
+        self.trace_enabled = trace  # Recording states is costly; only needed for -cse
+        self.trace_file = trace_file  # Path or binary stream for the trace (see CSE_Machine/trace.py); None keeps it in memory
+        self.tracer = None  # TraceWriter of the current run
+        self.track_peaks = track_peaks  # Peak stack/control/env sizes for --profile
+        self.profiler = profiler  # Optional ExecutionProfiler (see CSE_Machine/profiler.py)
+        self.parallel = parallel  # Optional ParallelEvaluator for 'π' tuples (see CSE_Machine/parallel.py)
+        self.lazy = lazy  # Call-by-need: run controls from OptimizedFlattener(lazy=True)
+        self.peak_stack = 0
+        self.peak_control = 0
+        self.peak_envs = 1
+        self.envs_removed = 0
+        self.steps = 0
+        self.step_limit_exceeded = False
+        self.finished = False  # Set by step() once the program has run to completion
+        self.result_pending = None  # Lazy mode: where step() is in forcing the result's components
         self.stack = []
         self.environments = [Environment(0)]  # List of environments
         self.current_env = self.environments[0]  # Current active environment
-        self.control = list(reversed(control_structures[0]))  # Start from δ0
+        self.control = list(reversed(self.control_structures[0]))  # Start from δ0
         self.env_counter = 1
-        self.trace_log = []
-        self.builtins = {
-            'Print', 'Isinteger', 'Isstring', 'Istuple', 'Isdummy',
-            'Istruthvalue', 'Isfunction', 'Stem', 'Stern', 'Conc',
-            'Order', 'Null', 'ItoS', 'print',
-        }
-
-    def lookup(self, var):
-        return self.current_env.lookup(var)
+        self.caller_envs = []  # Env to return to for each env_remove marker on the control
+        if profiler is not None:
+            profiler.attach(self)
+        if parallel is not None:
+            parallel.attach(self)
+
+    def decode_controls(self):
+        """
+        Decode control structures added since the last call, giving each γ
+        (and each fused call) its own CallSite and fusing saturated builtin calls.
+        Variable references, λ, ρ and θ that arrive as plain strings are decoded
+        to symbol ids here, once; names of this machine's builtins go back to strings.
+        """
+        builtins = self.builtins
+        arities = {name: builtin.arity for name, builtin in builtins.items()}
+        for delta_id, control in self.source_controls.items():
+            if delta_id in self.control_structures:
+                continue
+            # Expand everything when tracing, and fused lookups of names registered as builtins
+            control = [part for instr in control
+                       for part in (instr.expansion if isinstance(instr, Superinstruction) and
+                                    (self.expand_superinstructions or getattr(instr, 'name', None) in builtins)
+                                    else (instr,))]
+            control = [str(instr) if type(instr) is Variable and instr in builtins else instr
+                       for instr in control]
+            if not self.expand_superinstructions:
+                control = fuse_builtin_calls(control, arities)
+            decoded = []
+            for position, instr in enumerate(control):
+                if type(instr) is VarApply or type(instr) is ConstVarApply:
+                    instr = instr.with_site(CallSite(delta_id, position))
+                elif instr == 'γ':
+                    instr = CallSite(delta_id, position)
+                elif type(instr) is str:
+                    if instr[0] == 'λ':
+                        instr = Lambda(instr)
+                    elif instr[0] == 'ρ':
+                        instr = Rec(instr)
+                    elif instr[0] == 'θ':
+                        instr = Delay(instr)
+                    elif is_variable(instr) and instr not in builtins:
+                        instr = Variable(instr)
+                decoded.append(instr)
+            self.control_structures[delta_id] = decoded
+
+    def lookup(self, name):
+        return self.current_env.lookup(intern(name))
     
     def find_env_by_index(self, index):
-        for env in self.environments:
+        # Environments are appended in index order, so the index is normally the position
+        environments = self.environments
+        if index < len(environments):
+            env = environments[index]
+            if env.index == index:
+                return env
+        for env in environments:
             if env.index == index:
                 return env
         return None
     
-    def record_state(self, instr):
-        state = {
-            'instr': instr,
-            'control': list(reversed(self.control)),  # keep in natural order
-            'stack': list(self.stack),               # shallow copy for snapshot
-            'current_env': self.current_env.index,
-            'active_envs': [f'e{env.index}' for env in self.environments if not env.is_removed]
-        }
-        self.trace_log.append(state)
-    
+    def cache_callee(self, site, callee, env, params, body):
+        """Fill a call site's inline cache after a miss."""
+        site.kind = type(callee)
+        site.callee_delta = callee.delta_id
+        site.params = params
+        site.body = body
+        site.callee = callee
+        site.env = env
+
+    def force_thunk(self, thunk, reapply=None):
+        """
+        Start evaluating a thunk inside the dispatch loop, in the env it was
+        created in (its delta binds nothing, so it needs no env of its own).
+        The Force marker below it memoizes the value it leaves on the stack.
+
+        Args:
+            thunk: The unforced Thunk
+            reapply: Operands γ had popped; pushed back above the value before γ runs again
+        """
+        self.control.append(Force(thunk, reapply))
+        self.control.extend(reversed(self.control_structures[thunk.delta_id]))
+        self.caller_envs.append(self.current_env)
+        self.current_env = self.find_env_by_index(thunk.env_index)
+
+    def unfuse(self, instr):
+        """
+        Push the instructions a superinstruction stands for, to run one at a
+        time: where a slice or the step budget ends partway through it, or
+        where it finds a thunk it would have to force first.
+        """
+        if self.profiler is not None:
+            self.profiler.unfused(instr)
+        builtins = self.builtins
+        for part in reversed(instr.expansion):
+            if type(part) is str:
+                if part == 'γ':
+                    part = GAMMA
+                elif is_variable(part) and part not in builtins:
+                    part = Variable(part)
+            self.control.append(part)
+
+    def force(self, thunk):
+        """
+        The value of a thunk, evaluating it first (to completion, like call())
+        if it has not been forced yet. For code outside the dispatch loop.
+
+        Raises:
+            StepLimitReached: If the step budget runs out (the machine stops as usual)
+        """
+        if not thunk.forced:
+            self.control.append(RESUME)
+            self.force_thunk(thunk)
+            self.execute()
+            if self.step_limit_exceeded:
+                raise StepLimitReached()
+            self.stack.pop()  # The Force marker has memoized it
+        return thunk.value
+
+    def force_all(self, value):
+        """
+        Force value and every thunk in the tuples it holds (lazy mode), for
+        builtins, comparisons and results that need whole tuples. Forced
+        components replace their thunks in place.
+
+        Returns:
+            The forced value
+        """
+        if type(value) is Thunk:
+            value = self.force(value)
+        if type(value) is not list:
+            return value
+        # Depth first, last component first: the order a strict τ evaluates them in
+        pending = [(value, len(value))]
+        while pending:
+            current, i = pending.pop()
+            if not i:
+                continue
+            i -= 1
+            pending.append((current, i))
+            item = current[i]
+            if type(item) is Thunk:
+                item = current[i] = self.force(item)
+            if type(item) is list:
+                pending.append((item, len(item)))
+        return value
+
+    def trace_writer(self):
+        """The TraceWriter recording per-step changes, created on first use."""
+        if self.tracer is None:
+            self.tracer = TraceWriter(self, self.trace_file)
+        return self.tracer
+
+    def reset_trace(self):
+        """Drop the trace recorded so far; the next traced step starts a new one."""
+        if self.tracer is not None:
+            self.tracer.discard()
+            self.tracer = None
+
+    def step_hook(self):
+        """
+        Combine the enabled per-step observers into one callable, or None when
+        nothing is observing, so the dispatch loop pays a single check per step.
+        """
+        hooks = []
+        if self.trace_enabled:
+            hooks.append(self.trace_writer().record)
+        if self.track_peaks:
+            hooks.append(self.update_peaks)
+        if self.profiler is not None:
+            hooks.append(self.profiler.observe)
+        if not hooks:
+            return None
+        if len(hooks) == 1:
+            return hooks[0]
+
+        def combined(instr):
+            for hook in hooks:
+                hook(instr)
+        return combined
+
+    def update_peaks(self, instr=None):
+        if len(self.stack) > self.peak_stack:
+            self.peak_stack = len(self.stack)
+        if len(self.control) > self.peak_control:
+            self.peak_control = len(self.control)
+        live_envs = len(self.environments) - self.envs_removed
+        if live_envs > self.peak_envs:
+            self.peak_envs = live_envs
+
     def print_trace(self):
-        for i, state in enumerate(self.trace_log):
-            print(f"\nStep {i+1}:")
-            print(f"  Instruction: {state['instr']}")
-            print(f"  Control: {state['control']}")
-            print(f"  Stack: {state['stack']}")
-            print(f"  Current Env: e{state['current_env']}")
-            print(f"  Active Envs: {state['active_envs']}")
+        """Print the recorded states, rebuilding them from the trace one step at a time."""
+        if self.tracer is None:
+            return
+        for step, state in self.tracer.reader().states():
+            print(format_state(step, state))
 
 
     def apply_binary(self, op, left, right):
@@ -164,33 +489,28 @@ class CSEMachineExecutor:
     def format_tuple(self,tup):
         parts = []
         for item in tup:
-            if isinstance(item, list):
+            if isinstance(item, TUPLE_TYPES):
                 parts.append(self.format_tuple(item))
             else:
                 parts.append(str(item))
         return '(' + ', '.join(parts) + ')'
         
     def apply_builtin(self, name, arg):
+        """Apply a builtin to its argument (a list of them for more than one)."""
+        builtin = self.builtins.get(name)
+        if self.lazy and (name == 'Print' or name == 'print' or builtin is not None and builtin.function is not None):
+            arg = self.force_all(arg)  # Lazy tuples may still hold delayed components
+        if builtin is not None and builtin.function is not None:
+            args = arg if builtin.arity > 1 else [arg]
+            return builtin.function(self, *args) if builtin.needs_machine else builtin.function(*args)
         if name == 'Print' or name == 'print':
-            if isinstance(arg, list):
-                if len(arg) == 0:
-                    print('nil')
-                    return 'nil'
-                else:
-                    printable = self.format_tuple(arg)
-                    print(printable,end="")
-                    return printable
-            if isinstance(arg, str):
-                interpreted = arg.replace('\\n', '\n').replace('\\t', '\t')
-                print(f"{interpreted}", end="")
-                return arg
-            else:
-                print(f"{arg}", end="")
-                return arg
+            # Escapes in string literals were decoded when they were compiled
+            self.output.write_value(arg)
+            return arg
         elif name == 'Isinteger':
             return 'true' if isinstance(arg, int) else 'false'
         elif name == 'Istuple':
-            return 'true' if isinstance(arg, list) else 'false'
+            return 'true' if isinstance(arg, TUPLE_TYPES) else 'false'
         elif name == 'Isstring':
             return 'true' if isinstance(arg, str) else 'false'
         elif name == 'Isdummy':
@@ -198,7 +518,7 @@ class CSEMachineExecutor:
         elif name == 'Istruthvalue':
             return 'true' if arg in ['true', 'false'] else 'false'
         elif name == 'Isfunction':
-            return 'true' if isinstance(arg, (Closure, Eta)) else 'false'
+            return 'true' if isinstance(arg, (Closure, Eta, Partial)) else 'false'
         elif name == 'Stem':
             return arg[0] if isinstance(arg, str) and arg else ''
         elif name == 'Stern':
@@ -206,7 +526,7 @@ class CSEMachineExecutor:
         elif name == 'Conc':
             return arg[0] + arg[1]
         elif name == 'Order':
-            return int(len(arg)) if isinstance(arg, (str, list)) else '0'
+            return int(len(arg)) if isinstance(arg, (str, list, IntTuple)) else '0'
         elif name == 'Null':
             return 'true' if not arg else 'false'
         elif name == 'ItoS':
@@ -218,12 +538,40 @@ class CSEMachineExecutor:
             if not isinstance(arg, list) or len(arg) != 2:
                 raise TypeError("aug expects a tuple of form (tuple, value)")
             base, element = arg
+            if type(base) is IntTuple:
+                return append_int(base, element)
             if not isinstance(base, list):
                 raise TypeError("aug: first argument must be a tuple (list)")
+            # Integer tuples built one component at a time become compact once they are long enough.
+            # A longer list already holds something else, so only the tuple reaching the length is checked
+            if len(base) + 1 == COMPACT_LENGTH:
+                return compact(base + [element])
             return base + [element]
         else:
             raise ValueError(f"Unknown builtin function: {name}")
 
+    def call(self, func, arg):
+        """
+        Apply an RPAL function value to arg and run it to completion, for
+        builtins written in Python that take functions (see CSE_Machine/stdlib.py).
+        The steps count against the running program's budget, and a slice
+        budget given to step() is not checked until the builtin returns.
+
+        Returns:
+            The function's result
+
+        Raises:
+            StepLimitReached: If the step budget runs out (the machine stops as usual)
+        """
+        self.control.append(RESUME)
+        self.control.append(GAMMA)
+        self.stack.append(arg)
+        self.stack.append(func)
+        self.execute()
+        if self.step_limit_exceeded:
+            raise StepLimitReached()
+        return self.stack.pop()
+
     def print_state(self, instr):
         print(f"\nInstruction: {instr}")
         print(f"Control: {list(reversed(self.control))}")
@@ -232,216 +580,579 @@ class CSEMachineExecutor:
         print(f"Environments: {[f'e{env.index}' for env in self.environments if not env.is_removed]}\n")
 
     def run(self):
-        steps = 0
-        MAX_STEPS = 100000  # Increased for deep recursion
-        self.trace_log.clear()
-        
-        while self.control:
-            steps += 1
-            if steps > MAX_STEPS:
-                print("🔁 Execution stopped: exceeded maximum steps (possible infinite loop).")
-                print(f"Top of stack: {self.stack[-1] if self.stack else 'empty'}")
-                break
+        self.reset_trace()
+        self.step(None)
+        # print("\n=== FINAL STACK ===")
+        # print(self.stack)
+        return self.result
+
+    @property
+    def result(self):
+        return self.stack[0] if self.stack else None
+
+    def step(self, n=1):
+        """
+        Execute up to n more instructions, then pause. Control, stack,
+        environments and the step count all live on the executor, so a host
+        can interleave many programs on one thread, drop a runaway one between
+        slices, or inspect its state.
+
+        Args:
+            n: Instructions to run in this slice (None runs to the end)
+
+        Returns:
+            True once the program has finished or used up max_steps
+        """
+        if self.finished:
+            return True
+        try:
+            start = self.steps
+            self.execute(n)
+            # A lazy tuple result may hold delayed components; they are forced
+            # in the same slices, one thunk at a time
+            while self.lazy and not self.control and self.stack and not self.step_limit_exceeded:
+                thunk = self.next_result_thunk()
+                if thunk is None:
+                    break
+                self.force_thunk(thunk)
+                self.execute(None if n is None else n - (self.steps - start))
+            if self.control and not self.step_limit_exceeded:
+                return False
+            if self.trailing_newline:
+                self.output.write('\n')
+        except Exception:
+            self.finished = True
+            self.output.flush()
+            raise
+        self.finished = True
+        self.output.flush()
+        if self.profiler is not None:
+            self.profiler.finish()
+        if self.tracer is not None:
+            self.tracer.finish()
+        return True
+
+    def next_result_thunk(self):
+        """
+        The next unforced thunk of the result (stack[0]), in force_all's
+        order, replacing thunks forced so far by their values.
+
+        Returns:
+            The thunk, or None once the whole result is forced
+        """
+        del self.stack[1:]  # Values left by the Force markers of earlier thunks
+        if self.result_pending is None:
+            self.result_pending = [(self.stack, 1)]
+        pending = self.result_pending
+        while pending:
+            current, i = pending.pop()
+            if not i:
+                continue
+            i -= 1
+            item = current[i]
+            if type(item) is Thunk and not item.forced:
+                pending.append((current, i + 1))  # Look at it again once it is forced
+                return item
+            pending.append((current, i))
+            if type(item) is Thunk:
+                item = current[i] = item.value
+            if type(item) is list:
+                pending.append((item, len(item)))
+        return None
+
+    def slices(self, n=1000):
+        """
+        Generator form of step(n): yields the step count after every slice
+        that leaves the program unfinished, and returns the result.
+        """
+        while not self.step(n):
+            yield self.steps
+        return self.result
+
+    def evaluate_delta(self, delta_id, env):
+        """
+        Evaluate one control structure in the given environment, leaving the
+        machine's own control and stack untouched.
+
+        Args:
+            delta_id: Key of the control structure to evaluate
+            env: Environment to evaluate it in (must be in self.environments)
+
+        Returns:
+            The value left on top of the stack, or None
+        """
+        saved = (self.control, self.stack, self.current_env, self.caller_envs)
+        first_new_env = len(self.environments)
+        self.decode_controls()
+        self.control = list(reversed(self.control_structures[delta_id]))
+        self.stack = []
+        self.current_env = env
+        self.caller_envs = []
+        self.steps = 0
+        self.step_limit_exceeded = False
+        try:
+            self.execute()
+            value = self.stack[-1] if self.stack else None
+            if self.lazy and not self.step_limit_exceeded:
+                try:
+                    value = self.force_all(value)
+                except StepLimitReached:
+                    pass
+            if self.profiler is not None:
+                self.profiler.finish()
+            return value
+        finally:
+            self.output.flush()
+            # Calls interrupted by an error or the step limit never reach their
+            # env_remove marker. Only those envs are dropped: a ρ env has no
+            # marker and lives on in the closures it binds.
+            interrupted = {int(instr) for instr in self.control if type(instr) is EnvRemove}
+            self.control, self.stack, self.current_env, self.caller_envs = saved
+            for leftover in self.environments[first_new_env:]:
+                if leftover.index in interrupted and not leftover.is_removed:
+                    leftover.set_removed(True)
+                    self.envs_removed += 1
+
+    def execute(self, budget=None):
+        """
+        Run the dispatch loop until the control is empty, the step budget is
+        spent, or (given a budget) that many more instructions have run.
+
+        Returns:
+            The step count so far
+        """
+        steps = self.steps
+        max_steps = self.max_steps
+        stop = max_steps if budget is None else min(max_steps, steps + budget)
+        hook = self.step_hook()
+        lazy = self.lazy
+
+        try:
+            while self.control:
+                if steps >= stop:
+                    if steps >= max_steps:
+                        self.step_limit_exceeded = True
+                        self.output.write("🔁 Execution stopped: exceeded maximum steps (possible infinite loop).\n")
+                        self.output.write(f"Top of stack: {self.stack[-1] if self.stack else 'empty'}\n")
+                    break
+                steps += 1
                 
-            instr = self.control.pop()
-            # self.print_state(instr)  # Debug info
-            self.record_state(instr)
-
-            # if instr.isdigit():
-            #     self.stack.append(instr)
-            if isinstance(instr, int):
-                self.stack.append(instr)
-
-            elif instr.startswith('λ'):
-                lambda_header = instr[1:]  # e.g. x,y^1
-                param_part, delta_part = lambda_header.split('^')
-                params = param_part.split(',')
-                delta_id = int(delta_part)
-                closure = Closure(params, delta_id, self.current_env.index)
-                self.stack.append(closure)
-
-            elif instr.startswith('τ'):
-                n = int(instr[1:])
-                if len(self.stack) < n:
-                    raise IndexError(f"Tuple construction expected {n} elements but got {len(self.stack)}")
-                tup = [self.stack.pop() for _ in range(n)]
-                #tup.reverse()  # Maintain proper order
-                self.stack.append(tup)
-
-            elif instr == 'γ':
-                if len(self.stack) < 2:
-                    raise IndexError("Stack underflow: expected 2 elements for γ")
+                instr = self.control.pop()
+                # self.print_state(instr)  # Debug info
+                if hook is not None:
+                    hook(instr)
+
+                kind = instr.__class__
+                if kind in SUPERINSTRUCTIONS:
+                    # Charged the steps of the instructions it stands for
+                    if steps + instr.cost - 1 > stop:
+                        # The slice or the step limit ends partway through it
+                        self.unfuse(instr)
+                        steps -= 1
+                        continue
+                    steps += instr.cost - 1
+                if kind is VarApply:
+                    # f γ: look the function up, then apply it below at the fused call site
+                    func = self.current_env.lookup(instr.symbol)
+                    if lazy and type(func) is Thunk:
+                        if not func.forced:
+                            self.unfuse(instr)  # The plain lookup forces it
+                            steps -= instr.cost
+                            continue
+                        func = func.value
+                    self.stack.append(func)
+                    instr = instr.site
+                elif kind is ConstVarApply:
+                    # 2 T γ: select from a tuple right away, otherwise apply at the fused call site
+                    func = self.current_env.lookup(instr.symbol)
+                    if lazy and type(func) is Thunk:
+                        if not func.forced:
+                            self.unfuse(instr)  # The plain lookup forces it
+                            steps -= instr.cost
+                            continue
+                        func = func.value
+                    if type(func) is list or type(func) is IntTuple:
+                        index = instr.const
+                        if 1 <= index <= len(func):
+                            item = func[index - 1]
+                            if lazy and type(item) is Thunk:
+                                if not item.forced:
+                                    self.force_thunk(item)  # A lazy component
+                                    continue
+                                item = item.value
+                            self.stack.append(item)
+                            continue
+                        raise IndexError(f"Index {index} out of bounds for tuple {func}")
+                    self.stack.append(instr.const)
+                    self.stack.append(func)
+                    instr = instr.site
+
+                # if instr.isdigit():
+                #     self.stack.append(instr)
+                if kind is int:
+                    self.stack.append(instr)
+
+                elif kind is VarConst:
+                    # n 1 -
+                    left = self.current_env.lookup(instr.symbol)
+                    if lazy and type(left) is Thunk:
+                        if not left.forced:
+                            self.unfuse(instr)
+                            steps -= instr.cost
+                            continue
+                        left = left.value
+                    self.stack.append(self.apply_binary(instr.op, left, instr.const))
+
+                elif kind is VarConstBranch:
+                    # n 0 eq β δa δb
+                    left = self.current_env.lookup(instr.symbol)
+                    if lazy and type(left) is Thunk:
+                        if not left.forced:
+                            self.unfuse(instr)
+                            steps -= instr.cost
+                            continue
+                        left = left.value
+                    condition = self.apply_binary(instr.op, left, instr.const)
+                    if condition == 'true':
+                        self.control.extend(reversed(self.control_structures[instr.then_id]))
+                    elif condition == 'false':
+                        self.control.extend(reversed(self.control_structures[instr.else_id]))
+                    else:
+                        raise ValueError(f"Invalid condition for β: {condition}")
+
+                elif kind is BuiltinApply:
+                    # 'b' 'a' Conc γ γ: a builtin applied to all its arguments at once
+                    arity = instr.arity
+                    if len(self.stack) < arity:
+                        raise IndexError("Stack underflow: expected 2 elements for γ")
+                    if lazy and any(type(arg) is Thunk and not arg.forced for arg in self.stack[-arity:]):
+                        self.unfuse(instr)  # Apply one argument at a time, forcing each
+                        steps -= instr.cost
+                        continue
+                    if arity == 1:
+                        arg = self.stack.pop()
+                        if lazy and type(arg) is Thunk:
+                            arg = arg.value
+                        self.steps = steps  # Builtins may run functions through call()
+                        self.stack.append(self.apply_builtin(instr.name, arg))
+                        steps = self.steps
+                    else:
+                        args = [self.stack.pop() for _ in range(arity)]
+                        if lazy:
+                            args = [arg.value if type(arg) is Thunk else arg for arg in args]
+                        self.steps = steps
+                        self.stack.append(self.apply_builtin(instr.name, args))
+                        steps = self.steps
+
+                elif kind is Variable:
+                    val = self.current_env.lookup(instr.symbol)
+                    if lazy and type(val) is Thunk:
+                        if not val.forced:
+                            self.force_thunk(val)
+                            continue
+                        val = val.value
+                    self.stack.append(val)
+
+                elif kind is EnvRemove:
+                    env_to_remove = self.find_env_by_index(instr)
+                    if env_to_remove and not env_to_remove.is_removed:
+                        env_to_remove.set_removed(True)
+                        self.envs_removed += 1
+
+                    # Markers run in the reverse order of the calls that pushed them
+                    self.current_env = self.caller_envs.pop()
+
+                elif kind is Lambda:
+                    # e.g. λx,y^1, decoded to parameter symbols and delta
+                    self.stack.append(Closure(instr.params, instr.delta_id, self.current_env.index))
+
+                elif instr.startswith('τ'):
+                    n = int(instr[1:])
+                    if len(self.stack) < n:
+                        raise IndexError(f"Tuple construction expected {n} elements but got {len(self.stack)}")
+                    tup = [self.stack.pop() for _ in range(n)]
+                    #tup.reverse()  # Maintain proper order
+                    self.stack.append(compact(tup) if n >= COMPACT_LENGTH else tup)
+
+                elif instr.startswith('π'):
+                    # Tuple whose components were compiled to their own deltas, e.g. π4,5,6
+                    component_ids = [int(d) for d in instr[1:].split(',')]
+                    values = None
+                    if self.parallel is not None:
+                        values, used = self.parallel.evaluate_components(self, component_ids, max_steps - steps)
+                    if values is not None:
+                        steps += used + 1  # Worker steps count against this run's budget, as does the τn
+                        self.stack.append(values)
+                    elif lazy:
+                        # Call-by-need: components the evaluator did not finish stay delayed
+                        self.stack.append([Thunk(component_id, self.current_env.index)
+                                           for component_id in component_ids])
+                    else:
+                        # Same order as an inline tuple: last component first, then τn
+                        self.control.append(f'τ{len(component_ids)}')
+                        for component_id in component_ids:
+                            self.control.extend(reversed(self.control_structures[component_id]))
+
+                elif instr == 'γ':
+                    if len(self.stack) < 2:
+                        raise IndexError("Stack underflow: expected 2 elements for γ")
                 
-                func = self.stack.pop()
-                arg = self.stack.pop()
-
-                if isinstance(func, str) and func in self.builtins:
-                    if func in {'Conc', 'aug'}:
-                        if len(self.stack) < 1:
-                            raise IndexError(f"{func} requires 2 arguments")
-                        arg2 = self.stack.pop()
-                        temp = self.control.pop()
-                        arg1 = arg
-                        result = self.apply_builtin(func, [arg1, arg2])
+                    func = self.stack.pop()
+                    arg = self.stack.pop()
+
+                    # Lazy mode: only a one-parameter function takes its argument unevaluated
+                    if lazy and type(arg) is Thunk and not (type(func) is Eta or
+                                                            (type(func) is Closure and len(func.params) == 1)):
+                        if not arg.forced:
+                            self.force_thunk(arg, [func])
+                            continue
+                        arg = arg.value
+
+                    if type(func) is instr.kind and func.delta_id == instr.callee_delta:
+                        # Inline cache hit: the same function as the last call from this site
+                        if func is not instr.callee:
+                            instr.callee = func
+                            instr.env = self.find_env_by_index(func.env_index)
+                        new_env = Environment(self.env_counter, instr.env)
+                        self.env_counter += 1
+                        params = instr.params
+                        if instr.kind is Eta:
+                            new_env.bindings[params[0]] = func
+                            self.control.append(GAMMA)
+                            self.stack.append(arg)
+                        elif len(params) == 1:
+                            new_env.bindings[params[0]] = arg
+                        else:
+                            if not isinstance(arg, TUPLE_TYPES):
+                                raise TypeError("Expected tuple for multi-parameter lambda")
+                            for i, param in enumerate(params):
+                                new_env.extend(param, arg[i])
+                        self.environments.append(new_env)
+                        self.control.append(EnvRemove(new_env.index))
+                        self.control.extend(instr.body)
+                        self.caller_envs.append(self.current_env)
+                        self.current_env = new_env
+
+                    elif isinstance(func, str) and func in self.builtins:
+                        if self.builtins[func].arity == 1:
+                            self.steps = steps
+                            result = self.apply_builtin(func, arg)
+                            steps = self.steps
+                        else:
+                            result = Partial(func, [arg])  # Curried: Conc 'a' waits for its second argument
                         self.stack.append(result)
-                    else:
-                        result = self.apply_builtin(func, arg)
+
+                    elif type(func) is Partial:
+                        args = func.args + [arg]
+                        if len(args) == self.builtins[func.name].arity:
+                            self.steps = steps
+                            result = self.apply_builtin(func.name, args)
+                            steps = self.steps
+                        else:
+                            result = Partial(func.name, args)
                         self.stack.append(result)
                 
-                elif isinstance(func, list) and isinstance(arg, int):
-                    # This is tuple selection, not function application
-                    index = int(arg)
-                    if 1 <= index <= len(func):
-                        self.stack.append(func[index - 1])
-                    else:
-                        raise IndexError(f"Index {index} out of bounds for tuple {func}")
+                    elif isinstance(func, TUPLE_TYPES) and isinstance(arg, int):
+                        # This is tuple selection, not function application
+                        index = int(arg)
+                        if 1 <= index <= len(func):
+                            item = func[index - 1]
+                            if lazy and type(item) is Thunk:
+                                if not item.forced:
+                                    self.force_thunk(item)  # A lazy component
+                                    continue
+                                item = item.value
+                            self.stack.append(item)
+                        else:
+                            raise IndexError(f"Index {index} out of bounds for tuple {func}")
+
+                    elif func == '<Y*>':
+                        if not isinstance(arg, Closure):
+                            raise TypeError("Y* must be applied to a closure")
+                        # Create eta node
+                        eta = Eta(arg)
+                        self.stack.append(eta)
 
-                elif func == '<Y*>':
-                    if not isinstance(arg, Closure):
-                        raise TypeError("Y* must be applied to a closure")
-                    # Create eta node
-                    eta = Eta(arg)
-                    self.stack.append(eta)
-
-                elif isinstance(func, Eta):
-                    # Handle eta application - this is the key for deep recursion
-                    eta = func
-                    original_closure = eta.closure
+                    elif isinstance(func, Eta):
+                        # Handle eta application - this is the key for deep recursion
+                        eta = func
+                        original_closure = eta.closure
                     
-                    # Create new environment for the recursive call
-                    new_env = Environment(self.env_counter, self.find_env_by_index(original_closure.env_index))
-                    self.env_counter += 1
+                        # Create new environment for the recursive call
+                        closure_env = self.find_env_by_index(original_closure.env_index)
+                        new_env = Environment(self.env_counter, closure_env)
+                        self.env_counter += 1
                     
-                    # Bind the recursive function parameter to the eta itself
-                    new_env.extend(original_closure.params[0], eta)
+                        # Bind the recursive function parameter to the eta itself
+                        new_env.extend(original_closure.params[0], eta)
                     
-                    self.environments.append(new_env)
-                    self.control.append('γ')
-                    # Add environment removal instruction
-                    self.control.append(f'env_remove_{new_env.index}')
+                        self.environments.append(new_env)
+                        self.control.append(GAMMA)
+                        # Add environment removal instruction
+                        self.control.append(EnvRemove(new_env.index))
                     
-                    # Load the body of the lambda
-                    self.control.extend(reversed(self.control_structures[original_closure.delta_id]))
+                        # Load the body of the lambda
+                        body = self.control_structures[original_closure.delta_id][::-1]
+                        self.control.extend(body)
+                        if instr.cacheable:
+                            self.cache_callee(instr, eta, closure_env, original_closure.params, body)
                     
-                    # Switch to new environment
-                    old_env = self.current_env
-                    self.current_env = new_env
+                        # Switch to new environment
+                        self.caller_envs.append(self.current_env)
+                        self.current_env = new_env
                     
-                    # Push argument to stack
-                    self.stack.append(arg)
+                        # Push argument to stack
+                        self.stack.append(arg)
 
-                elif isinstance(func, Closure):
-                    # Regular lambda application
-                    closure_env = self.find_env_by_index(func.env_index)
-                    new_env = Environment(self.env_counter, closure_env)
-                    self.env_counter += 1
+                    elif isinstance(func, Closure):
+                        # Regular lambda application
+                        closure_env = self.find_env_by_index(func.env_index)
+                        new_env = Environment(self.env_counter, closure_env)
+                        self.env_counter += 1
                     
-                    # Bind parameters
-                    if len(func.params) == 1:
-                        new_env.extend(func.params[0], arg)
-                    else:
-                        # Multiple parameters - arg should be a tuple
-                        if not isinstance(arg, list):
-                            raise TypeError("Expected tuple for multi-parameter lambda")
-                        for i, param in enumerate(func.params):
-                            new_env.extend(param, arg[i])
+                        # Bind parameters
+                        if len(func.params) == 1:
+                            new_env.extend(func.params[0], arg)
+                        else:
+                            # Multiple parameters - arg should be a tuple
+                            if not isinstance(arg, TUPLE_TYPES):
+                                raise TypeError("Expected tuple for multi-parameter lambda")
+                            for i, param in enumerate(func.params):
+                                new_env.extend(param, arg[i])
                     
-                    self.environments.append(new_env)
+                        self.environments.append(new_env)
                     
-                    # Add environment removal instruction
-                    self.control.append(f'env_remove_{new_env.index}')
+                        # Add environment removal instruction
+                        self.control.append(EnvRemove(new_env.index))
                     
-                    # Load lambda body
-                    self.control.extend(reversed(self.control_structures[func.delta_id]))
+                        # Load lambda body
+                        body = self.control_structures[func.delta_id][::-1]
+                        self.control.extend(body)
+                        if instr.cacheable:
+                            self.cache_callee(instr, func, closure_env, func.params, body)
                     
-                    # Switch environment
-                    self.current_env = new_env
+                        # Switch environment
+                        self.caller_envs.append(self.current_env)
+                        self.current_env = new_env
 
-                else:
-                    raise TypeError(f"Cannot apply non-function: {func}")
-
-            elif instr.startswith('env_remove_'):
-                # Handle environment removal
-                env_index = int(instr.split('_')[2])
-                env_to_remove = self.find_env_by_index(env_index)
-                if env_to_remove:
-                    env_to_remove.set_removed(True)
-                
-                # Find the next active environment
-                for env in reversed(self.environments):
-                    if not env.is_removed:
-                        self.current_env = env
-                        break
-
-            elif instr in ['+', '-', '*', '/', '**', '<', '>', '<=', '>=', 'eq', 'ne', 'ls', 'gr', 'le', 'ge', 'or', '&']:
-                if len(self.stack) < 2:
-                    raise IndexError("Stack underflow on binary operation")
-                right = self.stack.pop()
-                left = self.stack.pop()
-                result = self.apply_binary(instr, left, right)
-                self.stack.append(result)
-
-            elif instr in ['neg', 'not']:
-                if len(self.stack) < 1:
-                    raise IndexError("Stack underflow on unary operation")
-                operand = self.stack.pop()
-                result = self.apply_unary(instr, operand)
-                self.stack.append(result)
+                    else:
+                        raise TypeError(f"Cannot apply non-function: {func}")
+
+                elif kind is Rec:
+                    # rec f = λx.E: a closure for λx.E whose environment binds f to the closure itself.
+                    # ρf,g:x^4;y^6 binds both names and leaves the tuple of closures
+                    rec_env = Environment(self.env_counter, self.current_env)
+                    self.env_counter += 1
+                    self.environments.append(rec_env)
+                    closures = []
+                    for symbol, (params, delta_id) in zip(instr.names, instr.lambdas):
+                        closure = Closure(params, delta_id, rec_env.index)
+                        rec_env.bindings[symbol] = closure
+                        closures.append(closure)
+                    self.stack.append(closures if instr.simultaneous else closures[0])
+
+                elif kind is Delay:
+                    # Lazy argument: θ12 delays δ12, θx passes x's binding on unforced
+                    if instr.delta_id is not None:
+                        self.stack.append(Thunk(instr.delta_id, self.current_env.index))
+                    elif instr.name in self.builtins:
+                        self.stack.append(instr.name)  # A registered builtin passed as an argument
+                    else:
+                        self.stack.append(self.current_env.lookup(instr.symbol))
+
+                elif kind is Force:
+                    thunk, reapply = instr.thunk, instr.reapply
+                    thunk.value = self.stack[-1]
+                    thunk.forced = True
+                    self.current_env = self.caller_envs.pop()
+                    if reapply is not None:
+                        self.stack.extend(reapply)
+                        self.control.append(GAMMA)
+
+                elif instr in ['+', '-', '*', '/', '**', '<', '>', '<=', '>=', 'eq', 'ne', 'ls', 'gr', 'le', 'ge', 'or', '&']:
+                    if len(self.stack) < 2:
+                        raise IndexError("Stack underflow on binary operation")
+                    right = self.stack.pop()
+                    left = self.stack.pop()
+                    if lazy and (type(left) is list or type(right) is list):
+                        # Comparing lazy tuples needs their components
+                        self.steps = steps
+                        self.force_all(left)
+                        self.force_all(right)
+                        steps = self.steps
+                    result = self.apply_binary(instr, left, right)
+                    self.stack.append(result)
+
+                elif instr in ['neg', 'not']:
+                    if len(self.stack) < 1:
+                        raise IndexError("Stack underflow on unary operation")
+                    operand = self.stack.pop()
+                    result = self.apply_unary(instr, operand)
+                    self.stack.append(result)
             
-            elif instr == 'aug':
-                if len(self.stack) < 2:
-                    raise IndexError("Stack underflow on aug")
-                element = self.stack.pop()
-                base = self.stack.pop()
-                result = self.apply_builtin('aug', [base, element])
-                self.stack.append(result)
-
-            elif instr == 'β':
-                if len(self.stack) < 1:
-                    raise IndexError("Stack underflow: β expects condition on stack")
-                if len(self.control) < 2:
-                    raise IndexError("β expects 2 control structures (then, else)")
+                elif instr == 'aug':
+                    if len(self.stack) < 2:
+                        raise IndexError("Stack underflow on aug")
+                    element = self.stack.pop()
+                    base = self.stack.pop()
+                    result = self.apply_builtin('aug', [base, element])
+                    self.stack.append(result)
+
+                elif instr == 'β':
+                    if len(self.stack) < 1:
+                        raise IndexError("Stack underflow: β expects condition on stack")
+                    if len(self.control) < 2:
+                        raise IndexError("β expects 2 control structures (then, else)")
                     
-                condition = self.stack.pop()
-                else_delta = self.control.pop()  # else branch
-                then_delta = self.control.pop()  # then branch
+                    condition = self.stack.pop()
+                    else_delta = self.control.pop()  # else branch
+                    then_delta = self.control.pop()  # then branch
                 
-                if condition == 'true':
-                    # Execute then branch
-                    if then_delta.startswith('δ'):
-                        delta_id = int(then_delta[1:])
-                        self.control.extend(reversed(self.control_structures[delta_id]))
+                    if condition == 'true':
+                        # Execute then branch
+                        if then_delta.startswith('δ'):
+                            delta_id = int(then_delta[1:])
+                            self.control.extend(reversed(self.control_structures[delta_id]))
+                        else:
+                            self.control.append(then_delta)
+                    elif condition == 'false':
+                        # Execute else branch  
+                        if else_delta.startswith('δ'):
+                            delta_id = int(else_delta[1:])
+                            self.control.extend(reversed(self.control_structures[delta_id]))
+                        else:
+                            self.control.append(else_delta)
                     else:
-                        self.control.append(then_delta)
-                elif condition == 'false':
-                    # Execute else branch  
-                    if else_delta.startswith('δ'):
-                        delta_id = int(else_delta[1:])
-                        self.control.extend(reversed(self.control_structures[delta_id]))
-                    else:
-                        self.control.append(else_delta)
-                else:
-                    raise ValueError(f"Invalid condition for β: {condition}")
-                
-            elif instr in self.builtins:
-                self.stack.append(instr)
-            elif (instr.startswith("'") and instr.endswith("'")) or (instr.startswith('"') and instr.endswith('"')):
-                self.stack.append(instr[1:-1])
-            elif instr == '<Y*>':
-                self.stack.append('<Y*>')
-            elif instr == 'dummy':
-                self.stack.append('dummy')
-            elif instr in ['true', 'false']:
-                self.stack.append(instr)
-            elif instr == '<nil>':
-                self.stack.append([])
-                # continue
-            else:
-                # Treat as variable
-                val = self.lookup(instr)
-                self.stack.append(val)
+                        raise ValueError(f"Invalid condition for β: {condition}")
 
-        # print("\n=== FINAL STACK ===")
-        # print(self.stack)
-        print()
-        return self.stack[0] if self.stack else None
+                elif kind is Resume:
+                    break  # The function applied by call() has returned
+
+                elif instr in self.builtins:
+                    self.stack.append(instr)
+                elif (instr.startswith("'") and instr.endswith("'")) or (instr.startswith('"') and instr.endswith('"')):
+                    self.stack.append(instr[1:-1])
+                elif instr == '<Y*>':
+                    self.stack.append('<Y*>')
+                elif instr == 'dummy':
+                    self.stack.append('dummy')
+                elif instr in ['true', 'false']:
+                    self.stack.append(instr)
+                elif instr == '<nil>':
+                    self.stack.append([])
+                    # continue
+                else:
+                    # Treat as variable
+                    val = self.lookup(instr)
+                    if lazy and type(val) is Thunk:
+                        if not val.forced:
+                            self.force_thunk(val)
+                            continue
+                        val = val.value
+                    self.stack.append(val)
+        except StepLimitReached:
+            pass  # Raised by call() inside a builtin; the limit has been reported
+        finally:
+            # Kept on errors too, so the machine can be inspected; call() may have counted further
+            self.steps = max(self.steps, steps)
+        return steps
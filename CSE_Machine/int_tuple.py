@@ -0,0 +1,193 @@
+'''
+Compact representation for tuples whose components are all integers.
+
+An IntTuple is an array('q') of 64-bit integers that the machine accepts
+wherever it accepts a tuple (a list): selection, Order, Null, Istuple, aug,
+eq, Print and multi-parameter binding. A tuple expression (τ) with at
+least COMPACT_LENGTH components, all integers, builds one; aug switches a
+tuple of integers to one when it reaches COMPACT_LENGTH components and
+then appends to the array, so only that tuple is ever scanned; and the
+stdlib builtins return one for long integer results. A component that is not an integer
+or does not fit in 64 bits turns the tuple back into a list, so results
+are the same as with lists; only the memory per component drops (8 bytes
+instead of a pointer plus, above 256, a boxed int).
+
+The bulk operations below back the VAdd, VSub, VMul, Dot, VEq, VLs, VGr,
+Select and Sum builtins of CSE_Machine/stdlib.py. When NumPy is installed
+they run on the array's buffer without copying it, but only when bounds
+on the operands show the result cannot overflow 64 bits; otherwise, and
+without NumPy, they use Python loops with unbounded integers.
+'''
+
+from array import array
+
+try:
+    import numpy
+except ImportError:  # Optional; the bulk operations fall back to Python loops
+    numpy = None
+
+COMPACT_LENGTH = 16  # Shorter tuples stay lists, which are cheaper to build
+INT64_MAX = 2 ** 63 - 1
+
+
+class IntTuple(array):
+    """A tuple of integers stored as array('q'); build with IntTuple('q', values)."""
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if isinstance(other, array):
+            return array.__eq__(self, other)
+        if isinstance(other, list):
+            return self.tolist() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.tolist())  # Traces show it like any other tuple
+
+
+TUPLE_TYPES = (list, IntTuple)
+
+
+def compact(values):
+    """values as an IntTuple when it is long enough and every component is a 64-bit integer, else unchanged."""
+    if type(values) is list and len(values) >= COMPACT_LENGTH and all(type(v) is int for v in values):
+        try:
+            return IntTuple('q', values)
+        except OverflowError:
+            pass
+    return values
+
+
+def append(tup, element):
+    """tup aug element for an IntTuple."""
+    if type(element) is int:
+        result = IntTuple('q', tup)
+        try:
+            result.append(element)
+            return result
+        except OverflowError:
+            pass
+    return tup.tolist() + [element]
+
+
+def integers(name, value):
+    """Check that value is a tuple of integers; returns it."""
+    if type(value) is IntTuple:
+        return value
+    if not isinstance(value, list) or not all(type(item) is int for item in value):
+        raise TypeError(f"{name} expects a tuple of integers, got {value}")
+    return value
+
+
+def _bound(values):
+    """Largest absolute value in a sequence of integers."""
+    return max(max(values), -min(values)) if len(values) else 0
+
+
+def _vector(values):
+    """A NumPy view of an IntTuple, or None when NumPy is missing or values is a list."""
+    if numpy is None or type(values) is not IntTuple or len(values) < COMPACT_LENGTH:
+        return None
+    return numpy.frombuffer(values, dtype=numpy.int64)
+
+
+def _from_vector(vector):
+    result = IntTuple('q')
+    result.frombytes(vector.astype(numpy.int64, copy=False).tobytes())
+    return result
+
+
+def _operands(name, left, right):
+    """Checked operands of an elementwise builtin; an integer right is used for every component."""
+    left = integers(name, left)
+    if type(right) is int:
+        return left, right, abs(right)
+    right = integers(name, right)
+    if len(left) != len(right):
+        raise ValueError(f"{name} expects tuples of the same length, got {len(left)} and {len(right)}")
+    return left, right, _bound(right)
+
+
+def elementwise(name, op, left, right):
+    """
+    Apply '+', '-' or '*' to corresponding components.
+
+    Args:
+        name: Builtin name, for error messages
+        op: The operator
+        left: Tuple of integers
+        right: Tuple of integers of the same length, or an integer
+    """
+    left, right, right_bound = _operands(name, left, right)
+    left_bound = _bound(left)
+    fits = (left_bound * right_bound if op == '*' else left_bound + right_bound) <= INT64_MAX
+    a = _vector(left) if fits else None
+    b = right if type(right) is int else _vector(right)
+    if a is not None and b is not None:
+        return _from_vector(a * b if op == '*' else a + b if op == '+' else a - b)
+    others = [right] * len(left) if type(right) is int else right
+    if op == '+':
+        return compact([x + y for x, y in zip(left, others)])
+    if op == '-':
+        return compact([x - y for x, y in zip(left, others)])
+    return compact([x * y for x, y in zip(left, others)])
+
+
+def compare(name, op, left, right):
+    """Compare corresponding components with 'eq', 'ls' or 'gr'; a tuple of truth values."""
+    left, right, _ = _operands(name, left, right)
+    a = _vector(left)
+    b = right if type(right) is int else _vector(right)
+    if a is not None and b is not None:
+        verdicts = (a == b if op == 'eq' else a < b if op == 'ls' else a > b).tolist()
+    else:
+        others = [right] * len(left) if type(right) is int else right
+        if op == 'eq':
+            verdicts = [x == y for x, y in zip(left, others)]
+        elif op == 'ls':
+            verdicts = [x < y for x, y in zip(left, others)]
+        else:
+            verdicts = [x > y for x, y in zip(left, others)]
+    return ['true' if verdict else 'false' for verdict in verdicts]
+
+
+def total(values):
+    """Sum of a tuple of integers."""
+    values = integers('Sum', values)
+    a = _vector(values)
+    if a is not None and _bound(values) * len(values) <= INT64_MAX:
+        return int(a.sum())
+    return sum(values)
+
+
+def dot(left, right):
+    """Dot product of two tuples of integers of the same length."""
+    left, right, right_bound = _operands('Dot', left, right)
+    if type(right) is int:
+        raise TypeError("Dot expects two tuples")
+    a = _vector(left)
+    b = _vector(right)
+    if a is not None and b is not None and _bound(left) * right_bound * len(left) <= INT64_MAX:
+        return int(numpy.dot(a, b))
+    return sum(x * y for x, y in zip(left, right))
+
+
+def select(tup, indices):
+    """(T I1, T I2, ...): the components of tup at 1-based indices."""
+    if not isinstance(tup, TUPLE_TYPES):
+        raise TypeError(f"Select expects a tuple, got {tup}")
+    indices = integers('Select', indices)
+    if len(indices) and (min(indices) < 1 or max(indices) > len(tup)):
+        bad = next(i for i in indices if not 1 <= i <= len(tup))
+        raise IndexError(f"Index {bad} out of bounds for tuple {tup}")
+    a = _vector(tup)
+    positions = _vector(indices)
+    if a is not None and positions is not None:
+        return _from_vector(a[positions - 1])
+    return compact([tup[i - 1] for i in indices])
@@ -0,0 +1,97 @@
+'''
+Buffered, pluggable output for the CSE machine's Print builtin.
+
+A sink is anything with a write(str) method (and optionally flush()):
+sys.stdout, an open file, io.StringIO. OutputWriter collects Print output in
+memory and hands it to the sink in large chunks:
+
+    OutputWriter()                      # stdout (resolved at flush time)
+    OutputWriter(open('out.txt', 'w'))  # file
+    OutputWriter(CaptureSink())         # in-memory, for embedding/batch runs
+'''
+
+import sys
+
+from CSE_Machine.int_tuple import TUPLE_TYPES
+
+
+class StdoutSink:
+    """Writes to whatever sys.stdout is at flush time, so redirect_stdout keeps working."""
+
+    def write(self, text):
+        sys.stdout.write(text)
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+class CaptureSink:
+    """Collects output in memory."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+
+class OutputWriter:
+    def __init__(self, sink=None, buffer_size=64 * 1024):
+        self.sink = sink if sink is not None else StdoutSink()
+        self.buffer_size = buffer_size
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def write_value(self, value):
+        """
+        Write a machine value the way Print shows it. Tuples are serialized
+        piece by piece (without recursion), never as one big string.
+        """
+        if not isinstance(value, TUPLE_TYPES):
+            self.write(str(value))
+            return
+        if not value:
+            self.write('nil\n')
+            return
+
+        write = self.write
+        # Each entry is (tuple, index of the next item to write)
+        pending = [(value, 0)]
+        write('(')
+        while pending:
+            tup, i = pending.pop()
+            if i == len(tup):
+                write(')')
+                continue
+            if i:
+                write(', ')
+            pending.append((tup, i + 1))
+            item = tup[i]
+            if isinstance(item, TUPLE_TYPES):
+                write('(')
+                pending.append((item, 0))
+            else:
+                write(str(item))
+
+    def flush(self):
+        if self.parts:
+            self.sink.write(''.join(self.parts))
+            self.parts = []
+            self.size = 0
+        flush = getattr(self.sink, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def getvalue(self):
+        """Captured text, when the sink is a CaptureSink or StringIO."""
+        self.flush()
+        return self.sink.getvalue()
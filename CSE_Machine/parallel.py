@@ -0,0 +1,368 @@
+'''
+Parallel evaluation of independent tuple components.
+
+With OptimizedFlattener(parallel_tuples=True), a tuple (or the right-hand side
+of an `and` definition) with at least two components that call functions is
+compiled to one delta per component plus a 'π4,5,6' instruction. A machine
+created with parallel=ParallelEvaluator() evaluates those components in a
+process pool; without one, or whenever a component cannot safely run
+elsewhere, 'π' falls back to the same sequential order as an inline tuple.
+
+A component is evaluated outside the machine's own loop only when:
+  - nothing it can run prints: following the identifiers it mentions to the
+    closures they are bound to (and their identifiers in turn), no code
+    mentions Print and no identifier is bound to Print
+  - its result is plain data (integers, strings, truth values, tuples),
+    since closures refer to environments that only exist in the worker
+
+Pickling the environments and a round trip to the pool cost far more than a
+cheap component, and the compiler cannot tell fib 5 from fib 25. So each
+component is first run in the parent, on a side machine, for up to
+min_steps steps. Components that finish within it are done, and their steps
+count as usual. Only when two or more components are still running are
+those sent to the pool; a single heavy one gains nothing from running
+elsewhere and is finished in the parent. Either way a paused component
+carries on from where its probe stopped (its control, stack and the
+environments it created are pickled along), so no step is run twice.
+Environments a probe creates are handed to the parent afterwards, since
+thunks it forced (lazy mode) may refer to them. A tuple that turned out
+heavy goes straight to the pool the next time the same 'π' runs.
+
+Every step of every component counts against the parent's max_steps, so a
+tuple worth sending to the pool needs a budget well above the default
+(myrpal.py --max-steps). The pool pays off once each of two or more
+components takes on the order of a million steps and there are as many
+idle CPUs as components; benchmarks/parallel_bench.py measures it.
+
+If any component fails, runs out of steps or returns a function, the whole
+tuple is evaluated again in the parent, so errors, step limits and step
+counts behave as before.
+'''
+
+import os
+import pickle
+
+from CSE_Machine.cse_machine import CSEMachineExecutor, Closure, Eta, Thunk, EnvRemove, BUILTINS
+from CSE_Machine.int_tuple import IntTuple
+from CSE_Machine.output import OutputWriter, CaptureSink
+from flattener.peephole import Superinstruction
+from utils.symbols import intern
+
+PRINT_NAMES = {'Print', 'print'}
+MIN_STEPS = 20000  # Per-component work below which a worker round trip does not pay off
+
+_worker_controls = None
+
+
+def _init_worker(control_structures):
+    global _worker_controls
+    _worker_controls = control_structures
+
+
+def _is_plain(value):
+    pending = [value]
+    while pending:
+        current = pending.pop()
+        if type(current) is IntTuple:
+            continue
+        if isinstance(current, list):
+            pending.extend(current)
+        elif not isinstance(current, (int, str)):
+            return False
+    return True
+
+
+def _side_machine(control_structures, lazy, builtins):
+    return CSEMachineExecutor(control_structures, trace=False, output=OutputWriter(CaptureSink()),
+                              trailing_newline=False, lazy=lazy, builtins=builtins)
+
+
+def _start_component(machine, delta_id, env):
+    """
+    Set a side machine up to evaluate one component delta as a program of
+    its own, so step() can pause and resume it and force a lazy result.
+
+    Returns:
+        Its state (see _restore)
+    """
+    return [list(reversed(machine.control_structures[delta_id])), [], env, [], 0, None]
+
+
+def _save(machine):
+    return [machine.control, machine.stack, machine.current_env, machine.caller_envs, machine.steps,
+            machine.result_pending]
+
+
+def _restore(machine, state):
+    (machine.control, machine.stack, machine.current_env, machine.caller_envs, machine.steps,
+     machine.result_pending) = state
+    machine.step_limit_exceeded = False
+    machine.finished = False
+    machine.output = OutputWriter(CaptureSink())
+
+
+def _run_component(machine, budget):
+    """
+    Run the component a side machine was restored to, for up to budget more
+    steps (None runs it to the end or to max_steps).
+
+    Returns:
+        ((value,) or None when the tuple must be evaluated in the parent, whether it paused)
+    """
+    try:
+        if not machine.step(budget):
+            return None, True
+    except Exception:
+        return None, False
+    value = machine.result
+    if machine.step_limit_exceeded or machine.output.getvalue() or not _is_plain(value):
+        return None, False
+    return (value,), False
+
+
+def _abandon(machine, state):
+    """Drop the envs of calls a paused component will not return from on this machine."""
+    for instr in state[0]:
+        if type(instr) is EnvRemove:
+            env = machine.find_env_by_index(instr)
+            if env is not None and not env.is_removed:
+                env.set_removed(True)
+
+
+def _evaluate_component(payload, position, max_steps, lazy, builtins):
+    """Worker side: carry on with one paused component; returns (value or None, steps in all)."""
+    environments, states = pickle.loads(payload)
+    machine = _side_machine(_worker_controls, lazy, builtins)
+    machine.max_steps = max_steps
+    machine.environments = environments
+    machine.env_counter = max(env.index for env in environments) + 1
+    _restore(machine, states[position])
+    result, _ = _run_component(machine, None)
+    return result, machine.steps
+
+
+class ParallelEvaluator:
+    def __init__(self, workers=None, min_steps=MIN_STEPS):
+        """
+        Args:
+            workers: Pool size (default: the CPU count)
+            min_steps: Steps a component must take before it is worth sending to a worker
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.min_steps = min_steps
+        self.machine = None
+        self.pool = None
+        self.local = None          # Side machine that probes components in this process
+        self.heavy = set()         # 'π' component lists that needed the pool last time
+        self.delta_refs = {}       # delta id -> deltas its instructions refer to
+        self.delta_names = {}      # delta id -> identifiers it looks up
+        self.delta_prints = set()  # deltas that mention Print
+        # Statistics
+        self.tuples = 0            # Evaluated with the pool
+        self.inline = 0            # Every component finished within min_steps in this process
+        self.fallbacks = 0
+        self.worker_steps = 0
+
+    def attach(self, machine):
+        self.machine = machine
+        for delta_id, control in machine.control_structures.items():
+            refs = set()
+            names = set()
+            for instr in control:
+                if isinstance(instr, Superinstruction):
+                    if getattr(instr, 'name', None) in PRINT_NAMES:
+                        self.delta_prints.add(delta_id)  # A fused call, Print x
+                    names.update(instr.names())
+                    refs.update(instr.refs())
+                    continue
+                if not isinstance(instr, str):
+                    continue
+                if instr in PRINT_NAMES:
+                    self.delta_prints.add(delta_id)
+                elif instr.startswith('λ'):
+                    refs.add(int(instr.rsplit('^', 1)[1]))
+                elif instr.startswith('ρ'):
+                    refs.update(int(header.split('^')[1]) for header in instr.split(':', 1)[1].split(';'))
+                elif instr.startswith('δ'):
+                    refs.add(int(instr[1:]))
+                elif instr.startswith('π'):
+                    refs.update(int(d) for d in instr[1:].split(','))
+                elif instr.startswith('θ'):
+                    ref = instr[1:]
+                    if ref.isdigit():
+                        refs.add(int(ref))  # Delayed argument, runs in the same scope
+                    else:
+                        names.add(ref)
+                elif instr[0].isalpha() or instr[0] == '_':
+                    names.add(instr)  # Identifiers, plus a few operator names; extra lookups are harmless
+            self.delta_refs[delta_id] = refs
+            self.delta_names[delta_id] = names
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def reachable(self, env, component_ids):
+        """
+        Follow the identifiers the components mention to the closures they
+        can call, and the identifiers those closures mention in turn.
+
+        Returns:
+            (environments the components can reach, whether any of the code
+            they can run prints)
+        """
+        find_env = self.machine.find_env_by_index
+        environments = {}
+        seen = set()
+        pending = [(delta_id, env) for delta_id in component_ids]
+        while pending:
+            delta_id, scope = pending.pop()
+            if (delta_id, scope.index) in seen:
+                continue
+            seen.add((delta_id, scope.index))
+            if delta_id in self.delta_prints:
+                return None, True
+            current = scope
+            while current is not None and current.index not in environments:
+                environments[current.index] = current
+                current = current.parent
+            # Nested lambdas, branches and components run in (a child of) the same scope
+            pending.extend((ref, scope) for ref in self.delta_refs[delta_id])
+            for name in self.delta_names[delta_id]:
+                try:
+                    values = [scope.lookup(intern(name))]
+                except NameError:
+                    continue  # A parameter of a nested lambda, or a builtin
+                while values:
+                    value = values.pop()
+                    if isinstance(value, Eta):
+                        value = value.closure
+                    if isinstance(value, Closure):
+                        pending.append((value.delta_id, find_env(value.env_index)))
+                    elif isinstance(value, Thunk):
+                        if value.forced:
+                            values.append(value.value)
+                        else:
+                            pending.append((value.delta_id, find_env(value.env_index)))
+                    elif isinstance(value, list):
+                        values.extend(value)
+                    elif isinstance(value, str) and value in PRINT_NAMES:
+                        return None, True
+        return sorted(environments.values(), key=lambda e: e.index), False
+
+    def adopt(self, machine, local, shared):
+        """
+        Hand the environments a probe created over to the parent machine. In
+        lazy mode a probe can force a thunk the parent shares, and the memoized
+        value may be a closure over one of these environments.
+
+        Args:
+            machine: The parent executor
+            local: The side machine that ran the probe
+            shared: How many of local's environments are the parent's own
+        """
+        created = local.environments[shared:]
+        machine.environments.extend(created)
+        machine.envs_removed += sum(1 for env in created if env.is_removed)
+        machine.env_counter = local.env_counter
+        local.environments = []  # Do not keep the parent's environments alive
+
+    def evaluate_components(self, machine, component_ids, max_steps):
+        """
+        Evaluate the components of a 'π' tuple: cheap ones in this process,
+        heavy ones in the pool when there are at least two.
+
+        Args:
+            machine: The executor running the 'π' instruction
+            component_ids: Component deltas, in tuple order
+            max_steps: Steps left in the machine's budget, shared by all components
+
+        Returns:
+            (tuple, steps used); the tuple is None when the machine should
+            evaluate it sequentially instead
+        """
+        if self.workers < 2:
+            return None, 0
+        env = machine.current_env
+        environments, prints = self.reachable(env, component_ids)
+        if prints:
+            self.fallbacks += 1
+            return None, 0
+
+        # Builtins the machine was given beyond the standard ones (e.g. the native stdlib)
+        extra_builtins = {name: builtin for name, builtin in machine.builtins.items()
+                          if BUILTINS.get(name) is not builtin}
+        key = tuple(component_ids)
+        results = [None] * len(component_ids)
+        states = {}                # Position -> state of a component still to finish
+        used = 0                   # Steps of the components finished here
+        if self.local is None:
+            self.local = _side_machine(machine.control_structures, machine.lazy, extra_builtins)
+        local = self.local
+        local.environments = list(environments)
+        local.env_counter = machine.env_counter
+        try:
+            for position, delta_id in enumerate(component_ids):
+                state = _start_component(local, delta_id, env)
+                if key in self.heavy:
+                    states[position] = state  # Straight to the pool
+                    continue
+                _restore(local, state)
+                local.max_steps = max_steps - used
+                result, paused = _run_component(local, self.min_steps)
+                if paused:
+                    states[position] = _save(local)  # Heavy: a candidate for the pool
+                    continue
+                if result is None:
+                    self.fallbacks += 1
+                    return None, 0
+                results[position] = result
+                used += local.steps
+            if len(states) == 1:
+                # No other work to overlap with, so finish the one heavy component here
+                position, state = states.popitem()
+                _restore(local, state)
+                local.max_steps = max_steps - used
+                result, _ = _run_component(local, None)
+                if result is None:
+                    self.fallbacks += 1
+                    return None, 0
+                results[position] = result
+                used += local.steps
+            if not states:
+                self.inline += 1
+                return [result[0] for result in results], used
+            payload = pickle.dumps((local.environments, states), pickle.HIGHEST_PROTOCOL)
+        finally:
+            for state in states.values():
+                _abandon(local, state)
+            self.adopt(machine, local, len(environments))
+        self.heavy.add(key)
+
+        if self.pool is None:
+            from concurrent.futures import ProcessPoolExecutor  # Costs tens of ms; only once a pool is needed
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(machine.control_structures,))
+        futures = [(position, self.pool.submit(_evaluate_component, payload, position, max_steps - used,
+                                               machine.lazy, extra_builtins))
+                   for position in states]
+        failed = False
+        worker_steps = 0
+        for position, future in futures:
+            result, steps = future.result()
+            worker_steps += steps
+            if result is None:
+                failed = True
+            results[position] = result
+        self.worker_steps += worker_steps
+        used += worker_steps
+        if failed or used > max_steps:
+            # Rerun the whole tuple here, where errors and step limits surface as usual
+            self.heavy.discard(key)
+            self.fallbacks += 1
+            return None, 0
+        if used < self.min_steps * 2:
+            self.heavy.discard(key)  # Lighter this time; probe it again next time
+        self.tuples += 1
+        return [result[0] for result in results], used
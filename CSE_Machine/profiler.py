@@ -0,0 +1,296 @@
+'''
+Instruction-level and per-function execution profiler for the CSE machine.
+
+The profiler is attached through CSEMachineExecutor(profiler=...). It only
+observes the machine state before each instruction runs, so a machine without
+a profiler executes exactly the same loop as before. The machine runs the
+same fused controls as an unprofiled run (see flattener/peephole.py) and
+charges each superinstruction the steps of its expansion, as the machine does,
+so step counts match. A superinstruction is counted under its own name
+(VarApply, BuiltinApply, ...), and the calls and branches it makes are
+attributed as if its instructions had run one by one. Opcode pairs count
+dispatches rather than steps.
+
+It records:
+  - executed instructions by opcode and by the delta they came from
+  - consecutive opcode pairs (candidates for superinstructions)
+  - calls and inclusive/exclusive steps per closure, named after the
+    variable it was bound to (rec/let/where) or its lambda parameters
+  - calls and wall time per builtin
+  - inline cache hits and misses per γ call site
+  - collapsed call stacks for flame graphs (flamegraph.pl, speedscope, ...)
+'''
+
+import sys
+import time
+
+from CSE_Machine.cse_machine import Closure, Eta, CallSite, EnvRemove, Thunk, SUPERINSTRUCTIONS
+from CSE_Machine.int_tuple import TUPLE_TYPES
+from flattener.peephole import VarApply, ConstVarApply, VarConstBranch
+from utils.symbols import symbol_name
+
+BINARY_OPS = {'+', '-', '*', '/', '**', '<', '>', '<=', '>=', 'eq', 'ne', 'ls', 'gr', 'le', 'ge', 'or', '&', 'aug'}
+UNARY_OPS = {'neg', 'not'}
+CONSTANTS = {'true', 'false', 'dummy', '<nil>', '<Y*>'}
+
+
+class FunctionStats:
+    def __init__(self):
+        self.calls = 0
+        self.inclusive = 0
+        self.exclusive = 0
+
+
+class ExecutionProfiler:
+    def __init__(self):
+        self.machine = None
+        self.steps = 0
+        self.by_opcode = {}
+        self.by_delta = {}
+        self.by_pair = {}          # (previous opcode, opcode) -> count
+        self.last_op = None
+        self.functions = {}        # delta id -> FunctionStats
+        self.names = {}            # delta id -> name it was bound to
+        self.builtin_calls = {}
+        self.builtin_time = {}
+        self.collapsed = {}        # tuple of delta ids -> steps spent with that stack on top
+        self.segments = [(0, 0)]   # (delta id, control length below that delta)
+        self.frames = []           # [env index, delta id, start step, child steps]
+        self.call_path = ()
+        self.call_sites = {}       # (delta id, position) -> [hits, misses] of its inline cache
+        self.charged = None        # What the last superinstruction was charged, until it runs
+
+    def attach(self, machine):
+        self.machine = machine
+        # Instance attribute shadows the method, so only profiled machines pay for timing
+        original = machine.apply_builtin
+
+        def timed_builtin(name, arg):
+            start = time.perf_counter()
+            try:
+                return original(name, arg)
+            finally:
+                self.builtin_time[name] = self.builtin_time.get(name, 0.0) + time.perf_counter() - start
+                self.builtin_calls[name] = self.builtin_calls.get(name, 0) + 1
+        machine.apply_builtin = timed_builtin
+
+    def opcode(self, instr):
+        if type(instr) is EnvRemove:
+            return 'env_remove'
+        if isinstance(instr, int):
+            return 'int'
+        if not isinstance(instr, str):
+            return type(instr).__name__
+        head = instr[:1]
+        if head in ('λ', 'ρ', 'τ', 'δ', 'π', 'θ'):
+            return head
+        if instr.startswith('force_'):
+            return 'force'
+        if instr in ('γ', 'β') or instr in BINARY_OPS or instr in UNARY_OPS:
+            return instr
+        if instr in self.machine.builtins:
+            return 'builtin'
+        if head in ("'", '"'):
+            return 'str'
+        if instr in CONSTANTS:
+            return 'const'
+        return 'var'
+
+    def observe(self, instr):
+        """Called by the machine with each instruction just popped off the control."""
+        m = self.machine
+        kind = type(instr)
+        # A superinstruction is charged the steps of its expansion, as by the machine
+        cost = instr.cost if kind in SUPERINSTRUCTIONS else 1
+        self.steps += cost
+        control_len = len(m.control)
+
+        segments = self.segments
+        while len(segments) > 1 and control_len < segments[-1][1]:
+            segments.pop()
+        delta_id = segments[-1][0]
+        self.by_delta[delta_id] = self.by_delta.get(delta_id, 0) + cost
+        op = self.opcode(instr)
+        self.by_opcode[op] = self.by_opcode.get(op, 0) + cost
+        pair = (self.last_op, op)
+        self.by_pair[pair] = self.by_pair.get(pair, 0) + 1
+        self.last_op = op
+        self.collapsed[self.call_path] = self.collapsed.get(self.call_path, 0) + cost
+        if cost > 1:
+            self.charged = (op, delta_id, self.call_path, cost)
+
+        if op == 'γ' and len(m.stack) >= 2:
+            self._observe_call(instr, m.stack[-1], m.stack[-2], control_len)
+        elif kind is VarApply or kind is ConstVarApply:
+            # f γ and 2 T γ: the call happens at the fused site, unless the lookup is a
+            # thunk (the machine runs the expansion instead) or T is a tuple (selection)
+            func = self._peek(instr.symbol)
+            if kind is VarApply and m.stack and func is not None:
+                self._observe_call(instr.site, func, m.stack[-1], control_len)
+            elif kind is ConstVarApply and func is not None and not isinstance(func, TUPLE_TYPES):
+                self._observe_call(instr.site, func, instr.const, control_len)
+        elif kind is VarConstBranch:
+            left = self._peek(instr.symbol)
+            if left is not None:
+                condition = m.apply_binary(instr.op, left, instr.const)
+                if condition in ('true', 'false'):
+                    segments.append((instr.then_id if condition == 'true' else instr.else_id, control_len))
+        elif op == 'β' and m.stack and control_len >= 2:
+            chosen = m.control[-2] if m.stack[-1] == 'true' else m.control[-1]
+            if isinstance(chosen, str) and chosen.startswith('δ'):
+                segments.append((int(chosen[1:]), control_len - 2))
+        elif op == 'env_remove':
+            self._observe_return(int(instr))
+        elif op == 'ρ':
+            # rec f = λx. ...: the closure is named after f
+            names, headers = instr[1:].split(':')
+            for name, header in zip(names.split(','), headers.split(';')):
+                self.names.setdefault(int(header.split('^')[1]), name)
+
+    def unfused(self, instr):
+        """
+        Called by the machine when the superinstruction it just observed runs
+        as its expansion instead; the expanded instructions are observed, and
+        charged, one by one.
+        """
+        op, delta_id, path, cost = self.charged
+        self.steps -= cost
+        for counts, key in ((self.by_opcode, op), (self.by_delta, delta_id), (self.collapsed, path)):
+            counts[key] -= cost
+            if not counts[key]:
+                del counts[key]
+
+    def _peek(self, symbol):
+        """Value a fused instruction is about to look up, or None if it is an unforced thunk."""
+        m = self.machine
+        value = m.current_env.lookup(symbol)
+        if m.lazy and type(value) is Thunk:
+            return None
+        return value
+
+    def _observe_call(self, site, func, arg, control_len):
+        m = self.machine
+        if type(site) is CallSite and site.cacheable and isinstance(func, (Closure, Eta)):
+            # Same guard the machine is about to check
+            counts = self.call_sites.setdefault((site.delta_id, site.position), [0, 0])
+            counts[0 if type(func) is site.kind and func.delta_id == site.callee_delta else 1] += 1
+        if isinstance(func, Closure):
+            # Body goes on top of the env_remove marker
+            self.segments.append((func.delta_id, control_len + 1))
+            self.frames.append([m.env_counter, func.delta_id, self.steps, 0])
+            self.call_path = self.call_path + (func.delta_id,)
+            stats = self.functions.setdefault(func.delta_id, FunctionStats())
+            stats.calls += 1
+            # Passing a function to a lambda names it after the parameter (let/where)
+            if len(func.params) == 1:
+                self._name(arg, symbol_name(func.params[0]))
+            elif isinstance(arg, list):
+                for param, value in zip(func.params, arg):
+                    self._name(value, symbol_name(param))
+        elif isinstance(func, Eta):
+            # Body goes on top of the γ and env_remove markers
+            self.segments.append((func.closure.delta_id, control_len + 2))
+            self._name(func, symbol_name(func.closure.params[0]))
+
+    def _name(self, value, name):
+        if isinstance(value, Eta):
+            # rec f = Y* (λf. λx. ...): the inner lambda is the function itself
+            body = self.machine.control_structures.get(value.closure.delta_id, [])
+            if len(body) == 1 and isinstance(body[0], str) and body[0].startswith('λ'):
+                self.names.setdefault(int(body[0].split('^')[1]), name)
+        elif isinstance(value, Closure):
+            self.names.setdefault(value.delta_id, name)
+
+    def _observe_return(self, env_index):
+        if self.frames and self.frames[-1][0] == env_index:
+            self._close_frame()
+
+    def _close_frame(self):
+        _, delta_id, start, child_steps = self.frames.pop()
+        inclusive = self.steps - start
+        stats = self.functions[delta_id]
+        stats.inclusive += inclusive
+        stats.exclusive += inclusive - child_steps
+        if self.frames:
+            self.frames[-1][3] += inclusive
+        self.call_path = self.call_path[:-1]
+
+    def finish(self):
+        """Close frames left open by an early stop (step limit)."""
+        while self.frames:
+            self._close_frame()
+
+    def function_name(self, delta_id):
+        if delta_id == 0:
+            return 'main'
+        header = self._lambda_header(delta_id)
+        name = self.names.get(delta_id)
+        return f"{name} ({header})" if name else header
+
+    def _lambda_header(self, delta_id):
+        for control in self.machine.control_structures.values():
+            for instr in control:
+                if not isinstance(instr, str):
+                    continue
+                if instr.startswith('λ') and instr.endswith(f'^{delta_id}'):
+                    return instr
+                if instr.startswith('ρ'):
+                    for header in instr.split(':', 1)[1].split(';'):
+                        if header.endswith(f'^{delta_id}'):
+                            return 'λ' + header
+        return f'δ{delta_id}'
+
+    def collapsed_stacks(self):
+        """Lines in collapsed-stack format: 'main;f;g <steps>'."""
+        lines = []
+        for path, count in sorted(self.collapsed.items()):
+            frames = ['main'] + [self.function_name(d).replace(';', ',') for d in path]
+            lines.append(f"{';'.join(frames)} {count}")
+        return lines
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as out:
+            out.write('\n'.join(self.collapsed_stacks()) + '\n')
+
+    def report(self, top=10, stream=None):
+        stream = stream or sys.stderr
+        total = self.steps or 1
+        stream.write(f"\nCSE profile: {self.steps} steps\n")
+
+        stream.write("\nInstructions by opcode:\n")
+        for op, count in sorted(self.by_opcode.items(), key=lambda kv: -kv[1])[:top]:
+            stream.write(f"  {op:<14}{count:>12}{count / total * 100:>9.1f}%\n")
+
+        stream.write("\nOpcode pairs:\n")
+        dispatches = sum(self.by_pair.values()) or 1
+        for (first, second), count in sorted(self.by_pair.items(), key=lambda kv: -kv[1])[:top]:
+            stream.write(f"  {f'{first} {second}':<22}{count:>12}{count / dispatches * 100:>9.1f}%\n")
+
+        stream.write("\nInstructions by delta:\n")
+        for delta_id, count in sorted(self.by_delta.items(), key=lambda kv: -kv[1])[:top]:
+            stream.write(f"  δ{delta_id:<13}{count:>12}{count / total * 100:>9.1f}%\n")
+
+        stream.write("\nFunctions (by exclusive steps):\n")
+        stream.write(f"  {'function':<32}{'calls':>10}{'incl':>12}{'excl':>12}\n")
+        ranked = sorted(self.functions.items(), key=lambda kv: -kv[1].exclusive)[:top]
+        for delta_id, stats in ranked:
+            stream.write(f"  {self.function_name(delta_id):<32}{stats.calls:>10}"
+                         f"{stats.inclusive:>12}{stats.exclusive:>12}\n")
+
+        if self.call_sites:
+            hits = sum(h for h, _ in self.call_sites.values())
+            calls = hits + sum(m for _, m in self.call_sites.values())
+            stream.write(f"\nInline caches: {hits}/{calls} calls hit ({hits / calls * 100:.1f}%)"
+                         f" over {len(self.call_sites)} call sites\n")
+            missing = sorted(self.call_sites.items(), key=lambda kv: -kv[1][1])[:top]
+            if missing and missing[0][1][1]:
+                stream.write(f"  {'call site':<14}{'hits':>10}{'misses':>10}\n")
+                for (delta_id, position), (site_hits, misses) in missing:
+                    if misses:
+                        stream.write(f"  {f'δ{delta_id}[{position}]':<14}{site_hits:>10}{misses:>10}\n")
+
+        if self.builtin_calls:
+            stream.write("\nBuiltins:\n")
+            stream.write(f"  {'builtin':<14}{'calls':>10}{'ms':>12}\n")
+            for name, seconds in sorted(self.builtin_time.items(), key=lambda kv: -kv[1])[:top]:
+                stream.write(f"  {name:<14}{self.builtin_calls[name]:>10}{seconds * 1000:>12.3f}\n")
@@ -0,0 +1,193 @@
+'''
+Native standard library: sequence, numeric and string builtins implemented
+in Python over the machine's value representations (lists for tuples, nil
+is [], 'true'/'false' for truth values).
+
+Opt-in, so strict RPAL programs keep their meaning (an identifier with one
+of these names would otherwise be an ordinary variable):
+
+    python myrpal.py program.rpal --stdlib
+    CSEMachineExecutor(controls, builtins=STDLIB)
+
+Like the machine's own builtins they are curried, so `Map f` on its own is a
+function, and they take precedence over bindings of the same name.
+
+    Reverse T          Append T U         Range a b          Sum T
+    Product T          Min T              Max T              Map f T
+    Filter p T         Fold f z T         Split sep S        Join sep T
+    StoI S             Chars S            VAdd T U           VSub T U
+    VMul T U           Dot T U            VEq T U            VLs T U
+    VGr T U            Select T I
+
+The V builtins work on corresponding components of two tuples of integers
+of the same length; U may also be a single integer, used for every
+component. Long integer results come back as compact IntTuples, and the
+bulk builtins use NumPy when it is installed (see CSE_Machine/int_tuple.py).
+
+Map, Filter and Fold apply RPAL functions through machine.call, so those
+calls run on the machine and count against its step budget; everything
+else takes a single step however long the tuple or string is. Fold is a
+left fold with a curried function: Fold f z (a, b) is f (f z a) b.
+'''
+
+from CSE_Machine.cse_machine import Builtin
+from CSE_Machine import int_tuple
+from CSE_Machine.int_tuple import IntTuple, TUPLE_TYPES, compact, integers
+
+
+def _tuple(name, value):
+    if not isinstance(value, TUPLE_TYPES):
+        raise TypeError(f"{name} expects a tuple, got {value}")
+    return value
+
+
+def _string(name, value):
+    if not isinstance(value, str):
+        raise TypeError(f"{name} expects a string, got {value}")
+    return value
+
+
+def reverse(tup):
+    tup = _tuple('Reverse', tup)
+    if type(tup) is IntTuple:
+        result = IntTuple('q', tup)
+        result.reverse()
+        return result
+    return tup[::-1]
+
+
+def append(first, second):
+    first = _tuple('Append', first)
+    second = _tuple('Append', second)
+    if type(first) is IntTuple and type(second) is IntTuple:
+        result = IntTuple('q', first)
+        result.extend(second)
+        return result
+    return compact(list(first) + list(second))
+
+
+def range_(start, end):
+    """Range a b is (a, a+1, ..., b); nil when b < a."""
+    if type(start) is not int or type(end) is not int:
+        raise TypeError("Range expects two integers")
+    return compact(list(range(start, end + 1)))
+
+
+def product(tup):
+    result = 1
+    for item in integers('Product', tup):
+        result *= item
+    return result
+
+
+def min_(tup):
+    items = integers('Min', tup)
+    if not items:
+        raise ValueError("Min of an empty tuple")
+    return min(items)
+
+
+def max_(tup):
+    items = integers('Max', tup)
+    if not items:
+        raise ValueError("Max of an empty tuple")
+    return max(items)
+
+
+def map_(machine, func, tup):
+    return compact([machine.call(func, item) for item in _tuple('Map', tup)])
+
+
+def filter_(machine, predicate, tup):
+    kept = []
+    for item in _tuple('Filter', tup):
+        verdict = machine.call(predicate, item)
+        if verdict == 'true':
+            kept.append(item)
+        elif verdict != 'false':
+            raise TypeError(f"Filter predicate must return a truth value, got {verdict}")
+    return compact(kept)
+
+
+def fold(machine, func, initial, tup):
+    accumulator = initial
+    for item in _tuple('Fold', tup):
+        accumulator = machine.call(machine.call(func, accumulator), item)
+    return accumulator
+
+
+def split(separator, text):
+    separator = _string('Split', separator)
+    text = _string('Split', text)
+    if not separator:
+        return list(text)
+    return text.split(separator)
+
+
+def join(separator, tup):
+    separator = _string('Join', separator)
+    items = _tuple('Join', tup)
+    if not all(isinstance(item, str) for item in items):
+        raise TypeError(f"Join expects a tuple of strings, got {tup}")
+    return separator.join(items)
+
+
+def stoi(text):
+    try:
+        return int(_string('StoI', text))
+    except ValueError:
+        raise TypeError(f"StoI expects a string of digits, got {text}")
+
+
+def chars(text):
+    return list(_string('Chars', text))
+
+
+def vadd(left, right):
+    return int_tuple.elementwise('VAdd', '+', left, right)
+
+
+def vsub(left, right):
+    return int_tuple.elementwise('VSub', '-', left, right)
+
+
+def vmul(left, right):
+    return int_tuple.elementwise('VMul', '*', left, right)
+
+
+def veq(left, right):
+    return int_tuple.compare('VEq', 'eq', left, right)
+
+
+def vls(left, right):
+    return int_tuple.compare('VLs', 'ls', left, right)
+
+
+def vgr(left, right):
+    return int_tuple.compare('VGr', 'gr', left, right)
+
+
+STDLIB = {builtin.name: builtin for builtin in (
+    Builtin('Reverse', 1, reverse),
+    Builtin('Append', 2, append),
+    Builtin('Range', 2, range_),
+    Builtin('Sum', 1, int_tuple.total),
+    Builtin('Product', 1, product),
+    Builtin('Min', 1, min_),
+    Builtin('Max', 1, max_),
+    Builtin('Map', 2, map_, needs_machine=True),
+    Builtin('Filter', 2, filter_, needs_machine=True),
+    Builtin('Fold', 3, fold, needs_machine=True),
+    Builtin('Split', 2, split),
+    Builtin('Join', 2, join),
+    Builtin('StoI', 1, stoi),
+    Builtin('Chars', 1, chars),
+    Builtin('VAdd', 2, vadd),
+    Builtin('VSub', 2, vsub),
+    Builtin('VMul', 2, vmul),
+    Builtin('Dot', 2, int_tuple.dot),
+    Builtin('VEq', 2, veq),
+    Builtin('VLs', 2, vls),
+    Builtin('VGr', 2, vgr),
+    Builtin('Select', 2, int_tuple.select),
+)}
@@ -0,0 +1,376 @@
+'''
+Compact execution traces for the CSE machine (-cse, --trace-file).
+
+Instead of copying the whole control and stack at every step, TraceWriter
+records what each step changed, one JSON line per step:
+
+    {"format":"rpal-cse-trace","version":1,"snapshot_every":1000}    header
+    {"step":1,"i":"γ","c":[...],"s":[...],"e":0,"envs":[0]}           snapshot
+    {"i":"x","c":[1],"s":[0,"3"],"e":2,"+":[2],"-":[1]}               delta
+    ...
+    {"index":[[1,62],[1001,48210]],"steps":1523}                      footer
+
+i is the instruction being executed. c and s are the changes to the
+control and stack since the previous step, counted from the top: how many
+entries were popped, then the entries pushed (as repr strings, the way -cse
+prints them; a value is shown as it was when pushed, so a Thunk forced
+later still reads as unforced until the next snapshot). e is the current
+environment when it changed, and + and - are
+the environments that became active or were removed. Every snapshot_every
+steps, and whenever the machine swapped its lists (evaluate_delta) or
+changed its environments outside a step, a snapshot restates the full state.
+The footer indexes the snapshots by byte offset.
+
+TraceReader rebuilds the state at any step by seeking to the nearest
+snapshot at or before it and replaying the deltas after it, so memory stays
+bounded by one state however long the run was. The footer is written when
+the program finishes; a trace without one (an interrupted run) is indexed
+by scanning it. Traces can be read back from the command line:
+
+    python -m CSE_Machine.trace trace.jsonl [--steps 1000:1010]
+'''
+
+import argparse
+import bisect
+import io
+import json
+import sys
+
+FORMAT = 'rpal-cse-trace'
+VERSION = 1
+SNAPSHOT_EVERY = 1000
+
+
+class TrackedList(list):
+    """
+    The machine's control or stack while it is traced: remembers the lowest
+    length it had since the last record, so a step's change is everything
+    above that mark.
+    """
+    __slots__ = ('low',)
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.low = len(self)
+
+    def pop(self, index=-1):
+        value = super().pop(index)
+        if index < 0:
+            index += len(self) + 1
+        if index < self.low:
+            self.low = index
+        return value
+
+
+def _rewrites(method):
+    def rewrite(self, *args, **kwargs):
+        self.low = 0  # Anything but a pop may change any entry; the next record restates the list
+        return method(self, *args, **kwargs)
+    return rewrite
+
+
+for _name in ('__setitem__', '__delitem__', 'insert', 'remove', 'clear', 'reverse', 'sort'):
+    setattr(TrackedList, _name, _rewrites(getattr(list, _name)))
+
+
+class TraceWriter:
+    def __init__(self, machine, out=None, snapshot_every=SNAPSHOT_EVERY):
+        """
+        Args:
+            machine: The CSEMachineExecutor to record
+            out: A path, a binary stream, or None to keep the trace in memory
+            snapshot_every: Steps between full snapshots
+        """
+        self.machine = machine
+        self.path = out if isinstance(out, str) else None
+        self.out = open(out, 'wb') if self.path is not None else out if out is not None else io.BytesIO()
+        self.snapshot_every = snapshot_every
+        self.encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        self.offset = 0              # Bytes written
+        self.steps = 0
+        self.index = []              # (step, offset) of every snapshot
+        self.reposition = False      # A reader moved the shared stream
+        self.finished = False
+        # What the last record described
+        self.control = None
+        self.stack = None
+        self.control_length = 0
+        self.stack_length = 0
+        self.environments = None
+        self.seen = 0                # Environments already reported
+        self.removed = 0             # machine.envs_removed at the last record
+        self.env = None
+        self.live = {}               # Active env indices, in creation order
+        self.previous = None         # Last instruction recorded
+        self.snapshot_step = 0
+        self.write({'format': FORMAT, 'version': VERSION, 'snapshot_every': snapshot_every})
+
+    def write(self, record):
+        if self.reposition:
+            self.out.seek(self.offset)
+            self.reposition = False
+        data = (self.encode(record) + '\n').encode('utf-8')
+        self.out.write(data)
+        self.offset += len(data)
+
+    def record(self, instr):
+        """Step hook: called by the machine with each instruction just popped off the control."""
+        self.steps += 1
+        entry = None
+        if self.steps - self.snapshot_step < self.snapshot_every:
+            entry = self._delta(instr)
+        if entry is None:
+            self._snapshot(instr)
+        else:
+            self.write(entry)
+        self.previous = instr
+
+    def _in_sync(self):
+        """Whether the machine's lists and environments are the ones the last record described."""
+        m = self.machine
+        return (m.control is self.control and m.stack is self.stack and m.environments is self.environments
+                and len(m.environments) >= self.seen)
+
+    def _removed_env(self):
+        """
+        Index of the env removed by the last step, None if none was, or False
+        when envs were removed some other way (outside a step).
+        """
+        m = self.machine
+        if m.envs_removed == self.removed:
+            return None
+        # Only an env_remove marker (an int) removes an env during a step
+        previous = self.previous
+        if m.envs_removed != self.removed + 1 or not isinstance(previous, int) or previous not in self.live:
+            return False
+        return int(previous)
+
+    def _new_envs(self):
+        """Indices of active envs created since the last record."""
+        environments = self.machine.environments
+        added = [e.index for e in environments[self.seen:] if not e.is_removed]
+        self.seen = len(environments)
+        for index in added:
+            self.live[index] = None
+        return added
+
+    def _delta(self, instr):
+        """This step's changes, or None when only a snapshot can describe them."""
+        if not self._in_sync():
+            return None
+        removed = self._removed_env()
+        if removed is False:
+            return None
+        m = self.machine
+        entry = {'i': str(instr)}
+        control = self.control
+        low = control.low
+        entry['c'] = [self.control_length - low] + [repr(item) for item in control[low:]]
+        control.low = self.control_length = len(control)
+        stack = self.stack
+        low = stack.low
+        if low != self.stack_length or len(stack) != low:
+            entry['s'] = [self.stack_length - low] + [repr(item) for item in stack[low:]]
+            stack.low = self.stack_length = len(stack)
+        env = m.current_env.index
+        if env != self.env:
+            entry['e'] = self.env = env
+        if len(m.environments) > self.seen:
+            added = self._new_envs()
+            if added:
+                entry['+'] = added
+        if removed is not None:
+            del self.live[removed]
+            self.removed = m.envs_removed
+            entry['-'] = [removed]
+        return entry
+
+    def _snapshot(self, instr):
+        m = self.machine
+        removed = self._removed_env() if self._in_sync() else False
+        if removed is False:
+            # Wrap the machine's lists so later steps can be recorded as deltas
+            if type(m.control) is not TrackedList:
+                m.control = TrackedList(m.control)
+            if type(m.stack) is not TrackedList:
+                m.stack = TrackedList(m.stack)
+            self.control = m.control
+            self.stack = m.stack
+            self.environments = m.environments
+            self.live = {env.index: None for env in m.environments if not env.is_removed}
+            self.seen = len(m.environments)
+        else:
+            # A periodic snapshot: the active envs follow from the last record
+            self._new_envs()
+            if removed is not None:
+                del self.live[removed]
+        self.removed = m.envs_removed
+        self.control.low = self.control_length = len(self.control)
+        self.stack.low = self.stack_length = len(self.stack)
+        self.env = m.current_env.index
+        self.snapshot_step = self.steps
+        self.index.append((self.steps, self.offset))
+        self.write({'step': self.steps, 'i': str(instr),
+                    'c': [repr(item) for item in self.control], 's': [repr(item) for item in self.stack],
+                    'e': self.env, 'envs': list(self.live)})
+
+    def flush(self):
+        self.out.flush()
+
+    def finish(self):
+        """Write the snapshot index; the trace is complete."""
+        if not self.finished:
+            self.write({'index': self.index, 'steps': self.steps})
+            self.finished = True
+        self.flush()
+
+    def discard(self):
+        """Stop recording and drop what was written."""
+        if self.path is not None:
+            self.out.close()
+        else:
+            # A stream is reused by the next writer, which starts again from the beginning
+            self.out.seek(0)
+            self.out.truncate()
+        self.finished = True
+
+    def reader(self):
+        """A TraceReader over what has been written so far."""
+        self.flush()
+        if self.path is not None:
+            return TraceReader(self.path)
+        self.reposition = True  # The reader seeks the stream this writer appends to
+        return TraceReader(self.out)
+
+
+class TraceReader:
+    def __init__(self, source):
+        """
+        Args:
+            source: A path, a seekable binary stream, or bytes
+        """
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        self.stream = open(source, 'rb') if isinstance(source, str) else source
+        self.stream.seek(0)
+        self.header = json.loads(self.stream.readline())
+        if self.header.get('format') != FORMAT:
+            raise ValueError("Not a CSE machine trace")
+        self.start = self.stream.tell()
+        footer = self._footer()
+        if footer is not None:
+            self.index = [tuple(entry) for entry in footer['index']]
+            self.steps = footer['steps']
+        else:
+            self._scan()
+
+    def _footer(self):
+        stream = self.stream
+        end = stream.seek(0, io.SEEK_END)
+        size = 4096
+        while True:
+            start = max(self.start, end - size)
+            stream.seek(start)
+            tail = stream.read(end - start).rstrip(b'\n')
+            cut = tail.rfind(b'\n')
+            if cut >= 0 or start == self.start:
+                break
+            size *= 2
+        line = tail[cut + 1:]
+        return json.loads(line) if line.startswith(b'{"index"') else None
+
+    def _scan(self):
+        """Index a trace that has no footer."""
+        self.index = []
+        steps = 0
+        offset = self.start
+        self.stream.seek(offset)
+        for line in self.stream:
+            if not line.startswith(b'{"index"'):
+                steps += 1
+                if line.startswith(b'{"step"'):
+                    self.index.append((steps, offset))
+            offset += len(line)
+        self.steps = steps
+
+    def states(self, first=1, last=None):
+        """
+        Yield (step, state) for steps first..last (1-based, inclusive). A state
+        has the keys -cse prints: instr, control (top first), stack,
+        current_env and active_envs, with values as repr strings.
+        """
+        last = self.steps if last is None else min(last, self.steps)
+        first = max(first, 1)
+        if first > last or not self.index:
+            return
+        position = bisect.bisect_right(self.index, (first, float('inf'))) - 1
+        step, offset = self.index[max(position, 0)]
+        stream = self.stream
+        stream.seek(offset)
+        control, stack, live, env = [], [], {}, None
+        while step <= last:
+            line = stream.readline()
+            if not line:
+                break
+            record = json.loads(line)
+            if 'index' in record:
+                continue
+            if 'step' in record:
+                step = record['step']
+                control, stack, env = record['c'], record['s'], record['e']
+                live = dict.fromkeys(record['envs'])
+            else:
+                change = record['c']
+                del control[len(control) - change[0]:]
+                control.extend(change[1:])
+                change = record.get('s')
+                if change is not None:
+                    del stack[len(stack) - change[0]:]
+                    stack.extend(change[1:])
+                env = record.get('e', env)
+                for index in record.get('+', ()):
+                    live[index] = None
+                for index in record.get('-', ()):
+                    del live[index]
+            if step >= first:
+                yield step, {'instr': record['i'], 'control': control[::-1], 'stack': list(stack),
+                             'current_env': env, 'active_envs': [f'e{index}' for index in live]}
+            step += 1
+
+    def state(self, step):
+        """The state at one step."""
+        for _, state in self.states(step, step):
+            return state
+        raise IndexError(f"Step {step} is not in the trace (1..{self.steps})")
+
+    def close(self):
+        self.stream.close()
+
+
+def format_state(step, state):
+    """A state as -cse prints it."""
+    return (f"\nStep {step}:\n"
+            f"  Instruction: {state['instr']}\n"
+            f"  Control: [{', '.join(state['control'])}]\n"
+            f"  Stack: [{', '.join(state['stack'])}]\n"
+            f"  Current Env: e{state['current_env']}\n"
+            f"  Active Envs: {state['active_envs']}")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Print states from a compact CSE machine trace")
+    arg_parser.add_argument('path', help="Trace written with --trace-file")
+    arg_parser.add_argument('--steps', default=':', help="Step range FIRST:LAST (1-based, inclusive)")
+    args = arg_parser.parse_args(argv)
+    first, _, last = args.steps.partition(':') if ':' in args.steps else (args.steps, '', args.steps)
+    reader = TraceReader(args.path)
+    try:
+        for step, state in reader.states(int(first) if first else 1, int(last) if last else None):
+            print(format_state(step, state))
+    finally:
+        reader.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
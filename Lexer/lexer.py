@@ -1,6 +1,8 @@
 import re
 from enum import Enum
 
+from utils.symbols import SYMBOLS, intern
+
 # --- ENUM DEFINITION ---
 class TokenType(Enum):
     KEYWORD = 1
@@ -13,11 +15,12 @@ class TokenType(Enum):
 
 # --- TOKEN CLASS ---
 class MyToken:
-    def __init__(self, token_type, value):
+    def __init__(self, token_type, value, pos=None):
         if not isinstance(token_type, TokenType):
             raise ValueError("Token_Type not recgnized")
         self.type = token_type
         self.value = value
+        self.pos = pos  # Offset of the token in the source
 
     def get_type(self):
         return self.type
@@ -55,22 +58,98 @@ token_specification = [
 # Compile master pattern
 master_pattern = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in token_specification))
 
-def tokenize(code: str):
+ESCAPES = {'n': '\n', 't': '\t', '\\': '\\', "'": "'"}
+escape_pattern = re.compile(r"\\(.)")
+
+def decode_string_literal(text: str) -> str:
+    """Decode RPAL escapes (\\n, \\t, \\\\, \\') in the body of a string literal."""
+    if '\\' not in text:
+        return text
+    return escape_pattern.sub(lambda m: ESCAPES.get(m.group(1), m.group(0)), text)
+
+# Same pattern over bytes, for lexing mmap'd files without decoding them first
+master_pattern_bytes = re.compile(master_pattern.pattern.encode('ascii'))
+
+def _append_token(tokens, mo, decode=False, base=0):
+    kind = mo.lastgroup
+    if kind in ('SPACES', 'COMMENT'):
+        return  # Skip ignored tokens
+
+    if kind not in TokenType.__members__:
+        raise ValueError(f"Unknown token kind: {kind}")
+
+    value = mo.group()
+    if decode:
+        try:
+            value = value.decode('utf-8')
+        except UnicodeDecodeError as e:
+            # Point at the bad byte in the whole source, for the caller's error message
+            e.start += base + mo.start()
+            e.end += base + mo.start()
+            raise
+    token_type = TokenType[kind]
+    if token_type is TokenType.IDENTIFIER:
+        # Enter the name in the symbol table; every occurrence shares its string
+        value = SYMBOLS.names[intern(value)]
+    tokens.append(MyToken(token_type, value, base + mo.start()))
+
+def tokenize(code):
+    """
+    Tokenize RPAL source.
+
+    Args:
+        code: A str, or any bytes-like object (bytes, mmap) holding UTF-8 text
+
+    Returns:
+        The list of tokens, ending with END_OF_TOKENS
+    """
     tokens = []
-    for mo in master_pattern.finditer(code):
-        kind = mo.lastgroup
-        value = mo.group()
-        
-        if kind in ('SPACES', 'COMMENT'):
-            continue  # Skip ignored tokens
-        
-        if kind not in TokenType.__members__:
-            raise ValueError(f"Unknown token kind: {kind}")
-        
-        token_type = TokenType[kind]
-        tokens.append(MyToken(token_type, value))
-    
+    if isinstance(code, str):
+        for mo in master_pattern.finditer(code):
+            _append_token(tokens, mo)
+    else:
+        for mo in master_pattern_bytes.finditer(code):
+            _append_token(tokens, mo, decode=True)
+
     tokens.append(MyToken(TokenType.END_OF_TOKENS, '$'))
     return tokens
 
+def tokenize_stream(chunks):
+    """
+    Tokenize source text that arrives in pieces (e.g. from a pipe).
+
+    Only the unfinished tail of each chunk is kept between chunks: the last
+    match when it touches the end of the buffer (it may continue in the next
+    chunk), or everything from a string literal whose closing quote has not
+    arrived yet: an unmatched quote, or a match that only closed on an escaped
+    quote by backtracking. Tokens come out the same as tokenize() over the
+    whole text.
+
+    Args:
+        chunks: An iterable of str chunks
 
+    Returns:
+        The list of tokens, ending with END_OF_TOKENS
+    """
+    tokens = []
+    carry = ''
+    base = 0  # Source offset of the start of carry
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer = carry + chunk
+        done = 0
+        for mo in master_pattern.finditer(buffer):
+            if mo.end() == len(buffer) or "'" in buffer[done:mo.start()]:
+                break
+            if mo.lastgroup == 'STRING' and mo.group().endswith("\\'"):
+                break
+            _append_token(tokens, mo, base=base)
+            done = mo.end()
+        carry = buffer[done:]
+        base += done
+    for mo in master_pattern.finditer(carry):
+        _append_token(tokens, mo, base=base)
+
+    tokens.append(MyToken(TokenType.END_OF_TOKENS, '$'))
+    return tokens
@@ -1,20 +1,7 @@
 from Lexer.lexer import tokenize, MyToken, TokenType
-from utils.node import ASTNode 
+from utils.node import ASTNode, NodeKind, KINDS_BY_LABEL
 from enum import Enum
 
-class ASTNode:
-    def __init__(self, label, children=None):
-        self.label = label
-        self.children = children or []
-    
-    def __repr__(self):
-        return f"<{self.label}>"
-
-    def print_ast(self, level=0):
-        print('.' * level + self.label)
-        for child in self.children:
-            child.print_ast(level + 1)
-
 # class TokenType(Enum):
 #     KEYWORD = 1
 #     IDENTIFIER = 2
@@ -25,9 +12,11 @@ class ASTNode:
 #     END_OF_TOKENS = 7
 
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, store=None):
         self.tokens = tokens
         self.pos = 0
+        # Nodes are ASTNode objects, or indices when building into a TreeStore
+        self.make_node = store.add if store is not None else ASTNode
 
     def current_token(self):
         return self.tokens[self.pos] if self.pos < len(self.tokens) else None
@@ -62,7 +51,7 @@ class Parser:
             d_node = self.parse_definition()
             self.match(TokenType.KEYWORD, 'in')
             e_node = self.parse_expr()
-            return ASTNode('let', [d_node, e_node])
+            return self.make_node(NodeKind.LET, [d_node, e_node])
         elif token.type == TokenType.KEYWORD and token.value == 'fn':
             self.match(TokenType.KEYWORD, 'fn')
             vbs = []
@@ -81,7 +70,7 @@ class Parser:
             else:
                 raise SyntaxError(f"Expected '.' after function parameters")
             e_node = self.parse_expr()
-            return ASTNode('lambda', vbs + [e_node])
+            return self.make_node(NodeKind.LAMBDA, vbs + [e_node])
         else:
             return self.parse_expr_where()
 
@@ -91,7 +80,7 @@ class Parser:
         if token and token.type == TokenType.KEYWORD and token.value == 'where':
             self.match(TokenType.KEYWORD, 'where')
             dr_node = self.parse_def_rec()
-            return ASTNode('where', [t_node, dr_node])
+            return self.make_node(NodeKind.WHERE, [t_node, dr_node])
         return t_node
 
     '''
@@ -109,7 +98,7 @@ class Parser:
             while self.current_token() and self.current_token().value == ',':
                 self.match(TokenType.PUNCTUATION, ',')
                 tas.append(self.parse_tuple_aug())
-            return ASTNode('tau', tas)
+            return self.make_node(NodeKind.TAU, tas)
         return ta_node
 
     def parse_tuple_aug(self):
@@ -117,7 +106,7 @@ class Parser:
         while self.current_token() and self.current_token().type == TokenType.KEYWORD and self.current_token().value == 'aug':
             self.match(TokenType.KEYWORD, 'aug')
             tc_node2 = self.parse_tuple_cond()
-            tc_node = ASTNode('aug', [tc_node, tc_node2])
+            tc_node = self.make_node(NodeKind.AUG, [tc_node, tc_node2])
         return tc_node
 
     '''
@@ -132,7 +121,7 @@ class Parser:
             tc_node1 = self.parse_tuple_cond()
             self.match(TokenType.OPERATOR, '|')
             tc_node2 = self.parse_tuple_cond()
-            return ASTNode('->', [b_node, tc_node1, tc_node2])
+            return self.make_node(NodeKind.COND, [b_node, tc_node1, tc_node2])
         return b_node
 
     '''
@@ -149,7 +138,7 @@ class Parser:
         while self.current_token() and self.current_token().type == TokenType.KEYWORD and self.current_token().value == 'or':
             self.match(TokenType.KEYWORD, 'or')
             bt_node2 = self.parse_boolean_term()
-            bt_node = ASTNode('or', [bt_node, bt_node2])
+            bt_node = self.make_node(NodeKind.OR, [bt_node, bt_node2])
         return bt_node
 
     def parse_boolean_term(self):
@@ -157,7 +146,7 @@ class Parser:
         while self.current_token() and self.current_token().value == '&':
             self.match(TokenType.OPERATOR, '&')
             bs_node2 = self.parse_boolean_small()
-            bs_node = ASTNode('&', [bs_node, bs_node2])
+            bs_node = self.make_node(NodeKind.AMP, [bs_node, bs_node2])
         return bs_node
 
     def parse_boolean_small(self):
@@ -165,7 +154,7 @@ class Parser:
         if token and token.type == TokenType.KEYWORD and token.value == 'not':
             self.match(TokenType.KEYWORD, 'not')
             bp_node = self.parse_boolean_primary()
-            return ASTNode('not', [bp_node])
+            return self.make_node(NodeKind.NOT, [bp_node])
         return self.parse_boolean_primary()
 
     '''
@@ -185,27 +174,27 @@ class Parser:
             if token.value in ['gr', '>']:
                 self.match()  # Match either 'gr' or '>'
                 a_node2 = self.parse_arithmetic()
-                return ASTNode('gr', [a_node, a_node2])
+                return self.make_node(NodeKind.GR, [a_node, a_node2])
             elif token.value in ['ge', '>=']:
                 self.match()  # Match either 'ge' or '>='
                 a_node2 = self.parse_arithmetic()
-                return ASTNode('ge', [a_node, a_node2])
+                return self.make_node(NodeKind.GE, [a_node, a_node2])
             elif token.value in ['ls', '<']:
                 self.match()  # Match either 'ls' or '<'
                 a_node2 = self.parse_arithmetic()
-                return ASTNode('ls', [a_node, a_node2])
+                return self.make_node(NodeKind.LS, [a_node, a_node2])
             elif token.value in ['le', '<=']:
                 self.match()  # Match either 'le' or '<='
                 a_node2 = self.parse_arithmetic()
-                return ASTNode('le', [a_node, a_node2])
+                return self.make_node(NodeKind.LE, [a_node, a_node2])
             elif token.value == 'eq':
                 self.match(TokenType.KEYWORD, 'eq')
                 a_node2 = self.parse_arithmetic()
-                return ASTNode('eq', [a_node, a_node2])
+                return self.make_node(NodeKind.EQ, [a_node, a_node2])
             elif token.value == 'ne':
                 self.match(TokenType.KEYWORD, 'ne')
                 a_node2 = self.parse_arithmetic()
-                return ASTNode('ne', [a_node, a_node2])
+                return self.make_node(NodeKind.NE, [a_node, a_node2])
         return a_node
 
     '''
@@ -233,14 +222,14 @@ class Parser:
             elif token.value == '-':
                 self.match(TokenType.OPERATOR, '-')
                 at_node = self.parse_arithmetic_term()
-                return ASTNode('neg', [at_node])
+                return self.make_node(NodeKind.NEG, [at_node])
 
         at_node = self.parse_arithmetic_term()
         while self.current_token() and self.current_token().value in ['+', '-']:
             op = self.current_token().value
             self.match(TokenType.OPERATOR, op)
             at_node2 = self.parse_arithmetic_term()
-            at_node = ASTNode(op, [at_node, at_node2])
+            at_node = self.make_node(KINDS_BY_LABEL[op], [at_node, at_node2])
         return at_node
 
     def parse_arithmetic_term(self):
@@ -249,7 +238,7 @@ class Parser:
             op = self.current_token().value
             self.match(TokenType.OPERATOR, op)
             af_node2 = self.parse_arithmetic_factor()
-            af_node = ASTNode(op, [af_node, af_node2])
+            af_node = self.make_node(KINDS_BY_LABEL[op], [af_node, af_node2])
         return af_node
 
     def parse_arithmetic_factor(self):
@@ -257,7 +246,7 @@ class Parser:
         if self.current_token() and self.current_token().value == '**':
             self.match(TokenType.OPERATOR, '**')
             af_node = self.parse_arithmetic_factor()
-            return ASTNode('**', [ap_node, af_node])
+            return self.make_node(NodeKind.POWER, [ap_node, af_node])
         return ap_node
 
     def parse_arithmetic_primary(self):
@@ -268,9 +257,9 @@ class Parser:
             id_token = self.current_token()
             if id_token and id_token.type == TokenType.IDENTIFIER:
                 self.match(TokenType.IDENTIFIER)
-                id_node = ASTNode(f"<ID:{id_token.value}>")
+                id_node = self.make_node(NodeKind.ID, value=id_token.value, pos=id_token.pos)
                 r_node2 = self.parse_rator_rand()
-                r_node = ASTNode('@', [r_node, id_node, r_node2])
+                r_node = self.make_node(NodeKind.AT, [r_node, id_node, r_node2])
             else:
                 raise SyntaxError(f"Expected identifier after @ operator, got: {id_token}")
         return r_node
@@ -301,7 +290,7 @@ class Parser:
                 (next_token.type == TokenType.KEYWORD and next_token.value in ['true', 'false', 'nil', 'dummy']) or
                 (next_token.type == TokenType.PUNCTUATION and next_token.value == '(')):
                 rn_node2 = self.parse_rand()
-                rn_node = ASTNode('gamma', [rn_node, rn_node2])
+                rn_node = self.make_node(NodeKind.GAMMA, [rn_node, rn_node2])
             else:
                 break
                 
@@ -314,26 +303,26 @@ class Parser:
 
         if token.type == TokenType.IDENTIFIER:
             self.match(TokenType.IDENTIFIER)
-            return ASTNode(f"<ID:{token.value}>")
+            return self.make_node(NodeKind.ID, value=token.value, pos=token.pos)
         elif token.type == TokenType.INTEGER:
             self.match(TokenType.INTEGER)
-            return ASTNode(f"<INT:{token.value}>")
+            return self.make_node(NodeKind.INT, value=int(token.value), pos=token.pos)
         elif token.type == TokenType.STRING:
             self.match(TokenType.STRING)
-            return ASTNode(f"<STR:{token.value}>")
+            return self.make_node(NodeKind.STR, value=token.value[1:-1], pos=token.pos)
         elif token.type == TokenType.KEYWORD:
             if token.value == 'true':
                 self.match(TokenType.KEYWORD, 'true')
-                return ASTNode('true')
+                return self.make_node(NodeKind.TRUE, pos=token.pos)
             elif token.value == 'false':
                 self.match(TokenType.KEYWORD, 'false')
-                return ASTNode('false')
+                return self.make_node(NodeKind.FALSE, pos=token.pos)
             elif token.value == 'nil':
                 self.match(TokenType.KEYWORD, 'nil')
-                return ASTNode('<nil>')
+                return self.make_node(NodeKind.NIL, pos=token.pos)
             elif token.value == 'dummy':
                 self.match(TokenType.KEYWORD, 'dummy')
-                return ASTNode('dummy')
+                return self.make_node(NodeKind.DUMMY, pos=token.pos)
         elif token.type == TokenType.PUNCTUATION and token.value == '(':
             self.match(TokenType.PUNCTUATION, '(')
             e_node = self.parse_expr()
@@ -360,7 +349,7 @@ class Parser:
         if token and token.type == TokenType.KEYWORD and token.value == 'within':
             self.match(TokenType.KEYWORD, 'within')
             d_node = self.parse_definition()
-            return ASTNode('within', [da_node, d_node])
+            return self.make_node(NodeKind.WITHIN, [da_node, d_node])
         return da_node
 
     def parse_def_and(self):
@@ -370,7 +359,7 @@ class Parser:
             while self.current_token() and self.current_token().type == TokenType.KEYWORD and self.current_token().value == 'and':
                 self.match(TokenType.KEYWORD, 'and')
                 drs.append(self.parse_def_rec())
-            return ASTNode('and', drs)
+            return self.make_node(NodeKind.AND, drs)
         return dr_node
 
     def parse_def_rec(self):
@@ -378,7 +367,7 @@ class Parser:
         if token and token.type == TokenType.KEYWORD and token.value == 'rec':
             self.match(TokenType.KEYWORD, 'rec')
             db_node = self.parse_def_binding()
-            return ASTNode('rec', [db_node])
+            return self.make_node(NodeKind.REC, [db_node])
         return self.parse_def_binding()
 
     def parse_def_binding(self):
@@ -411,13 +400,13 @@ class Parser:
                 
                 self.match(TokenType.OPERATOR, '=')
                 e_node = self.parse_expr()
-                return ASTNode('function_form', [ASTNode(f"<ID:{id_token.value}>")] + vbs + [e_node])
+                return self.make_node(NodeKind.FUNCTION_FORM, [self.make_node(NodeKind.ID, value=id_token.value, pos=id_token.pos)] + vbs + [e_node])
         
         # Otherwise, it's a simple binding: Vl '=' E
         vl_node = self.parse_var_list()
         self.match(TokenType.OPERATOR, '=')
         e_node = self.parse_expr()
-        return ASTNode('=', [vl_node, e_node])
+        return self.make_node(NodeKind.BIND, [vl_node, e_node])
 
     '''
     # Variables ##############################################
@@ -430,7 +419,7 @@ class Parser:
         token = self.current_token()
         if token.type == TokenType.IDENTIFIER:
             self.match(TokenType.IDENTIFIER)
-            return ASTNode(f"<ID:{token.value}>")
+            return self.make_node(NodeKind.ID, value=token.value, pos=token.pos)
         elif token.type == TokenType.PUNCTUATION and token.value == '(':
             self.match(TokenType.PUNCTUATION, '(')
             next_token = self.current_token()
@@ -438,7 +427,7 @@ class Parser:
             # Handle empty tuple '()'
             if next_token and next_token.type == TokenType.PUNCTUATION and next_token.value == ')':
                 self.match(TokenType.PUNCTUATION, ')')
-                return ASTNode('()')
+                return self.make_node(NodeKind.EMPTY)
                 
             # Handle '(' Vl ')'
             vl_node = self.parse_var_list()
@@ -454,7 +443,7 @@ class Parser:
         if token.type != TokenType.IDENTIFIER:
             raise SyntaxError(f"Expected identifier in variable list, got: {token}")
             
-        ids.append(ASTNode(f"<ID:{token.value}>"))
+        ids.append(self.make_node(NodeKind.ID, value=token.value, pos=token.pos))
         self.match(TokenType.IDENTIFIER)
         
         # Parse comma-separated list of identifiers
@@ -463,10 +452,10 @@ class Parser:
             token = self.current_token()
             if token.type != TokenType.IDENTIFIER:
                 raise SyntaxError(f"Expected identifier after comma in variable list, got: {token}")
-            ids.append(ASTNode(f"<ID:{token.value}>"))
+            ids.append(self.make_node(NodeKind.ID, value=token.value, pos=token.pos))
             self.match(TokenType.IDENTIFIER)
             
         # If there's more than one ID, create a comma node
         if len(ids) > 1:
-            return ASTNode(',', ids)
+            return self.make_node(NodeKind.COMMA, ids)
         return ids[0]  # Just return the single ID node
\ No newline at end of file
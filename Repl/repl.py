@@ -0,0 +1,250 @@
+'''
+Interactive RPAL REPL.
+
+Definitions accumulate in a persistent top-level Environment, and each input
+is compiled incrementally: only the new tree is flattened, and its deltas are
+appended to the existing control-structure table.
+
+    rpal> rec fact n = n eq 0 -> 1 | n * fact (n - 1)
+    fact defined
+    rpal> fact 10
+    3628800
+    rpal> :time fact 20
+
+Usage:
+    python -m Repl.repl      or      python myrpal.py -repl
+'''
+
+import sys
+import time
+
+from Lexer.lexer import tokenize, TokenType
+from Parser.parser import Parser
+from Standardizer.standardizer import standardize
+from flattener.flat import OptimizedFlattener
+from CSE_Machine.cse_machine import CSEMachineExecutor, Environment
+from CSE_Machine.int_tuple import TUPLE_TYPES
+from CSE_Machine.output import OutputWriter, StdoutSink
+from utils.pipeline import format_value
+from utils.node import NodeKind
+from utils.symbols import intern
+
+HELP_TEXT = """
+Enter an RPAL expression to evaluate it, or a definition to add it to the
+top-level environment, e.g.  f x = x + 1   rec g n = ...   a = 1 and b = 2
+End a line with '\\' (or leave a construct unfinished) to continue it.
+
+Meta-commands:
+  :time [expr]     Report compile/execute time (toggles when given no expr)
+  :steps [expr]    Report the CSE step count (toggles when given no expr)
+  :trace [expr]    Print the CSE trace (toggles when given no expr)
+  :env             List top-level definitions
+  :reset           Forget all definitions
+  :help            Show this help
+  :quit            Exit
+"""
+
+
+class IncompleteInput(Exception):
+    """Raised when the input ends before the construct being parsed does."""
+
+
+class LineTrackingSink(StdoutSink):
+    """Stdout sink that remembers whether the program's output ended mid-line."""
+
+    def __init__(self):
+        self.mid_line = False
+
+    def write(self, text):
+        if text:
+            super().write(text)
+            self.mid_line = not text.endswith('\n')
+
+
+class Repl:
+    def __init__(self, max_steps=None):
+        self.max_steps = max_steps
+        self.sink = LineTrackingSink()
+        self.show_time = False
+        self.show_steps = False
+        self.show_trace = False
+        self.reset()
+
+    def reset(self):
+        self.flattener = OptimizedFlattener()
+        self.flattener.control_structures[0] = []  # Nothing to run at start-up
+        self.machine = CSEMachineExecutor(self.flattener.control_structures, max_steps=self.max_steps,
+                                          trace=False, output=OutputWriter(self.sink))
+        self.top_env = self.machine.current_env
+        self.definitions = []
+
+    def parse(self, text):
+        """
+        Parse input as a definition if possible, otherwise as an expression.
+
+        Returns:
+            ('define', tree) or ('eval', tree)
+        """
+        tokens = tokenize(text)
+        # Trailing ';' is accepted and ignored, as in the test programs
+        while len(tokens) > 1 and tokens[-2].value == ';':
+            tokens.pop(-2)
+
+        incomplete = False
+        error = None
+        for kind in ('define', 'eval'):
+            parser = Parser(tokens)
+            try:
+                tree = parser.parse_definition() if kind == 'define' else parser.parse()
+            except SyntaxError as e:
+                incomplete = incomplete or parser.current_token().type == TokenType.END_OF_TOKENS
+                error = e
+                continue
+            if parser.current_token().type == TokenType.END_OF_TOKENS:
+                return kind, tree
+            error = SyntaxError(f"Unexpected token: {parser.current_token()}")
+        if incomplete:
+            raise IncompleteInput()
+        raise error
+
+    def evaluate(self, text, show_time=None, show_steps=None, show_trace=None):
+        show_time = self.show_time if show_time is None else show_time
+        show_steps = self.show_steps if show_steps is None else show_steps
+        show_trace = self.show_trace if show_trace is None else show_trace
+
+        start = time.perf_counter()
+        kind, tree = self.parse(text)
+        standardized = standardize(tree)
+        if kind == 'define':
+            pattern, expr = standardized.children
+        else:
+            pattern, expr = None, standardized
+        delta_id = self.flattener.extend(expr)
+        compile_time = time.perf_counter() - start
+
+        self.machine.trace_enabled = show_trace
+        self.machine.reset_trace()
+        start = time.perf_counter()
+        value = self.machine.evaluate_delta(delta_id, self.top_env)
+        execute_time = time.perf_counter() - start
+        steps = self.machine.steps
+        self.end_output_line()
+
+        if self.machine.step_limit_exceeded:
+            pass  # The machine has already reported it; bind nothing
+        elif kind == 'define':
+            self.bind(pattern, value)
+        else:
+            print(format_value(value) if value is not None else '')
+
+        if show_trace:
+            self.machine.print_trace()
+        if show_steps:
+            print(f"[steps: {steps}]")
+        if show_time:
+            print(f"[compile: {compile_time * 1000:.3f} ms, execute: {execute_time * 1000:.3f} ms]")
+
+    def end_output_line(self):
+        """Finish a line the program's Print output left open, so what the REPL prints starts on its own."""
+        if self.sink.mid_line:
+            print()
+            self.sink.mid_line = False
+
+    def bind(self, pattern, value):
+        """Bind a definition's value in a new top-level environment."""
+        if pattern.kind == NodeKind.COMMA or pattern.kind == NodeKind.TAU:
+            names = [child.value for child in pattern.children]
+            if not isinstance(value, TUPLE_TYPES) or len(value) != len(names):
+                raise TypeError(f"Cannot bind {len(names)} names to {format_value(value)}")
+            values = value
+        else:
+            names, values = [pattern.value], [value]
+
+        env = Environment(self.machine.env_counter, self.top_env)
+        self.machine.env_counter += 1
+        for name, val in zip(names, values):
+            env.extend(intern(name), val)
+        self.machine.environments.append(env)
+        self.top_env = env
+        self.definitions.extend(names)
+        print(f"{', '.join(names)} defined")
+
+    def handle_meta(self, line):
+        command, _, rest = line.partition(' ')
+        rest = rest.strip()
+        if command in (':quit', ':q', ':exit'):
+            return False
+        if command == ':help':
+            print(HELP_TEXT)
+        elif command == ':reset':
+            self.reset()
+            print("Environment cleared")
+        elif command == ':env':
+            print(', '.join(dict.fromkeys(reversed(self.definitions))) or '(empty)')
+        elif command in (':time', ':steps', ':trace'):
+            option = 'show_' + command[1:]
+            if rest:
+                self.run_line(rest, **{option: True})
+            else:
+                setattr(self, option, not getattr(self, option))
+                print(f"{command[1:]} {'on' if getattr(self, option) else 'off'}")
+        else:
+            print(f"Unknown command: {command} (try :help)")
+        return True
+
+    def run_line(self, text, **options):
+        try:
+            try:
+                self.evaluate(text, **options)
+            finally:
+                self.end_output_line()  # Also before an error raised after some Print output
+        except IncompleteInput:
+            print("Error: incomplete input")
+        except (SyntaxError, NameError, TypeError, ValueError, IndexError, ZeroDivisionError) as e:
+            print(f"{type(e).__name__}: {e}")
+        except RecursionError:
+            print("RecursionError: input nested too deeply")
+
+    def loop(self):
+        print("RPAL REPL. Type :help for commands, :quit to exit.")
+        buffer = ''
+        while True:
+            try:
+                line = input('...   ' if buffer else 'rpal> ')
+            except EOFError:
+                print()
+                break
+            except KeyboardInterrupt:
+                print()
+                buffer = ''
+                continue
+
+            if not buffer and line.strip().startswith(':'):
+                if not self.handle_meta(line.strip()):
+                    break
+                continue
+
+            if line.endswith('\\'):
+                buffer += line[:-1] + '\n'
+                continue
+            buffer += line
+            if not buffer.strip():
+                buffer = ''
+                continue
+            try:
+                self.parse(buffer)
+            except IncompleteInput:
+                buffer += '\n'
+                continue
+            except SyntaxError:
+                pass
+            text, buffer = buffer, ''
+            self.run_line(text)
+
+
+def main():
+    Repl().loop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+'''
+Thin client for the RPAL fork server.
+
+Kept free of pipeline imports so that `myrpal.py --via-forkserver` pays only
+for interpreter startup and one socket round trip.
+'''
+
+import json
+import os
+import socket
+import tempfile
+
+MAX_HEADER_SIZE = 64 * 1024
+
+
+def default_socket_path():
+    """Socket path from $RPAL_FORKSERVER_SOCKET, or a per-user temp file."""
+    return os.environ.get(
+        'RPAL_FORKSERVER_SOCKET',
+        os.path.join(tempfile.gettempdir(), f"rpal-forkserver-{os.getuid()}.sock"),
+    )
+
+
+def run_via_forkserver(argv, socket_path=None):
+    """
+    Run myrpal with the given arguments inside the fork server.
+
+    Args:
+        argv: Arguments for myrpal.py (without the program name)
+        socket_path: Server socket, defaults to default_socket_path()
+
+    Returns:
+        The child's exit code, or None if no fork server is reachable
+    """
+    socket_path = socket_path or default_socket_path()
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(socket_path)
+    except (OSError, AttributeError):
+        return None
+
+    with sock:
+        header = json.dumps({'argv': argv, 'cwd': os.getcwd()}).encode('utf-8')
+        if len(header) > MAX_HEADER_SIZE:
+            raise ValueError("Fork server request is too large")
+        socket.send_fds(sock, [header], [0, 1, 2])
+
+        status = b''
+        while len(status) < 4:
+            chunk = sock.recv(4 - len(status))
+            if not chunk:
+                # Child died without reporting a status
+                return 1
+            status += chunk
+    return int.from_bytes(status, 'big', signed=True)
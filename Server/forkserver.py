@@ -0,0 +1,139 @@
+'''
+Fork server for fast RPAL CLI startup (Unix only, Python 3.9+).
+
+The server process imports the whole pipeline (Lexer, Parser, Standardizer,
+flattener, CSE_Machine) once, so the lexer regex is already compiled, and then
+forks a child per invocation. The client passes its stdin/stdout/stderr file
+descriptors over a Unix socket, so the child writes straight to the caller's
+terminal or pipes.
+
+Usage:
+    python -m Server.forkserver [--socket PATH]      # start the server
+    python myrpal.py --via-forkserver file.rpal      # run through it
+'''
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+
+from Server.forkclient import default_socket_path, MAX_HEADER_SIZE
+
+
+def run_exit_code(header):
+    """Run myrpal.main for one client; returns its exit code."""
+    import myrpal
+
+    exit_code = 0
+    try:
+        os.chdir(header['cwd'])
+        sys.argv = ['myrpal.py'] + header['argv']
+        myrpal.main()
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            exit_code = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    return exit_code
+
+
+def run_child(conn, listener, fds, message):
+    """
+    Body of a forked child: adopt the client's stdio, run myrpal.main and
+    report the exit code. Never returns: a child that fell back into serve()
+    would accept connections and finally unlink the live server's socket.
+    """
+    status = 1
+    try:
+        # Forked programs may start and wait for their own subprocesses
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        listener.close()
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        # Rebind the text layers so isatty/encoding reflect the client's streams
+        sys.stdin = open(0, 'r', closefd=False)
+        sys.stdout = open(1, 'w', closefd=False)
+        sys.stderr = open(2, 'w', closefd=False)
+        exit_code = run_exit_code(json.loads(message.decode('utf-8')))
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except OSError:
+            pass  # The client's streams went away with it
+        conn.sendall(exit_code.to_bytes(4, 'big', signed=True))
+        conn.close()
+        status = 0
+    finally:
+        # Also when the client disconnected mid-run (BrokenPipeError): there is no one left to report to
+        os._exit(status)
+
+
+def handle_connection(conn, listener):
+    message, fds, _, _ = socket.recv_fds(conn, MAX_HEADER_SIZE, 3)
+    if len(fds) != 3:
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+        return
+
+    # Nothing buffered in the server may leak into the child's output
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    pid = os.fork()
+    if pid == 0:
+        run_child(conn, listener, fds, message)
+
+    for fd in fds:
+        os.close(fd)
+    conn.close()
+
+
+def serve(socket_path):
+    # Warm everything the children need before accepting connections
+    import myrpal  # noqa: F401  (imports the full pipeline and compiles the lexer regex)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    listener.listen(64)
+
+    # Children are never waited on individually
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    print(f"RPAL fork server listening on {socket_path}", flush=True)
+    try:
+        while True:
+            conn, _ = listener.accept()
+            try:
+                handle_connection(conn, listener)
+            except OSError as e:
+                print(f"Fork server: dropped connection ({e})", file=sys.stderr)
+                conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="RPAL fork server")
+    arg_parser.add_argument('--socket', default=default_socket_path(),
+                            help="Unix socket path (default: $RPAL_FORKSERVER_SOCKET or a per-user temp path)")
+    args = arg_parser.parse_args(argv)
+    serve(args.socket)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,384 @@
+'''
+Local evaluation server for the RPAL interpreter.
+
+Keeps a pool of pre-warmed worker processes (the whole pipeline is imported
+once per worker) and serves them over HTTP bound to the loopback interface.
+
+Endpoints:
+    POST /eval     Body is JSON {"source": ..., "max_steps": ..., "timeout": ..., "lazy": ..., "stdlib": ...}
+                   or raw RPAL source text. Returns output, result and timings.
+    GET  /health   Liveness and pool status
+    GET  /metrics  Request counters and latency figures
+
+Usage:
+    python -m Server.server [--port 8765] [--workers 4] [--max-jobs 200]
+'''
+
+import argparse
+import json
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOOPBACK_HOST = '127.0.0.1'
+
+
+def worker_main(conn):
+    """
+    Worker process loop: receive jobs over the pipe and send back reports.
+    The pipeline modules are imported before the first job arrives.
+    """
+    from utils.pipeline import evaluate_source
+    conn.send({'ready': True})
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        report = evaluate_source(job['source'], max_steps=job.get('max_steps'), lazy=job.get('lazy', False),
+                                 stdlib=job.get('stdlib', False))
+        conn.send(report)
+    conn.close()
+
+
+class Worker:
+    """Handle for one pooled worker process and its pipe."""
+
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs_done = 0
+
+    def wait_ready(self, timeout):
+        if self.conn.poll(timeout):
+            return self.conn.recv().get('ready', False)
+        return False
+
+    def run_job(self, job, timeout):
+        """Send a job and wait for its report; returns None on timeout."""
+        self.conn.send(job)
+        if self.conn.poll(timeout):
+            self.jobs_done += 1
+            return self.conn.recv()
+        return None
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(0.5)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class PoolUnavailable(RuntimeError):
+    """No worker could be started for a job; the slot is retried on the next one."""
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of pre-warmed workers.
+    Workers are recycled after max_jobs jobs and replaced when they time out.
+    A slot whose replacement fails to start stays in the pool, empty, and is
+    respawned when a job next takes it, so the pool never shrinks.
+    """
+
+    def __init__(self, size=4, max_jobs=200, startup_timeout=30.0):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.startup_timeout = startup_timeout
+        self.ctx = multiprocessing.get_context()
+        self.idle = queue.Queue()
+        self.restarts = 0
+        self.lock = threading.Lock()
+        for _ in range(size):
+            self.idle.put(self._spawn())
+
+    def _spawn(self):
+        worker = Worker(self.ctx)
+        if not worker.wait_ready(self.startup_timeout):
+            worker.kill()
+            raise RuntimeError("Worker process failed to start")
+        return worker
+
+    def _replace(self, worker, kill=False):
+        """Stop worker and start another; returns None (an empty slot) if that fails."""
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        with self.lock:
+            self.restarts += 1
+        try:
+            return self._spawn()
+        except (OSError, RuntimeError):
+            return None
+
+    def submit(self, job, timeout):
+        """
+        Run a job on the next idle worker.
+
+        Returns:
+            The worker's report dict, or None if the time limit was hit
+
+        Raises:
+            PoolUnavailable: If the slot was empty and no worker could be started for it
+        """
+        worker = self.idle.get()
+        if worker is None:
+            try:
+                worker = self._spawn()
+            except (OSError, RuntimeError) as e:
+                self.idle.put(None)  # Keep the slot; the next job tries again
+                raise PoolUnavailable(f"No worker available: {e}") from e
+        try:
+            report = worker.run_job(job, timeout)
+        except (OSError, EOFError):
+            report = None
+        if report is None:
+            # Runaway or dead worker: kill it so the slot is freed immediately
+            worker = self._replace(worker, kill=True)
+        elif worker.jobs_done >= self.max_jobs:
+            worker = self._replace(worker)
+        self.idle.put(worker)
+        return report
+
+    def idle_count(self):
+        return self.idle.qsize()
+
+    def shutdown(self):
+        while not self.idle.empty():
+            worker = self.idle.get()
+            if worker is not None:
+                worker.stop()
+
+
+class Metrics:
+    """Thread-safe counters exposed by /metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.unavailable = 0
+        self.step_limit_hits = 0
+        self.in_flight = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_steps = 0
+
+    def begin(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+
+    def end(self, latency, report):
+        with self.lock:
+            self.in_flight -= 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if report is None:
+                self.timeouts += 1
+                return
+            self.completed += 1
+            self.total_steps += report['steps']
+            if report['error']:
+                self.errors += 1
+            if report['step_limit_exceeded']:
+                self.step_limit_hits += 1
+
+    def fail(self, latency):
+        """End a request that found no worker to run on."""
+        with self.lock:
+            self.in_flight -= 1
+            self.total_latency += latency
+            self.unavailable += 1
+
+    def snapshot(self):
+        with self.lock:
+            finished = self.completed + self.timeouts + self.unavailable
+            return {
+                'uptime': time.time() - self.started,
+                'requests': self.requests,
+                'completed': self.completed,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+                'unavailable': self.unavailable,
+                'step_limit_hits': self.step_limit_hits,
+                'in_flight': self.in_flight,
+                'total_steps': self.total_steps,
+                'mean_latency': self.total_latency / finished if finished else 0.0,
+                'max_latency': self.max_latency,
+            }
+
+
+class EvalRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'RPALServer/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            pool = self.server.pool
+            self._send_json(200, {
+                'status': 'ok',
+                'workers': pool.size,
+                'idle': pool.idle_count(),
+            })
+        elif self.path == '/metrics':
+            metrics = self.server.metrics.snapshot()
+            metrics['worker_restarts'] = self.server.pool.restarts
+            self._send_json(200, metrics)
+        else:
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def _limit(self, request, key, types):
+        """
+        A client-supplied limit, or the server's own when the request has none.
+
+        Raises:
+            ValueError: If the value is not a positive number of the given types
+        """
+        if key not in request:
+            return getattr(self.server, key)
+        value = request[key]
+        # bool is an int subclass, and NaN is not > 0
+        if isinstance(value, bool) or not isinstance(value, types) or not value > 0:
+            raise ValueError(f"'{key}' must be a positive {'integer' if types is int else 'number'}")
+        return value
+
+    @staticmethod
+    def _flag(request, key):
+        """
+        A client-supplied switch, False when the request has none.
+
+        Raises:
+            ValueError: If the value is not a JSON boolean
+        """
+        value = request.get(key, False)
+        if not isinstance(value, bool):
+            raise ValueError(f"'{key}' must be true or false")
+        return value
+
+    def do_POST(self):
+        if self.path != '/eval':
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            self._send_json(400, {'error': "Expected an integer Content-Length header"})
+            return
+        if length < 0:
+            self._send_json(400, {'error': "Expected an integer Content-Length header"})
+            return
+        try:
+            body = self.rfile.read(length).decode('utf-8')
+        except UnicodeDecodeError:
+            self._send_json(400, {'error': "Request body is not valid UTF-8"})
+            return
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            try:
+                request = json.loads(body)
+                source = request['source']
+            except (ValueError, KeyError, TypeError):
+                self._send_json(400, {'error': "Expected JSON object with a 'source' field"})
+                return
+            if not isinstance(source, str):
+                self._send_json(400, {'error': "'source' must be a string"})
+                return
+        else:
+            request, source = {}, body
+
+        # Clients may lower the limits but never raise them past the server's
+        try:
+            max_steps = min(self._limit(request, 'max_steps', int), self.server.max_steps)
+            timeout = min(self._limit(request, 'timeout', (int, float)), self.server.timeout)
+            lazy = self._flag(request, 'lazy')
+            stdlib = self._flag(request, 'stdlib')
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        self.server.metrics.begin()
+        start = time.perf_counter()
+        try:
+            report = self.server.pool.submit({'source': source, 'max_steps': max_steps, 'lazy': lazy,
+                                              'stdlib': stdlib}, timeout)
+        except PoolUnavailable as e:
+            self.server.metrics.fail(time.perf_counter() - start)
+            self._send_json(503, {'error': str(e)})
+            return
+        latency = time.perf_counter() - start
+        self.server.metrics.end(latency, report)
+
+        if report is None:
+            self._send_json(504, {'error': f"Time limit of {timeout}s exceeded", 'latency': latency})
+            return
+        report['latency'] = latency
+        self._send_json(200 if report['error'] is None else 422, report)
+
+
+class EvalServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port, pool, max_steps, timeout, verbose=False):
+        super().__init__((LOOPBACK_HOST, port), EvalRequestHandler)
+        self.pool = pool
+        self.metrics = Metrics()
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.verbose = verbose
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Local RPAL evaluation server")
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--workers', type=int, default=4, help="Number of pre-warmed worker processes")
+    arg_parser.add_argument('--max-jobs', type=int, default=200, help="Recycle a worker after this many jobs")
+    arg_parser.add_argument('--max-steps', type=int, default=1000000, help="Per-request CSE step limit")
+    arg_parser.add_argument('--timeout', type=float, default=10.0, help="Per-request time limit in seconds")
+    arg_parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = arg_parser.parse_args(argv)
+
+    pool = WorkerPool(size=args.workers, max_jobs=args.max_jobs)
+    server = EvalServer(args.port, pool, args.max_steps, args.timeout, args.verbose)
+    print(f"RPAL server listening on http://{LOOPBACK_HOST}:{server.server_port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
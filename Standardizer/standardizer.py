@@ -1,53 +1,69 @@
-class ASTNode:
-    def __init__(self, label, children=None):
-        self.label = label
-        self.children = children or []
-    
-    def __repr__(self):
-        return f"<{self.label}>"
+from utils.node import ASTNode, NodeKind
+
+# Binary operators that stay direct binary nodes
+DIRECT_BINARY = {NodeKind.AMP, NodeKind.OR, NodeKind.EQ, NodeKind.NE,
+                 NodeKind.GR, NodeKind.GE, NodeKind.LS, NodeKind.LE}
+# Binary operators that become curried gamma applications
+CURRIED_BINARY = {NodeKind.AUG, NodeKind.PLUS, NodeKind.MINUS,
+                  NodeKind.TIMES, NodeKind.DIVIDE, NodeKind.POWER}
+
+# Operator, -> and Y* leaves introduced by standardization carry no value or
+# position, and trees are never modified, so one shared leaf per kind is enough
+_LEAVES = {}
 
-    def print_ast(self, level=0):
-        print('.' * level + self.label)
-        for child in self.children:
-            child.print_ast(level + 1)
+def _leaf(kind):
+    leaf = _LEAVES.get(kind)
+    if leaf is None:
+        leaf = _LEAVES[kind] = ASTNode(kind)
+    return leaf
+
+def _reuse_or_rebuild(node: ASTNode, children: list) -> ASTNode:
+    """Return node itself when standardizing left every child unchanged, else a new node."""
+    for new_child, old_child in zip(children, node.children):
+        if new_child is not old_child:
+            return ASTNode(node.kind, children)
+    return node
 
 def standardize(node: ASTNode) -> ASTNode:
     """
     Complete standardization function for RPAL AST based on the pictorial grammar.
     Transforms syntactic sugar into standard forms using lambda calculus primitives.
+
+    The input tree is never modified. Subtrees that standardization leaves
+    unchanged (leaves, and nodes whose children all came back unchanged) are
+    shared with the input rather than copied, so the AST and the standardized
+    tree can be used side by side without a defensive copy.
     """
-    label = node.label
+    kind = node.kind
     children = node.children
     
     # Terminal nodes (IDs, INTs, STRs) - no transformation needed
     if not children:
-        return ASTNode(label)
+        return node
     
-    def std(child):
-        """Helper to recursively standardize child nodes"""
-        return standardize(child)
+    std = standardize
     
     # let X = E1 in E2 => gamma(lambda X. E2, E1)
-    if label == "let":
+    if kind == NodeKind.LET:
         binding = std(children[0])  # = X E1
         e2 = std(children[1])       # E2
         x = binding.children[0]     # X
         e1 = binding.children[1]    # E1
-        lam = ASTNode("lambda", [x, e2])
-        return ASTNode("gamma", [lam, e1])
+        lam = ASTNode(NodeKind.LAMBDA, [x, e2])
+        return ASTNode(NodeKind.GAMMA, [lam, e1])
     
     # where E1 where X = E2 => gamma(lambda X. E1, E2)
-    elif label == "where":
+    elif kind == NodeKind.WHERE:
         e1 = std(children[0])       # E1
         binding = std(children[1])  # = X E2
         x = binding.children[0]     # X
         e2 = binding.children[1]    # E2
-        lam = ASTNode("lambda", [x, e1])
-        return ASTNode("gamma", [lam, e2])
+        lam = ASTNode(NodeKind.LAMBDA, [x, e1])
+        return ASTNode(NodeKind.GAMMA, [lam, e2])
     
     # function_form P V+ E => = P lambda(V+, E)
     # where P is function name, V+ are parameters, E is body
-    elif label == "function_form":
+    elif kind == NodeKind.FUNCTION_FORM:
         p = std(children[0])        # Function name
         params = children[1:-1]     # Parameters V+
         e = std(children[-1])       # Body E
@@ -55,44 +71,44 @@ def standardize(node: ASTNode) -> ASTNode:
         # Create nested lambdas for multiple parameters
         lambda_expr = e
         for param in reversed(params):
-            lambda_expr = ASTNode("lambda", [std(param), lambda_expr])
+            lambda_expr = ASTNode(NodeKind.LAMBDA, [std(param), lambda_expr])
         
-        return ASTNode("=", [p, lambda_expr])
+        return ASTNode(NodeKind.BIND, [p, lambda_expr])
     
     # lambda V+ E => nested lambdas lambda(V1, lambda(V2, ...lambda(Vn, E)))
-    elif label == "lambda":
+    elif kind == NodeKind.LAMBDA:
         params = children[:-1]      # Parameters V+
         body = std(children[-1])    # Body E
         
         # Create nested lambdas from right to left
         result = body
         for param in reversed(params):
-            result = ASTNode("lambda", [std(param), result])
+            result = ASTNode(NodeKind.LAMBDA, [std(param), result])
         return result
     
     # rec X = E => = X gamma(Y*, lambda X. E)
-    elif label == "rec":
+    elif kind == NodeKind.REC:
         binding = std(children[0])  # = X E
         x = binding.children[0]     # X
         e = binding.children[1]     # E
-        lam = ASTNode("lambda", [x, e])
-        ystar = ASTNode("<Y*>", [])
-        gamma_node = ASTNode("gamma", [ystar, lam])
-        return ASTNode("=", [x, gamma_node])
+        lam = ASTNode(NodeKind.LAMBDA, [x, e])
+        ystar = _leaf(NodeKind.YSTAR)
+        gamma_node = ASTNode(NodeKind.GAMMA, [ystar, lam])
+        return ASTNode(NodeKind.BIND, [x, gamma_node])
     
     # within (X1 = E1) within (X2 = E2) => = X1 gamma(lambda X2. E2, E1)
-    # elif label == "within":
+    # elif kind == NodeKind.WITHIN:
     #     bind1 = std(children[0])    # = X1 E1
     #     bind2 = std(children[1])    # = X2 E2
     #     x1 = bind1.children[0]      # X1
     #     e1 = bind1.children[1]      # E1
     #     x2 = bind2.children[0]      # X2
     #     e2 = bind2.children[1]      # E2
-    #     lam = ASTNode("lambda", [x2, e2])
-    #     gamma_node = ASTNode("gamma", [lam, e1])
-    #     return ASTNode("=", [x1, gamma_node])
+    #     lam = ASTNode(NodeKind.LAMBDA, [x2, e2])
+    #     gamma_node = ASTNode(NodeKind.GAMMA, [lam, e1])
+    #     return ASTNode(NodeKind.BIND, [x1, gamma_node])
     
-    elif label == "within":
+    elif kind == NodeKind.WITHIN:
         bind1 = std(children[0])  # = c 3
         bind2 = std(children[1])  # = f λx.(x + c)
         x1 = bind1.children[0]
@@ -100,14 +116,14 @@ def standardize(node: ASTNode) -> ASTNode:
         x2 = bind2.children[0]
         e2 = bind2.children[1]
         # Correct: apply (λx1. e2) to e1
-        lam = ASTNode("lambda", [x1, e2])
-        gamma_node = ASTNode("gamma", [lam, e1])
+        lam = ASTNode(NodeKind.LAMBDA, [x1, e2])
+        gamma_node = ASTNode(NodeKind.GAMMA, [lam, e1])
         # x2 = (λx1. e2)(e1)
-        return ASTNode("=", [x2, gamma_node])
+        return ASTNode(NodeKind.BIND, [x2, gamma_node])
 
 
     # and (X1 = E1, X2 = E2, ...) => = tau(X1, X2, ...) tau(E1, E2, ...)
-    elif label == "and":
+    elif kind == NodeKind.AND:
         ids = []
         exprs = []
         for binding in children:
@@ -115,24 +131,24 @@ def standardize(node: ASTNode) -> ASTNode:
             ids.append(std_bind.children[0])    # Xi
             exprs.append(std_bind.children[1])  # Ei
         
-        tau_ids = ASTNode("tau", ids)
-        tau_exprs = ASTNode("tau", exprs)
-        return ASTNode("=", [tau_ids, tau_exprs])
+        tau_ids = ASTNode(NodeKind.TAU, ids)
+        tau_exprs = ASTNode(NodeKind.TAU, exprs)
+        return ASTNode(NodeKind.BIND, [tau_ids, tau_exprs])
     
     # tau E+ => tau(E+) (keep tau as-is, just standardize children)
-    elif label == "tau":
-        return ASTNode("tau", [std(child) for child in children])
+    elif kind == NodeKind.TAU:
+        return _reuse_or_rebuild(node, [std(child) for child in children])
     
     # -> B T E => gamma(gamma(gamma(->, B), T), E)
-    elif label == "->":
+    elif kind == NodeKind.COND:
         b = std(children[0])    # Boolean condition
         t = std(children[1])    # Then expression
         e = std(children[2])    # Else expression
-        arrow_op = ASTNode("->", [])
+        arrow_op = _leaf(NodeKind.COND)
         
-        return ASTNode("gamma", [
-            ASTNode("gamma", [
-                ASTNode("gamma", [arrow_op, b]),
+        return ASTNode(NodeKind.GAMMA, [
+            ASTNode(NodeKind.GAMMA, [
+                ASTNode(NodeKind.GAMMA, [arrow_op, b]),
                 t
             ]),
             e
@@ -140,83 +156,161 @@ def standardize(node: ASTNode) -> ASTNode:
     
     # @ E1 N E2 => gamma(gamma(E1, N), E2)
 
-    elif label == "@":
+    elif kind == NodeKind.AT:
         e1 = std(children[0])   # Tuple/structure
         n = std(children[1])    # Index
         e2 = std(children[2])   # Context expression
         
-        return ASTNode("gamma", [
-            ASTNode("gamma", [n, e1]),
+        return ASTNode(NodeKind.GAMMA, [
+            ASTNode(NodeKind.GAMMA, [n, e1]),
             e2
         ])
     
     # Binary operators that should remain as direct binary operations
     # These are NOT converted to curried gamma form in the original RPAL
-    elif label in {"&", "or", "eq", "ne", "gr", "ge", "ls", "le"}:
-        return ASTNode(label, [std(children[0]), std(children[1])])
+    elif kind in DIRECT_BINARY:
+        return _reuse_or_rebuild(node, [std(children[0]), std(children[1])])
     
     # Binary operators that ARE converted to curried gamma form
-    elif label in {"aug", "+", "-", "*", "/", "**"}:
+    elif kind in CURRIED_BINARY:
         e1 = std(children[0])
         e2 = std(children[1])
-        op_node = ASTNode(label, [])
+        op_node = _leaf(kind)
         
-        return ASTNode("gamma", [
-            ASTNode("gamma", [op_node, e1]),
+        return ASTNode(NodeKind.GAMMA, [
+            ASTNode(NodeKind.GAMMA, [op_node, e1]),
             e2
         ])
     
     # Unary operators: not, neg
     # Uop E => gamma(Uop, E)
-    elif label in {"not", "neg"}:
+    elif kind == NodeKind.NOT or kind == NodeKind.NEG:
         e = std(children[0])
-        op_node = ASTNode(label, [])
-        return ASTNode("gamma", [op_node, e])
-    
-    # fcn_form alternative: P V+ . E => = P lambda(V+, E)
-    # This handles the case where function parameters are followed by a dot
-    elif label == "fcn_form" and len(children) >= 3:
-        p = std(children[0])        # Function name
-        # Check if there's a dot separator
-        dot_index = -1
-        for i, child in enumerate(children[1:], 1):
-            if child.label == ".":
-                dot_index = i
-                break
-        
-        if dot_index > 0:
-            params = children[1:dot_index]      # Parameters before dot
-            body = std(children[dot_index+1])   # Expression after dot
-        else:
-            params = children[1:-1]             # All but first and last
-            body = std(children[-1])            # Last child is body
-        
-        # Create nested lambdas
-        lambda_expr = body
-        for param in reversed(params):
-            lambda_expr = ASTNode("lambda", [std(param), lambda_expr])
-        
-        return ASTNode("=", [p, lambda_expr])
+        op_node = _leaf(kind)
+        return ASTNode(NodeKind.GAMMA, [op_node, e])
     
     # Assignment: = X E => = X E (already in standard form, just standardize children)
-    elif label == "=":
-        return ASTNode("=", [std(children[0]), std(children[1])])
+    elif kind == NodeKind.BIND:
+        return _reuse_or_rebuild(node, [std(children[0]), std(children[1])])
     
     # Application: gamma E1 E2 => gamma E1 E2 (standardize children)
-    elif label == "gamma":
-        return ASTNode("gamma", [std(children[0]), std(children[1])])
-    
-    # Conditional expressions might have special handling
-    elif label == "Cond":
-        # Cond B T E => -> B T E
-        if len(children) == 3:
-            b = std(children[0])
-            t = std(children[1])
-            e = std(children[2])
-            return standardize(ASTNode("->", [b, t, e]))
-        else:
-            return ASTNode(label, [std(child) for child in children])
+    elif kind == NodeKind.GAMMA:
+        return _reuse_or_rebuild(node, [std(children[0]), std(children[1])])
     
     # Default case: recursively standardize all children
     else:
-        return ASTNode(label, [std(child) for child in children])
+        return _reuse_or_rebuild(node, [std(child) for child in children])
+
+
+def standardize_store(store, root: int) -> int:
+    """
+    Standardize a tree held in a TreeStore, using the same rules as
+    standardize(). New nodes are appended to the same store and the original
+    nodes are left as they were, so both trees stay usable; as in
+    standardize(), unchanged subtrees and operator leaves are shared rather
+    than copied. Works bottom-up with an explicit stack, so tree depth is not
+    limited by the recursion limit.
+
+    Args:
+        store: The TreeStore holding the tree
+        root: Index of the root node
+
+    Returns:
+        The index of the standardized root
+    """
+    children_of = store.children
+    done = {}  # Original index -> standardized index
+    pending = [(root, False)]
+    while pending:
+        index, expanded = pending.pop()
+        if index in done:
+            continue  # A subtree shared by several parents
+        if not expanded:
+            pending.append((index, True))
+            pending.extend((child, False) for child in children_of(index))
+            continue
+        standardized_children = [done[child] for child in children_of(index)]
+        done[index] = _standardize_stored(store, index, standardized_children)
+    return done[root]
+
+
+def _standardize_stored(store, index, children):
+    """Build the standardized form of one stored node from its standardized children."""
+    add = store.add
+    leaf = store.leaf
+    kind = store.kinds[index]
+
+    # Terminal nodes (IDs, INTs, STRs) - no transformation needed
+    if not children:
+        return index
+
+    # let X = E1 in E2 => gamma(lambda X. E2, E1)
+    if kind == NodeKind.LET:
+        x, e1 = store.children(children[0])
+        return add(NodeKind.GAMMA, [add(NodeKind.LAMBDA, [x, children[1]]), e1])
+
+    # where E1 where X = E2 => gamma(lambda X. E1, E2)
+    elif kind == NodeKind.WHERE:
+        x, e2 = store.children(children[1])
+        return add(NodeKind.GAMMA, [add(NodeKind.LAMBDA, [x, children[0]]), e2])
+
+    # function_form P V+ E => = P lambda(V+, E)
+    elif kind == NodeKind.FUNCTION_FORM:
+        lambda_expr = children[-1]
+        for param in reversed(children[1:-1]):
+            lambda_expr = add(NodeKind.LAMBDA, [param, lambda_expr])
+        return add(NodeKind.BIND, [children[0], lambda_expr])
+
+    # lambda V+ E => nested lambdas
+    elif kind == NodeKind.LAMBDA:
+        result = children[-1]
+        for param in reversed(children[:-1]):
+            result = add(NodeKind.LAMBDA, [param, result])
+        return result
+
+    # rec X = E => = X gamma(Y*, lambda X. E)
+    elif kind == NodeKind.REC:
+        x, e = store.children(children[0])
+        lam = add(NodeKind.LAMBDA, [x, e])
+        return add(NodeKind.BIND, [x, add(NodeKind.GAMMA, [leaf(NodeKind.YSTAR), lam])])
+
+    # within: x2 = (lambda x1. e2) e1
+    elif kind == NodeKind.WITHIN:
+        x1, e1 = store.children(children[0])
+        x2, e2 = store.children(children[1])
+        lam = add(NodeKind.LAMBDA, [x1, e2])
+        return add(NodeKind.BIND, [x2, add(NodeKind.GAMMA, [lam, e1])])
+
+    # and (X1 = E1, X2 = E2, ...) => = tau(X1, X2, ...) tau(E1, E2, ...)
+    elif kind == NodeKind.AND:
+        pairs = [store.children(binding) for binding in children]
+        tau_ids = add(NodeKind.TAU, [pair[0] for pair in pairs])
+        tau_exprs = add(NodeKind.TAU, [pair[1] for pair in pairs])
+        return add(NodeKind.BIND, [tau_ids, tau_exprs])
+
+    # -> B T E => gamma(gamma(gamma(->, B), T), E)
+    elif kind == NodeKind.COND:
+        b, t, e = children
+        inner = add(NodeKind.GAMMA, [leaf(NodeKind.COND), b])
+        return add(NodeKind.GAMMA, [add(NodeKind.GAMMA, [inner, t]), e])
+
+    # @ E1 N E2 => gamma(gamma(N, E1), E2)
+    elif kind == NodeKind.AT:
+        e1, n, e2 = children
+        return add(NodeKind.GAMMA, [add(NodeKind.GAMMA, [n, e1]), e2])
+
+    # Binary operators in curried gamma form
+    elif kind in CURRIED_BINARY:
+        e1, e2 = children
+        return add(NodeKind.GAMMA, [add(NodeKind.GAMMA, [leaf(kind), e1]), e2])
+
+    # Uop E => gamma(Uop, E)
+    elif kind == NodeKind.NOT or kind == NodeKind.NEG:
+        return add(NodeKind.GAMMA, [leaf(kind), children[0]])
+
+    # tau, =, gamma, direct binary operators and the rest keep their shape;
+    # the node itself is reused when every child came back unchanged
+    else:
+        if all(new == old for new, old in zip(children, store.children(index))):
+            return index
+        return add(kind, children)
@@ -0,0 +1,293 @@
+'''
+Differential execution harness for the RPAL control-structure engines.
+
+Every program in the corpus is compiled by each registered engine and run on
+the CSE machine. The harness compares result and output against the reference
+engine and reports step-count and time differences per program, so the effect
+of each flattening/engine optimization is measured instead of assumed.
+
+Engines:
+    opt    OptimizedFlattener output (reference)
+    fused  opt after the superinstruction peephole pass, as myrpal.py runs it
+    st     STFlattener output, adapted so the machine can execute it:
+           curried operators and `->` (`+ γ γ`) become small curried lambdas,
+           `Y*` becomes `<Y*>`, and integer/nil leaves become machine literals.
+           Conditional branches are compiled as nullary lambdas and only the
+           chosen one is applied, so `->` stays lazy. Direct (non-curried)
+           binary ops, which ST emits with the left operand on top as in the
+           textbook machine, are applied through the same curried lambdas.
+           Programs the adapter cannot represent (tuple parameters from
+           simultaneous definitions) are reported as skipped, not diverged.
+
+New engines are added by registering a function in ENGINES that takes source
+text and returns (control_structures, executor_kwargs), or raises
+Unrepresentable for a program it cannot compile.
+
+Usage:
+    python benchmarks/differential.py [paths ...] [--engines opt,st] [--repeats 3]
+'''
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Lexer.lexer import tokenize, decode_string_literal  # noqa: E402
+from Parser.parser import Parser  # noqa: E402
+from Standardizer.standardizer import standardize  # noqa: E402
+from flattener.flat import STFlattener, OptimizedFlattener  # noqa: E402
+from flattener.peephole import fuse_superinstructions  # noqa: E402
+from CSE_Machine.cse_machine import CSEMachineExecutor  # noqa: E402
+from CSE_Machine.output import OutputWriter, CaptureSink  # noqa: E402
+from utils.node import ASTNode, NodeKind  # noqa: E402
+from utils.pipeline import format_value  # noqa: E402
+
+DEFAULT_CORPUS = [os.path.join(ROOT, 'benchmarks', 'corpus'), os.path.join(ROOT, 'benchmarks', 'workloads')]
+DIFF_MAX_STEPS = 5_000_000
+# Other engines get a budget relative to the reference run, so a divergent
+# (e.g. non-terminating) control shape is cut off early
+RELATIVE_STEP_BUDGET = 20
+
+CURRIED_BINARY = {'+', '-', '*', '/', '**', 'aug', '&', 'or', 'eq', 'ne', 'gr', 'ge', 'ls', 'le'}
+CURRIED_UNARY = {'neg', 'not'}
+
+
+class Unrepresentable(Exception):
+    """Raised by an engine for a program it has no faithful way to compile."""
+
+
+def standardized_tree(source):
+    return standardize(Parser(tokenize(source)).parse())
+
+
+def opt_engine(source):
+    return OptimizedFlattener().flatten(standardized_tree(source)), {}
+
+
+def fused_engine(source):
+    return fuse_superinstructions(OptimizedFlattener().flatten(standardized_tree(source))), {}
+
+
+def adapt_st_controls(controls):
+    """
+    Rewrite STFlattener output into a form the CSE machine can execute.
+    Operators applied through γ become curried lambdas over fresh deltas, and
+    so do direct binary ops: the machine takes the right operand from the top
+    of the stack, and applying λx.λy to the top first restores that order.
+    """
+    adapted = {}
+    next_id = max(controls) + 1
+    operator_lambdas = {}
+
+    def operator_lambda(op):
+        nonlocal next_id
+        if op not in operator_lambdas:
+            if op == '->':
+                # λb.λt.λe. b -> t 0 | e 0: the branches arrive as nullary lambdas (adapt_st_tree)
+                outer, middle, inner, then_id, else_id = range(next_id, next_id + 5)
+                next_id += 5
+                adapted[outer] = [f'λ__t^{middle}']
+                adapted[middle] = [f'λ__e^{inner}']
+                adapted[inner] = ['__b', 'β', f'δ{else_id}', f'δ{then_id}']
+                adapted[then_id] = [0, '__t', 'γ']
+                adapted[else_id] = [0, '__e', 'γ']
+                operator_lambdas[op] = f'λ__b^{outer}'
+            elif op in CURRIED_UNARY:
+                body = next_id
+                next_id += 1
+                adapted[body] = ['__x', op]
+                operator_lambdas[op] = f'λ__x^{body}'
+            else:
+                outer, inner = next_id, next_id + 1
+                next_id += 2
+                adapted[outer] = [f'λ__y^{inner}']
+                adapted[inner] = ['__x', '__y', op]
+                operator_lambdas[op] = f'λ__x^{outer}'
+        return operator_lambdas[op]
+
+    for delta_id, control in controls.items():
+        rewritten = []
+        for i, instr in enumerate(control):
+            followed_by_gamma = i + 1 < len(control) and control[i + 1] == 'γ'
+            if followed_by_gamma and (instr in CURRIED_BINARY or instr in CURRIED_UNARY or instr == '->'):
+                rewritten.append(operator_lambda(instr))
+            elif instr in CURRIED_BINARY:
+                rewritten += [operator_lambda(instr), 'γ', 'γ']
+            elif instr == 'Y*':
+                rewritten.append('<Y*>')
+            elif instr == 'nil':
+                rewritten.append('<nil>')
+            elif isinstance(instr, str) and instr.isdigit():
+                rewritten.append(int(instr))
+            elif isinstance(instr, str) and len(instr) >= 2 and instr[0] == instr[-1] == "'":
+                # The machine expects escapes decoded at compile time
+                rewritten.append("'" + decode_string_literal(instr[1:-1]) + "'")
+            else:
+                rewritten.append(instr)
+        adapted[delta_id] = rewritten
+    return adapted
+
+
+def adapt_st_tree(node, copies=None):
+    """
+    Copy of a standardized tree in which the branches of every conditional,
+    gamma(gamma(gamma(->, B), T), E), are wrapped in nullary lambdas (λ__u. T),
+    so STFlattener emits closures and the adapted `->` runs only the chosen one.
+    Shared subtrees stay shared; the input tree is left unchanged.
+
+    Raises:
+        Unrepresentable: For a lambda with a tuple parameter, which STFlattener
+            has no header for
+    """
+    copies = {} if copies is None else copies
+    copy = copies.get(id(node))
+    if copy is not None:
+        return copy
+    if node.kind == NodeKind.LAMBDA and node.children and node.children[0].kind == NodeKind.TAU:
+        raise Unrepresentable("tuple parameter (simultaneous definitions)")
+    children = [adapt_st_tree(child, copies) for child in node.children]
+    if (node.kind == NodeKind.GAMMA and len(node.children) == 2 and
+            node.children[0].kind == NodeKind.GAMMA and len(node.children[0].children) == 2 and
+            node.children[0].children[0].kind == NodeKind.GAMMA and
+            not node.children[0].children[0].children[0].children and
+            node.children[0].children[0].children[0].kind == NodeKind.COND):
+        then_branch = children[0].children[1]
+        children[0] = ASTNode(NodeKind.GAMMA, [children[0].children[0], _nullary_lambda(then_branch)])
+        children[1] = _nullary_lambda(children[1])
+    copy = ASTNode(node.kind, children, node.value, node.pos)
+    copies[id(node)] = copy
+    return copy
+
+
+def _nullary_lambda(body):
+    return ASTNode(NodeKind.LAMBDA, [ASTNode(NodeKind.ID, value='__u'), body])
+
+
+def st_engine(source):
+    return adapt_st_controls(STFlattener().flatten(adapt_st_tree(standardized_tree(source)))), {}
+
+
+ENGINES = {
+    'opt': opt_engine,
+    'fused': fused_engine,
+    'st': st_engine,
+}
+
+
+def run_engine(engine, source, repeats, max_steps=DIFF_MAX_STEPS):
+    """Compile and run a program with one engine; returns a result dict."""
+    try:
+        controls, executor_kwargs = engine(source)
+    except Unrepresentable as e:
+        return {'skipped': str(e)}
+    except Exception as e:
+        return {'error': f"compile: {type(e).__name__}: {e}"}
+
+    best = None
+    for _ in range(repeats):
+        output = OutputWriter(CaptureSink())
+        cse = CSEMachineExecutor(controls, max_steps=max_steps, trace=False, output=output, **executor_kwargs)
+        start = time.perf_counter()
+        try:
+            value = cse.run()
+        except Exception as e:
+            return {'error': f"run: {type(e).__name__}: {e}"}
+        elapsed = time.perf_counter() - start
+        if cse.step_limit_exceeded:
+            return {'error': f"step limit ({max_steps}) exceeded"}
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        'result': format_value(value) if value is not None else None,
+        'output': output.getvalue(),
+        'steps': cse.steps,
+        'seconds': best,
+    }
+
+
+def collect_corpus(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, '*.rpal')))
+        else:
+            files.append(path)
+    return files
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Differential execution across control-structure engines")
+    arg_parser.add_argument('paths', nargs='*', default=DEFAULT_CORPUS, help="Programs or directories of .rpal files")
+    arg_parser.add_argument('--engines', default=','.join(ENGINES),
+                            help="Comma-separated engines; the first is the reference")
+    arg_parser.add_argument('--repeats', type=int, default=3, help="Best-of repeats for timing")
+    arg_parser.add_argument('-v', '--verbose', action='store_true', help="Show differing outputs")
+    args = arg_parser.parse_args(argv)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+
+    engine_names = args.engines.split(',')
+    for name in engine_names:
+        if name not in ENGINES:
+            arg_parser.error(f"Unknown engine '{name}' (available: {', '.join(ENGINES)})")
+    reference = engine_names[0]
+
+    divergent = []
+    skipped = []
+    header = f"{'program':<26}" + ''.join(f"{name + ' steps':>13}{name + ' ms':>11}" for name in engine_names)
+    print(header + '  status')
+    for path in collect_corpus(args.paths):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path) as f:
+            source = f.read()
+        runs = {reference: run_engine(ENGINES[reference], source, args.repeats)}
+        budget = DIFF_MAX_STEPS
+        if 'error' not in runs[reference]:
+            budget = max(runs[reference]['steps'] * RELATIVE_STEP_BUDGET, 10000)
+        for engine in engine_names[1:]:
+            runs[engine] = run_engine(ENGINES[engine], source, args.repeats, budget)
+
+        cells = ''
+        for engine in engine_names:
+            run = runs[engine]
+            if 'error' in run or 'skipped' in run:
+                cells += f"{'-':>13}{'-':>11}"
+            else:
+                cells += f"{run['steps']:>13}{run['seconds'] * 1000:>11.2f}"
+
+        notes = []
+        ref = runs[reference]
+        failed = 'error' in ref
+        for engine in engine_names[1:]:
+            other = runs[engine]
+            if 'skipped' in other:
+                notes.append(f"{engine}: skipped, {other['skipped']}")
+                skipped.append(f"{name} ({engine})")
+                continue
+            if 'error' in ref or 'error' in other:
+                notes.append(f"{engine}: {other.get('error') or 'reference failed: ' + ref['error']}")
+                failed = True
+                continue
+            if other['result'] != ref['result'] or other['output'] != ref['output']:
+                failed = True
+                notes.append(f"{engine}: DIVERGES")
+                if args.verbose:
+                    notes.append(f"\n    {reference}: {ref['output']!r} -> {ref['result']!r}"
+                                 f"\n    {engine}: {other['output']!r} -> {other['result']!r}\n")
+            else:
+                notes.append(f"{engine}: same, {other['steps'] / ref['steps']:.2f}x steps, "
+                             f"{other['seconds'] / ref['seconds']:.2f}x time")
+        if failed:
+            divergent.append(name)
+        print(f"{name:<26}{cells}  {'; '.join(notes) if notes else ref.get('error', 'ok')}")
+
+    print(f"\n{len(divergent)} program(s) diverged or failed" + (f": {', '.join(divergent)}" if divergent else ''))
+    if skipped:
+        print(f"{len(skipped)} run(s) skipped: {', '.join(skipped)}")
+    return 1 if divergent else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+'''
+Front-end scalability benchmark.
+
+For each generated program shape, sweeps the size geometrically and times
+tokenize, Parser.parse, standardize and OptimizedFlattener.flatten. For every
+phase it fits the growth exponent k of time ~ size^k by least squares over
+log(size) against log(time) at every completed size, so one noisy timing
+cannot decide the verdict. k close to 1 means linear and k well above 1
+means superlinear behaviour. As with timeit, garbage collection is off while
+a phase is timed, so collector pauses do not pass for superlinear growth.
+
+The parser, standardizer and flattener recurse over the tree, so nesting
+shapes stop at the recursion limit. Such sizes are reported as skipped, with
+the size and phase where they started, and leave the exit status alone;
+raise the limit with --recursion-limit to measure them. The exit status is 1
+only when a phase grows superlinearly.
+
+Usage:
+    python benchmarks/frontend_bench.py [--shapes deep_let,aug_chain] [--start 100]
+                                        [--steps 6] [--factor 2] [--json out.json]
+'''
+
+import argparse
+import gc
+import json
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Lexer.lexer import tokenize  # noqa: E402
+from Parser.parser import Parser  # noqa: E402
+from Standardizer.standardizer import standardize  # noqa: E402
+from flattener.flat import OptimizedFlattener  # noqa: E402
+from benchmarks.generate import SHAPES, generate  # noqa: E402
+
+PHASES = ('lex', 'parse', 'standardize', 'flatten')
+SUPERLINEAR_EXPONENT = 1.3
+
+
+def measure(source):
+    """Time each front-end phase once; returns (timings dict, reason for skipping or None)."""
+    timings = {}
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        tokens = tokenize(source)
+        timings['lex'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ast = Parser(tokens).parse()
+        timings['parse'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        standardized = standardize(ast)
+        timings['standardize'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        OptimizedFlattener().flatten(standardized)
+        timings['flatten'] = time.perf_counter() - start
+    except RecursionError:
+        failed = PHASES[len(timings)]
+        return timings, f"RecursionError in {failed}"
+    finally:
+        gc.enable()
+    return timings, None
+
+
+def fit_exponent(points):
+    """
+    Least-squares slope of log(time) against log(size).
+
+    Args:
+        points: (size, seconds) pairs; pairs with a zero time are left out
+
+    Returns:
+        The exponent, or None with fewer than two distinct usable sizes
+    """
+    logs = [(math.log(size), math.log(seconds)) for size, seconds in points if size > 0 and seconds > 0]
+    if len(logs) < 2:
+        return None
+    mean_x = sum(x for x, _ in logs) / len(logs)
+    mean_y = sum(y for _, y in logs) / len(logs)
+    spread = sum((x - mean_x) ** 2 for x, _ in logs)
+    if spread == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in logs) / spread
+
+
+def sweep(shape, sizes, repeats):
+    rows = []
+    for size in sizes:
+        source = generate(shape, size)
+        best = {}
+        skipped = None
+        for _ in range(repeats):
+            timings, skipped = measure(source)
+            for phase, seconds in timings.items():
+                best[phase] = min(best.get(phase, seconds), seconds)
+            if skipped:
+                break
+        rows.append({'size': size, 'bytes': len(source), 'timings': best, 'skipped': skipped})
+        if skipped:
+            break  # Larger sizes nest deeper still
+    return rows
+
+
+def print_sweep(shape, rows):
+    print(f"\n== {shape} ==")
+    print(f"{'size':>9}{'bytes':>11}" + ''.join(f"{phase + ' ms':>15}" for phase in PHASES))
+    for row in rows:
+        cells = ''.join(
+            f"{row['timings'][phase] * 1000:>15.2f}" if phase in row['timings'] else f"{'-':>15}"
+            for phase in PHASES
+        )
+        print(f"{row['size']:>9}{row['bytes']:>11}{cells}")
+        if row['skipped']:
+            print(f"{'':>9}  skipped from size {row['size']}: {row['skipped']} (see --recursion-limit)")
+
+    complete = [row for row in rows if not row['skipped']]
+    if len(complete) < 2:
+        return {}
+    print(f"{'exponent':>20}", end='')
+    fitted = {}
+    for phase in PHASES:
+        k = fit_exponent([(row['size'], row['timings'][phase]) for row in complete])
+        fitted[phase] = k
+        label = f"{k:.2f}" if k is not None else '-'
+        if k is not None and k > SUPERLINEAR_EXPONENT:
+            label += ' !'
+        print(f"{label:>15}", end='')
+    print()
+    return fitted
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Front-end scaling benchmark")
+    arg_parser.add_argument('--shapes', default=','.join(SHAPES), help="Comma-separated shape names")
+    arg_parser.add_argument('--start', type=int, default=100, help="Smallest size")
+    arg_parser.add_argument('--steps', type=int, default=6, help="Number of sizes per shape")
+    arg_parser.add_argument('--factor', type=float, default=2.0, help="Size multiplier between steps")
+    arg_parser.add_argument('--repeats', type=int, default=3, help="Best-of repeats per size")
+    arg_parser.add_argument('--recursion-limit', type=int, help="Override sys.setrecursionlimit")
+    arg_parser.add_argument('--json', help="Save the curves to this JSON file")
+    args = arg_parser.parse_args(argv)
+
+    if args.recursion_limit:
+        sys.setrecursionlimit(args.recursion_limit)
+    sizes = [int(args.start * args.factor ** i) for i in range(args.steps)]
+    results = {}
+    superlinear = []
+    for shape in args.shapes.split(','):
+        rows = sweep(shape, sizes, args.repeats)
+        fitted = print_sweep(shape, rows)
+        results[shape] = {'rows': rows, 'exponents': fitted}
+        superlinear += [f"{shape}/{phase}" for phase, k in fitted.items() if k and k > SUPERLINEAR_EXPONENT]
+
+    print(f"\nExponent = growth of time with size, fitted over all completed sizes; '!' marks > {SUPERLINEAR_EXPONENT}")
+    skipped = [f"{shape} (from size {r['size']})" for shape, res in results.items() for r in res['rows'] if r['skipped']]
+    if superlinear:
+        print(f"Superlinear: {', '.join(superlinear)}")
+    if skipped:
+        print(f"Skipped at the recursion limit: {', '.join(skipped)}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved curves to {args.json}")
+    return 1 if superlinear else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
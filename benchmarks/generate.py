@@ -0,0 +1,98 @@
+'''
+Synthetic RPAL program generator.
+
+Every shape produces a syntactically valid program that also runs on the CSE
+machine; `size` is the number of repeated elements (list items, tuple
+components, nesting levels, definitions or string characters).
+
+Usage:
+    python benchmarks/generate.py <shape> <size> [-o file.rpal]
+    python benchmarks/generate.py --list
+'''
+
+import argparse
+import sys
+
+
+def aug_chain(size):
+    """nil aug 1 aug 2 ... aug n  (left-nested aug tree of depth n)"""
+    items = ' aug '.join(str(i) for i in range(1, size + 1))
+    return f"let L = nil aug {items}\nin Print (Order L)\n"
+
+
+def wide_tuple(size):
+    """One tuple with n components."""
+    items = ', '.join(str(i) for i in range(1, size + 1))
+    return f"let T = ({items})\nin Print (Order T)\n"
+
+
+def deep_let(size):
+    """let x0 = 0 in let x1 = x0 + 1 in ... (nesting depth n)"""
+    lines = ['let x0 = 0 in']
+    lines += [f"let x{i} = x{i - 1} + 1 in" for i in range(1, size + 1)]
+    lines.append(f"Print x{size}")
+    return '\n'.join(lines) + '\n'
+
+
+def deep_where(size):
+    """(((0 + x1 where x1 = 1) + x2 where x2 = 2) ...)  (nesting depth n)"""
+    expr = '0'
+    for i in range(1, size + 1):
+        expr = f"({expr} + x{i} where x{i} = {i})"
+    return f"Print {expr}\n"
+
+
+def many_and(size):
+    """let x1 = 1 and x2 = 2 and ... and xn = n in ..."""
+    definitions = '\nand '.join(f"x{i} = {i}" for i in range(1, size + 1))
+    return f"let {definitions}\nin Print (x1, x{size})\n"
+
+
+def long_string(size):
+    """A string literal of n characters plus a few short ones."""
+    text = ''.join(chr(ord('a') + i % 26) for i in range(size))
+    return f"let S = '{text}'\nin Print (Order S, Stem S, 'end')\n"
+
+
+SHAPES = {
+    'aug_chain': aug_chain,
+    'wide_tuple': wide_tuple,
+    'deep_let': deep_let,
+    'deep_where': deep_where,
+    'many_and': many_and,
+    'long_string': long_string,
+}
+
+
+def generate(shape, size):
+    """Return the source text of a program of the given shape and size."""
+    try:
+        return SHAPES[shape](size)
+    except KeyError:
+        raise ValueError(f"Unknown shape '{shape}', expected one of: {', '.join(SHAPES)}")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Generate synthetic RPAL programs")
+    arg_parser.add_argument('shape', nargs='?', choices=sorted(SHAPES))
+    arg_parser.add_argument('size', nargs='?', type=int)
+    arg_parser.add_argument('-o', '--output', help="Write to this file instead of stdout")
+    arg_parser.add_argument('--list', action='store_true', help="List the available shapes")
+    args = arg_parser.parse_args(argv)
+
+    if args.list or args.shape is None or args.size is None:
+        for name, func in SHAPES.items():
+            print(f"{name:<14}{func.__doc__}")
+        return 0
+
+    source = generate(args.shape, args.size)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
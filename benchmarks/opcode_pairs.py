@@ -0,0 +1,84 @@
+'''
+Opcode pair and triple frequencies over the benchmark corpus.
+
+Runs every workload with an ExecutionProfiler attached and adds up which
+opcodes execute back to back. The most frequent sequences are the candidates
+for superinstructions (see flattener/peephole.py). Programs are compiled
+without the peephole pass, so the counts are over plain instructions apart
+from saturated builtin calls, which the machine always fuses (BuiltinApply).
+
+Usage:
+    python benchmarks/opcode_pairs.py [paths ...] [--top 20]
+'''
+
+import argparse
+import glob
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.pipeline import compile_source  # noqa: E402
+from CSE_Machine.cse_machine import CSEMachineExecutor  # noqa: E402
+from CSE_Machine.output import OutputWriter, CaptureSink  # noqa: E402
+from CSE_Machine.profiler import ExecutionProfiler  # noqa: E402
+
+DEFAULT_CORPUS = [os.path.join(ROOT, 'benchmarks', 'workloads')]
+MAX_STEPS = 50_000_000
+
+
+class SequenceProfiler(ExecutionProfiler):
+    """ExecutionProfiler that also counts opcode triples."""
+
+    def __init__(self):
+        super().__init__()
+        self.by_triple = {}
+        self.before_last = None
+
+    def observe(self, instr):
+        previous = self.last_op
+        super().observe(instr)
+        triple = (self.before_last, previous, self.last_op)
+        self.by_triple[triple] = self.by_triple.get(triple, 0) + 1
+        self.before_last = previous
+
+
+def collect(paths):
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, '*.rpal'))) if os.path.isdir(path) else [path]
+    return files
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Opcode sequence frequencies over a corpus")
+    arg_parser.add_argument('paths', nargs='*', default=DEFAULT_CORPUS, help="Programs or directories of .rpal files")
+    arg_parser.add_argument('--top', type=int, default=20)
+    args = arg_parser.parse_args(argv)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+
+    pairs, triples, total = {}, {}, 0
+    for path in collect(args.paths):
+        with open(path) as f:
+            controls = compile_source(f.read(), fuse=False)
+        profiler = SequenceProfiler()
+        cse = CSEMachineExecutor(controls, max_steps=MAX_STEPS, trace=False,
+                                 output=OutputWriter(CaptureSink()), profiler=profiler)
+        cse.run()
+        total += profiler.steps
+        for key, count in profiler.by_pair.items():
+            pairs[key] = pairs.get(key, 0) + count
+        for key, count in profiler.by_triple.items():
+            triples[key] = triples.get(key, 0) + count
+
+    print(f"{total} steps")
+    for title, table in (("pairs", pairs), ("triples", triples)):
+        print(f"\nMost frequent opcode {title}:")
+        for ops, count in sorted(table.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"  {' '.join(str(op) for op in ops):<30}{count:>12}{count / total * 100:>8.1f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
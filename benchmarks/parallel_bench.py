@@ -0,0 +1,89 @@
+'''
+Parallel tuple benchmark: the same tuple of independent heavy components
+run sequentially and with --parallel.
+
+Each component is a naive fib call. With N components, at least N idle
+CPUs and components of roughly a million steps or more, the parallel run
+should approach N times faster; with fewer CPUs than components, or light
+components, the probe and the pickling make it slower, which is why
+ParallelEvaluator only uses the pool for tuples whose components outlast
+min_steps.
+
+Usage:
+    python benchmarks/parallel_bench.py [--components 4] [--n 22] [--runs 3]
+'''
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Lexer.lexer import tokenize  # noqa: E402
+from Parser.parser import Parser  # noqa: E402
+from Standardizer.standardizer import standardize  # noqa: E402
+from flattener.flat import OptimizedFlattener  # noqa: E402
+from flattener.peephole import fuse_superinstructions  # noqa: E402
+from CSE_Machine.cse_machine import CSEMachineExecutor  # noqa: E402
+from CSE_Machine.output import OutputWriter, CaptureSink  # noqa: E402
+from CSE_Machine.parallel import ParallelEvaluator  # noqa: E402
+
+MAX_STEPS = 10 ** 9
+
+
+def program(components, n):
+    calls = ', '.join(f"fib {n - i % 2}" for i in range(components))
+    return f"let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in Print ({calls})"
+
+
+def time_run(controls, workers):
+    parallel = ParallelEvaluator(workers) if workers else None
+    machine = CSEMachineExecutor(controls, max_steps=MAX_STEPS, trace=False, output=OutputWriter(CaptureSink()),
+                                 parallel=parallel)
+    start = time.perf_counter()
+    try:
+        machine.run()
+    finally:
+        if parallel is not None:
+            parallel.close()
+    return time.perf_counter() - start, machine.output.getvalue(), machine.steps, parallel
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Compare sequential and parallel tuple evaluation")
+    arg_parser.add_argument('--components', type=int, default=4)
+    arg_parser.add_argument('--n', type=int, default=22, help="Argument of each fib call")
+    arg_parser.add_argument('--runs', type=int, default=3)
+    args = arg_parser.parse_args(argv)
+
+    source = program(args.components, args.n)
+    controls = fuse_superinstructions(
+        OptimizedFlattener(parallel_tuples=True).flatten(standardize(Parser(tokenize(source)).parse())))
+    sequential, parallel = [], []
+    for _ in range(args.runs):
+        seconds, expected, steps, _ = time_run(controls, None)
+        sequential.append(seconds)
+        seconds, output, parallel_steps, evaluator = time_run(controls, args.components)
+        parallel.append(seconds)
+        if (output, parallel_steps) != (expected, steps):
+            print(f"Parallel run differs: {output!r} in {parallel_steps} steps, "
+                  f"expected {expected!r} in {steps} steps")
+            return 1
+
+    cpus = os.cpu_count() or 1
+    print(f"Parallel tuple benchmark: {args.components} x fib {args.n} ({steps} steps), "
+          f"{cpus} CPU(s), {args.runs} runs each")
+    print(f"{'sequential':<12} median {statistics.median(sequential) * 1000:9.1f} ms")
+    print(f"{'parallel':<12} median {statistics.median(parallel) * 1000:9.1f} ms   "
+          f"(pool used for {evaluator.tuples} tuple(s))")
+    print(f"Speedup: {statistics.median(sequential) / statistics.median(parallel):.2f}x")
+    if cpus < args.components:
+        print(f"Note: fewer CPUs than components; expect no speedup here")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
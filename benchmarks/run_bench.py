@@ -0,0 +1,211 @@
+'''
+Runtime benchmark suite for the RPAL interpreter.
+
+Runs every workload in benchmarks/workloads through the same pipeline as
+myrpal.py (tokenize -> Parser -> standardize -> OptimizedFlattener ->
+CSEMachineExecutor), several times each, and records wall time, CSE steps,
+steps/second and tracemalloc peak memory. Results are saved as JSON and can be
+compared against an earlier run to flag regressions.
+
+Usage:
+    python benchmarks/run_bench.py run [-r 5] [-o results.json] [--baseline old.json] [-k naive]
+    python benchmarks/run_bench.py compare old.json new.json [--threshold 10]
+'''
+
+import argparse
+import datetime
+import glob
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.pipeline import compile_source  # noqa: E402
+from CSE_Machine.cse_machine import CSEMachineExecutor  # noqa: E402
+from CSE_Machine.output import OutputWriter, CaptureSink  # noqa: E402
+
+WORKLOAD_DIR = os.path.join(ROOT, 'benchmarks', 'workloads')
+BENCH_MAX_STEPS = 50_000_000
+
+
+def run_once(controls):
+    """Execute compiled controls once with output captured; returns (seconds, steps, output)."""
+    output = OutputWriter(CaptureSink())
+    cse = CSEMachineExecutor(controls, max_steps=BENCH_MAX_STEPS, trace=False, output=output)
+    start = time.perf_counter()
+    cse.run()
+    elapsed = time.perf_counter() - start
+    if cse.step_limit_exceeded:
+        raise RuntimeError("workload exceeded the benchmark step budget")
+    return elapsed, cse.steps, output.getvalue()
+
+
+def peak_memory(source):
+    """tracemalloc peak (KiB) over one full compile and run, measured separately from timing."""
+    tracemalloc.start()
+    try:
+        run_once(compile_source(source))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def bench_workload(path, repeats):
+    with open(path) as f:
+        source = f.read()
+
+    start = time.perf_counter()
+    controls = compile_source(source)
+    compile_time = time.perf_counter() - start
+
+    timings = []
+    steps = 0
+    output = ''
+    for _ in range(repeats):
+        elapsed, steps, output = run_once(controls)
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    return {
+        'compile_s': compile_time,
+        'wall_s': timings,
+        'median_s': median,
+        'min_s': min(timings),
+        'steps': steps,
+        'steps_per_s': steps / median if median else 0.0,
+        'peak_kib': peak_memory(source),
+        'output_sha1': hashlib.sha1(output.encode('utf-8')).hexdigest(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(repeats, name_filter=None):
+    results = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': git_revision(),
+            'repeats': repeats,
+        },
+        'workloads': {},
+    }
+    for path in sorted(glob.glob(os.path.join(WORKLOAD_DIR, '*.rpal'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name_filter and name_filter not in name:
+            continue
+        try:
+            entry = bench_workload(path, repeats)
+        except Exception as e:  # Keep benchmarking the rest of the corpus
+            entry = {'error': f"{type(e).__name__}: {e}"}
+            print(f"{name:<24} ERROR {entry['error']}")
+        else:
+            print(f"{name:<24}{entry['median_s'] * 1000:>10.1f} ms{entry['steps']:>11} steps"
+                  f"{entry['steps_per_s']:>12.0f} steps/s{entry['peak_kib']:>10.0f} KiB")
+        results['workloads'][name] = entry
+    return results
+
+
+def _change(old_entry, new_entry, key):
+    """Percent change of key, or None when either value is missing or the old one is not positive."""
+    before, after = old_entry.get(key), new_entry.get(key)
+    if not isinstance(before, (int, float)) or not isinstance(after, (int, float)) or before <= 0:
+        return None
+    return (after / before - 1) * 100
+
+
+def compare(old, new, threshold):
+    """
+    Print a per-workload comparison and return the names that regressed by
+    more than threshold percent (time or memory) or changed their output.
+    Rows without a usable baseline time are shown as not comparable.
+    """
+    regressions = []
+    print(f"{'workload':<24}{'old ms':>10}{'new ms':>10}{'time':>9}{'steps':>9}{'memory':>9}")
+    for name, new_entry in new['workloads'].items():
+        old_entry = old['workloads'].get(name)
+        if not old_entry or 'error' in old_entry or 'error' in new_entry:
+            print(f"{name:<24}  (not comparable)")
+            continue
+        time_change = _change(old_entry, new_entry, 'median_s')
+        if time_change is None:
+            print(f"{name:<24}  (not comparable: no baseline or new median time)")
+            continue
+        step_change = _change(old_entry, new_entry, 'steps') or 0.0
+        memory_change = _change(old_entry, new_entry, 'peak_kib') or 0.0
+        flags = []
+        if time_change > threshold:
+            flags.append('SLOWER')
+        if memory_change > threshold:
+            flags.append('MORE MEMORY')
+        if new_entry.get('output_sha1') != old_entry.get('output_sha1'):
+            flags.append('OUTPUT CHANGED')
+        if flags:
+            regressions.append(name)
+        print(f"{name:<24}{old_entry['median_s'] * 1000:>10.1f}{new_entry['median_s'] * 1000:>10.1f}"
+              f"{time_change:>+8.1f}%{step_change:>+8.1f}%{memory_change:>+8.1f}%  {' '.join(flags)}")
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="RPAL runtime benchmark suite")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    run_cmd = commands.add_parser('run', help="Run the workload corpus")
+    run_cmd.add_argument('-r', '--repeats', type=int, default=5)
+    run_cmd.add_argument('-o', '--output', help="Save results to this JSON file")
+    run_cmd.add_argument('-k', '--filter', help="Only run workloads whose name contains this text")
+    run_cmd.add_argument('--baseline', help="Compare against an earlier results file")
+    run_cmd.add_argument('--threshold', type=float, default=10.0, help="Regression threshold in percent")
+
+    compare_cmd = commands.add_parser('compare', help="Compare two results files")
+    compare_cmd.add_argument('old')
+    compare_cmd.add_argument('new')
+    compare_cmd.add_argument('--threshold', type=float, default=10.0, help="Regression threshold in percent")
+
+    args = arg_parser.parse_args(argv)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+
+    if args.command == 'run':
+        results = run_suite(args.repeats, args.filter)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"Saved results to {args.output}")
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as f:
+            old = json.load(f)
+        new = results
+    else:
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+
+    regressions = compare(old, new, args.threshold)
+    if regressions:
+        print(f"\nRegressions above {args.threshold:.0f}%: {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
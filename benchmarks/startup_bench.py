@@ -0,0 +1,76 @@
+'''
+Startup-time benchmark: cold `myrpal.py` runs vs runs through the fork server.
+
+Starts a private fork server on a temporary socket, times N invocations of
+each kind and prints per-invocation wall time statistics.
+
+Usage:
+    python benchmarks/startup_bench.py [file.rpal] [-n 20]
+'''
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MYRPAL = os.path.join(ROOT, 'myrpal.py')
+
+
+def time_runs(command, runs, env):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def wait_for_socket(path, process, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            return
+        if process.poll() is not None:
+            raise RuntimeError("Fork server exited during startup")
+        time.sleep(0.01)
+    raise RuntimeError("Fork server did not start in time")
+
+
+def summarize(name, timings):
+    print(f"{name:<12} mean {statistics.mean(timings) * 1000:8.2f} ms   "
+          f"median {statistics.median(timings) * 1000:8.2f} ms   "
+          f"min {min(timings) * 1000:8.2f} ms")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Compare cold and fork-server startup")
+    arg_parser.add_argument('file', nargs='?', default=os.path.join(ROOT, 'input.txt'))
+    arg_parser.add_argument('-n', '--runs', type=int, default=20)
+    args = arg_parser.parse_args(argv)
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix='rpal-bench-'), 'forkserver.sock')
+    env = dict(os.environ, RPAL_FORKSERVER_SOCKET=socket_path)
+    server = subprocess.Popen([sys.executable, '-m', 'Server.forkserver', '--socket', socket_path],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_socket(socket_path, server)
+        cold = time_runs([sys.executable, MYRPAL, args.file], args.runs, env)
+        forked = time_runs([sys.executable, MYRPAL, '--via-forkserver', args.file], args.runs, env)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"Startup benchmark: {args.file} ({args.runs} runs each)")
+    summarize('cold', cold)
+    summarize('forkserver', forked)
+    saved = statistics.mean(cold) - statistics.mean(forked)
+    print(f"Per-invocation overhead saved: {saved * 1000:.2f} ms "
+          f"({saved / statistics.mean(cold) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,17 @@
-class ASTNode:
-    def __init__(self, label, children=None):
-        self.label = label
-        self.children = children or []
-    
-    def __repr__(self):
-        return f"<{self.label}>"
-
-    def print_ast(self, level=0):
-        print('.' * level + self.label)
-        for child in self.children:
-            child.print_ast(level + 1)
+from Lexer.lexer import decode_string_literal
+from utils.node import ASTNode, NodeKind, LABELS
+from flattener.instructions import Variable, Lambda, Rec, Delay
+
+# Operators the CSE machine applies directly to two operands
+BINARY_OPS = {NodeKind.PLUS, NodeKind.MINUS, NodeKind.TIMES, NodeKind.DIVIDE, NodeKind.POWER,
+              NodeKind.EQ, NodeKind.NE, NodeKind.GR, NodeKind.GE, NodeKind.LS, NodeKind.LE,
+              NodeKind.AUG, NodeKind.AMP, NodeKind.OR}
+# Operators that the standardizer curries into gamma(gamma(op, x), y)
+CURRIED_OPS = BINARY_OPS - {NodeKind.AMP, NodeKind.OR}
+UNARY_OPS = {NodeKind.NEG, NodeKind.NOT}
+# Builtins that need their arguments evaluated; lazy mode passes them strictly
+BUILTIN_FUNCTIONS = {'Print', 'print', 'Isinteger', 'Isstring', 'Istuple', 'Isdummy', 'Istruthvalue',
+                     'Isfunction', 'Stem', 'Stern', 'Conc', 'Order', 'Null', 'ItoS'}
 
 class STFlattener:
     """
@@ -43,24 +45,17 @@ class STFlattener:
         if not node:
             return []
         
-        label = node.label
+        kind = node.kind
         children = node.children
         control = []
         
         # Terminal nodes (identifiers, integers, strings, operators without children)
         if not children:
-            if label.startswith('<') and label.endswith('>'):
-                # Handle tokens like <ID:x>, <INT:5>, <STR:"hello">
-                if ':' in label:
-                    control.append(label.split(':')[1].rstrip('>'))
-                else:
-                    control.append(label.strip('<>'))
-            else:
-                control.append(label)
+            control.append(self._terminal_symbol(node))
             return control
         
         # Gamma (function application)
-        if label == "gamma":
+        if kind == NodeKind.GAMMA:
             # Generate control for both operands
             rator_control = self._generate_control(children[0])  # Function
             rand_control = self._generate_control(children[1])   # Argument
@@ -71,7 +66,7 @@ class STFlattener:
             control.append('γ')
             
         # Lambda (function definition)
-        elif label == "lambda":
+        elif kind == NodeKind.LAMBDA:
             if len(children) >= 2:
                 param_node = children[0]
                 body = children[1]
@@ -83,25 +78,22 @@ class STFlattener:
                 self.control_structures[lambda_id] = self._generate_control(body)
                 
                 # Process parameter name(s)
-                if param_node.label == ",":
-                    param_names = ','.join(
-                        child.label.split(':')[1].rstrip('>') if ':' in child.label else child.label
-                        for child in param_node.children
-                    )
+                if param_node.kind == NodeKind.COMMA:
+                    param_names = ','.join(self._terminal_symbol(child) for child in param_node.children)
                 else:
-                    param_names = param_node.label.split(':')[1].rstrip('>') if ':' in param_node.label else param_node.label
+                    param_names = self._terminal_symbol(param_node)
 
                 control.append(f'λ{param_names}^{lambda_id}')
 
         
         # Assignment (not processed in control structure, but children are)
-        elif label == "=":
+        elif kind == NodeKind.BIND:
             # For assignments, we typically only need the value part in control
             # The binding is handled by the environment
             control.extend(self._generate_control(children[1]))
         
         # Tau (tuple formation)
-        elif label == "tau":
+        elif kind == NodeKind.TAU:
             n = len(children)
             # Process children in reverse order for stack
             for child in reversed(children):
@@ -109,7 +101,7 @@ class STFlattener:
             control.append(f'τ{n}')
         
         # Conditional arrow (->)
-        elif label == "->":
+        elif kind == NodeKind.COND:
             if len(children) >= 3:
                 # This should be in the form: gamma(gamma(gamma(->, B), T), E)
                 # We need to extract B, T, E from the nested gamma structure
@@ -141,7 +133,7 @@ class STFlattener:
                     control.append('γ')
         
         # Binary operators
-        elif label in {"+", "-", "*", "/", "**", "aug", "&", "or", "eq", "ne", "gr", "ge", "ls", "le"}:
+        elif kind in BINARY_OPS:
             if len(children) == 2:
                 # For standardized binary ops, they should be in gamma form
                 # gamma(gamma(op, E1), E2)
@@ -151,7 +143,7 @@ class STFlattener:
                 
                 control.extend(right_control)
                 control.extend(left_control)
-                control.append(label)
+                control.append(node.label)
             else:
                 # If not in expected form, process as gamma
                 for child in reversed(children):
@@ -159,12 +151,12 @@ class STFlattener:
                 control.append('γ')
         
         # Unary operators
-        elif label in {"not", "neg"}:
+        elif kind in UNARY_OPS:
             if len(children) == 1:
                 # For standardized unary ops: gamma(op, E)
                 # We want: E op
                 control.extend(self._generate_control(children[0]))
-                control.append(label)
+                control.append(node.label)
             else:
                 # Fallback
                 for child in reversed(children):
@@ -172,29 +164,39 @@ class STFlattener:
                 control.append('γ')
         
         # Y* combinator (for recursion)
-        elif label == "<Y*>":
+        elif kind == NodeKind.YSTAR:
             control.append('Y*')
         
         # Default case: process children and add current label
         else:
             for child in reversed(children):
                 control.extend(self._generate_control(child))
-            
-            # Add the current node's label if it's an operator
-            if label not in {"program", "expression"}:  # Skip structural labels
-                control.append(label)
+            control.append(node.label)
         
         return control
+
+    def _terminal_symbol(self, node: ASTNode) -> str:
+        """Control symbol for a leaf: identifiers and literals as written, <nil>/<Y*> without brackets."""
+        kind = node.kind
+        if kind == NodeKind.ID:
+            return node.value
+        if kind == NodeKind.INT:
+            return str(node.value)
+        if kind == NodeKind.STR:
+            return f"'{node.value}'"
+        if kind == NodeKind.NIL or kind == NodeKind.YSTAR:
+            return node.label[1:-1]
+        return node.label
     
     def _extract_conditional_parts(self, node: ASTNode):
         """
         Extract condition, then, and else parts from a standardized conditional.
         Expected form: gamma(gamma(gamma(->, B), T), E)
         """
-        if (node.label == "gamma" and len(node.children) == 2 and
-            node.children[0].label == "gamma" and len(node.children[0].children) == 2 and
-            node.children[0].children[0].label == "gamma" and len(node.children[0].children[0].children) == 2 and
-            node.children[0].children[0].children[0].label == "->"):
+        if (node.kind == NodeKind.GAMMA and len(node.children) == 2 and
+            node.children[0].kind == NodeKind.GAMMA and len(node.children[0].children) == 2 and
+            node.children[0].children[0].kind == NodeKind.GAMMA and len(node.children[0].children[0].children) == 2 and
+            node.children[0].children[0].children[0].kind == NodeKind.COND):
             
             # Extract parts
             condition = node.children[0].children[0].children[1]  # B
@@ -220,12 +222,12 @@ def test_flattener():
     # Standardized form: gamma(gamma(+, 2), 3)
     print("=== Test 1: Simple arithmetic (+ 2 3) ===")
     
-    plus_op = ASTNode("+", [])
-    two = ASTNode("2", [])
-    three = ASTNode("3", [])
+    plus_op = ASTNode(NodeKind.PLUS)
+    two = ASTNode(NodeKind.INT, value=2)
+    three = ASTNode(NodeKind.INT, value=3)
     
-    inner_gamma = ASTNode("gamma", [plus_op, two])
-    outer_gamma = ASTNode("gamma", [inner_gamma, three])
+    inner_gamma = ASTNode(NodeKind.GAMMA, [plus_op, two])
+    outer_gamma = ASTNode(NodeKind.GAMMA, [inner_gamma, three])
     
     flattener = STFlattener()
     controls = flattener.flatten(outer_gamma)
@@ -234,21 +236,21 @@ def test_flattener():
     print("\n=== Test 2: Lambda expression (λx.x+1) 5 ===")
     
     # Lambda part: λx.(+ x 1)
-    x_param = ASTNode("x", [])
-    x_ref = ASTNode("x", [])
-    one = ASTNode("1", [])
-    plus_op2 = ASTNode("+", [])
+    x_param = ASTNode(NodeKind.ID, value="x")
+    x_ref = ASTNode(NodeKind.ID, value="x")
+    one = ASTNode(NodeKind.INT, value=1)
+    plus_op2 = ASTNode(NodeKind.PLUS)
     
     # Body: gamma(gamma(+, x), 1)
-    inner_gamma2 = ASTNode("gamma", [plus_op2, x_ref])
-    body_gamma = ASTNode("gamma", [inner_gamma2, one])
+    inner_gamma2 = ASTNode(NodeKind.GAMMA, [plus_op2, x_ref])
+    body_gamma = ASTNode(NodeKind.GAMMA, [inner_gamma2, one])
     
     # Lambda: lambda(x, body)
-    lambda_node = ASTNode("lambda", [x_param, body_gamma])
+    lambda_node = ASTNode(NodeKind.LAMBDA, [x_param, body_gamma])
     
     # Application: gamma(lambda, 5)
-    five = ASTNode("5", [])
-    app_gamma = ASTNode("gamma", [lambda_node, five])
+    five = ASTNode(NodeKind.INT, value=5)
+    app_gamma = ASTNode(NodeKind.GAMMA, [lambda_node, five])
     
     flattener2 = STFlattener()
     controls2 = flattener2.flatten(app_gamma)
@@ -257,14 +259,14 @@ def test_flattener():
     print("\n=== Test 3: Conditional (-> true 1 2) ===")
     
     # Standardized form: gamma(gamma(gamma(->, true), 1), 2)
-    arrow_op = ASTNode("->", [])
-    true_val = ASTNode("true", [])
-    one_val = ASTNode("1", [])
-    two_val = ASTNode("2", [])
+    arrow_op = ASTNode(NodeKind.COND)
+    true_val = ASTNode(NodeKind.TRUE)
+    one_val = ASTNode(NodeKind.INT, value=1)
+    two_val = ASTNode(NodeKind.INT, value=2)
     
-    inner_gamma3 = ASTNode("gamma", [arrow_op, true_val])
-    middle_gamma = ASTNode("gamma", [inner_gamma3, one_val])
-    cond_gamma = ASTNode("gamma", [middle_gamma, two_val])
+    inner_gamma3 = ASTNode(NodeKind.GAMMA, [arrow_op, true_val])
+    middle_gamma = ASTNode(NodeKind.GAMMA, [inner_gamma3, one_val])
+    cond_gamma = ASTNode(NodeKind.GAMMA, [middle_gamma, two_val])
     
     flattener3 = STFlattener()
     controls3 = flattener3.flatten(cond_gamma)
@@ -273,9 +275,13 @@ def test_flattener():
 
 
 class OptimizedFlattener:
-    def __init__(self):
+    def __init__(self, parallel_tuples=False, lazy=False):
         self.control_counter = 1
         self.control_structures = {}
+        # Emit 'π' for tuples with several components that call functions (see CSE_Machine/parallel.py)
+        self.parallel_tuples = parallel_tuples
+        # Call-by-need: pass arguments (and so let/where bindings) and tuple components as 'θ' thunks
+        self.lazy = lazy
 
     def flatten(self, node: ASTNode) -> dict:
         self.control_counter = 1
@@ -283,43 +289,67 @@ class OptimizedFlattener:
         self.control_structures[0] = self._generate_control(node)
         return self.control_structures
 
+    def flatten_store(self, store, root: int) -> dict:
+        """
+        Flatten a tree held in a TreeStore (utils/tree_store.py), reading the
+        store's arrays directly instead of going through StoredNode views.
+        Gives the same control structures as flatten() on the same tree.
+        """
+        self.control_counter = 1
+        self.control_structures = {}
+        self.control_structures[0] = self._store_control(store, root)
+        return self.control_structures
+
+    def extend(self, node: ASTNode) -> int:
+        """
+        Incrementally flatten another tree as a new delta, keeping every
+        existing control structure (and its id) intact.
+        Returns the id of the new delta.
+        """
+        delta_id = self.control_counter
+        self.control_counter += 1
+        self.control_structures[delta_id] = self._generate_control(node)
+        return delta_id
+
     def _generate_control(self, node: ASTNode) -> list:
         if not node:
             return []
 
-        label = node.label
+        kind = node.kind
         children = node.children
+        # Each case extends the list of its first part instead of copying it,
+        # so left-nested chains (x aug 1 aug 2 ...) flatten in linear time
         control = []
 
         # Terminal
         if not children:
-            return [self._extract_terminal_value(label)]
+            return [self._extract_terminal_value(node)]
 
         # Gamma
-        if label == 'gamma':
+        if kind == NodeKind.GAMMA:
             left = children[0]
             right = children[1]
 
             # Detect curried binary ops: gamma(gamma(op, x), y)
-            if (left.label == 'gamma' and len(left.children) == 2 and
-                left.children[0].label in {'+', '-', '*', '/', '**', 'eq', 'ne', 'gr', 'ge', 'ls', 'le', 'aug'}):
+            if (left.kind == NodeKind.GAMMA and len(left.children) == 2 and
+                left.children[0].kind in CURRIED_OPS):
                 op = left.children[0].label
                 x = left.children[1]
                 y = right
-                control += self._generate_control(x)
+                control = self._generate_control(x)
                 control += self._generate_control(y)
                 control.append(op)
                 return control
 
             # Detect unary op: gamma(neg, x)
-            if left.label in {'neg', 'not'}:
-                control += self._generate_control(right)
+            if left.kind in UNARY_OPS:
+                control = self._generate_control(right)
                 control.append(left.label)
                 return control
 
             # Detect conditional: gamma(gamma(gamma('->', B), T), E)
-            if (left.label == 'gamma' and left.children[0].label == 'gamma' and
-                left.children[0].children[0].label == '->'):
+            if (left.kind == NodeKind.GAMMA and left.children[0].kind == NodeKind.GAMMA and
+                left.children[0].children[0].kind == NodeKind.COND):
                 B = left.children[0].children[1]
                 T = left.children[1]
                 E = right
@@ -332,26 +362,49 @@ class OptimizedFlattener:
                 self.control_structures[then_id] = self._generate_control(T)
                 self.control_structures[else_id] = self._generate_control(E)
 
-                control += self._generate_control(B)
+                control = self._generate_control(B)
                 control.append(f'β')  # beta
                 control.append(f'δ{else_id}')
                 control.append(f'δ{then_id}')
                 return control
 
+            # rec: gamma(Y*, lambda f. lambda x. E) becomes one closure for λx.E whose
+            # environment binds f to the closure itself, 'ρf:x^4'
+            if left.kind == NodeKind.YSTAR and right.kind == NodeKind.LAMBDA:
+                rec = self._rec_closures(right)
+                if rec is not None:
+                    control.append(rec)
+                    return control
+
             # Standard application
-            control += self._generate_control(right)
+            if self.lazy and not self._is_builtin_call(left):
+                control = self._lazy_argument(right)
+            else:
+                control = self._generate_control(right)
             control += self._generate_control(left)
             control.append('γ')  # gamma
             return control
         # Tuple
-        elif label == 'tau':
+        elif kind == NodeKind.TAU:
+            if self.parallel_tuples and sum(1 for child in children if self._contains_call(child)) >= 2:
+                # Each component gets its own delta so it can be evaluated independently;
+                # 'π4,5,6' builds the tuple (δ4, δ5, δ6)
+                component_ids = []
+                for child in children:
+                    component_id = self.control_counter
+                    self.control_counter += 1
+                    self.control_structures[component_id] = self._generate_control(child)
+                    component_ids.append(component_id)
+                control.append('π' + ','.join(map(str, component_ids)))
+                return control
             for child in reversed(children):  # FIXED: Don't reverse
-                control += self._generate_control(child)
+                # Lazy mode delays components too, so a tuple can hold an infinite stream
+                control += self._lazy_argument(child) if self.lazy else self._generate_control(child)
             control.append(f'τ{len(children)}')
             return control
 
         # Lambda
-        elif label == 'lambda':
+        elif kind == NodeKind.LAMBDA:
             param_node = children[0]
             body_node = children[1]
             lambda_id = self.control_counter
@@ -359,12 +412,12 @@ class OptimizedFlattener:
 
             self.control_structures[lambda_id] = self._generate_control(body_node)
 
-            if param_node.label in {',', 'tau'}:  # FIXED: support tau param lists
-                vars = ','.join([self._extract_terminal_value(p.label) for p in param_node.children])
+            if param_node.kind == NodeKind.COMMA or param_node.kind == NodeKind.TAU:  # FIXED: support tau param lists
+                vars = ','.join([self._extract_terminal_value(p) for p in param_node.children])
             else:
-                vars = self._extract_terminal_value(param_node.label)
+                vars = self._extract_terminal_value(param_node)
 
-            control.append(f'λ{vars}^{lambda_id}')
+            control.append(Lambda(f'λ{vars}^{lambda_id}'))
             return control
 
         # # Lambda
@@ -392,19 +445,19 @@ class OptimizedFlattener:
         #     return control
 
         # Binary and Unary Ops
-        elif label in {'+', '-', '*', '/', '**', 'eq', 'ne', 'gr', 'ge', 'ls', 'le', 'aug', '&', 'or'}:
-            control += self._generate_control(children[0])
+        elif kind in BINARY_OPS:
+            control = self._generate_control(children[0])
             control += self._generate_control(children[1])
-            control.append(label)
+            control.append(node.label)
             return control
 
-        elif label in {'neg', 'not'}:
-            control += self._generate_control(children[0])
-            control.append(label)
+        elif kind in UNARY_OPS:
+            control = self._generate_control(children[0])
+            control.append(node.label)
             return control
 
         # Assignment
-        elif label == '=':
+        elif kind == NodeKind.BIND:
             control += self._generate_control(children[1])
             return control
 
@@ -413,18 +466,272 @@ class OptimizedFlattener:
             control += self._generate_control(child)
         return control
 
+    def _rec_closures(self, node):
+        """
+        'ρ' instruction for Y* applied to node, or None when the recursive
+        definition is not made of lambdas. rec (f ... and g ...) gives
+        lambda (f, g). tau(lambda, lambda), compiled to 'ρf,g:x^4;y^6'.
+        """
+        param_node, body_node = node.children
+        if param_node.kind == NodeKind.ID and body_node.kind == NodeKind.LAMBDA:
+            names, lambdas = [param_node], [body_node]
+        elif (param_node.kind in (NodeKind.COMMA, NodeKind.TAU) and body_node.kind == NodeKind.TAU and
+              len(param_node.children) == len(body_node.children) and
+              all(p.kind == NodeKind.ID for p in param_node.children) and
+              all(b.kind == NodeKind.LAMBDA for b in body_node.children)):
+            names, lambdas = param_node.children, body_node.children
+        else:
+            return None
+        headers = [self._generate_control(lambda_node)[0][1:] for lambda_node in lambdas]  # 'x^4'
+        return Rec(f"ρ{','.join(self._extract_terminal_value(n) for n in names)}:{';'.join(headers)}")
+
+    def _is_builtin_call(self, rator):
+        """True for Print x, Conc x and (Conc x) y, whose arguments are needed anyway."""
+        if rator.kind == NodeKind.GAMMA:
+            rator = rator.children[0]
+        return rator.kind == NodeKind.ID and rator.value in BUILTIN_FUNCTIONS
+
+    def _lazy_argument(self, node):
+        """Control for an argument or tuple component in lazy mode; anything costly is delayed in its own delta."""
+        kind = node.kind
+        if kind == NodeKind.ID and node.value not in BUILTIN_FUNCTIONS:
+            return [Delay(f'θ{node.value}')]  # Pass the binding on without forcing it
+        if not node.children or kind == NodeKind.LAMBDA:
+            return self._generate_control(node)  # Already a value
+        if kind == NodeKind.GAMMA and node.children[0].kind == NodeKind.YSTAR:
+            return self._generate_control(node)  # rec: just wraps the lambda
+        delta_id = self.control_counter
+        self.control_counter += 1
+        self.control_structures[delta_id] = self._generate_control(node)
+        return [Delay(f'θ{delta_id}')]
+
+    def _contains_call(self, node):
+        """True when the subtree applies a function (an application that is not an operator or conditional)."""
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            children = current.children
+            if current.kind == NodeKind.LAMBDA:
+                continue  # Building a closure is cheap; its body runs only when called
+            if current.kind == NodeKind.GAMMA:
+                left = children[0]
+                if left.kind in UNARY_OPS or left.kind == NodeKind.COND:
+                    pass
+                elif left.kind == NodeKind.GAMMA and left.children[0].kind in CURRIED_OPS:
+                    pass
+                elif left.kind == NodeKind.GAMMA and left.children[0].kind == NodeKind.COND:
+                    pass
+                elif (left.kind == NodeKind.GAMMA and left.children[0].kind == NodeKind.GAMMA and
+                      left.children[0].children[0].kind == NodeKind.COND):
+                    pass
+                else:
+                    return True
+            pending.extend(children)
+        return False
+
     # def _extract_terminal_value(self, label):
     #     if label.startswith('<') and ':' in label:
     #         return label.split(':')[1].rstrip('>')
     #     return label
-    def _extract_terminal_value(self, label):
-        if label.startswith('<') and ':' in label:
-            type_part, value_part = label[1:-1].split(':', 1)
-            if type_part == 'INT':
-                return int(value_part)
+    def _extract_terminal_value(self, node):
+        kind = node.kind
+        if kind == NodeKind.ID:
+            # Variable references carry their symbol id; builtins stay names
+            return node.value if node.value in BUILTIN_FUNCTIONS else Variable(node.value)
+        if kind == NodeKind.INT:
+            return node.value
+        elif kind == NodeKind.STR:
+            # Decode escapes once here instead of on every Print
+            return "'" + decode_string_literal(node.value) + "'"
+        return node.label
+
+    # TreeStore versions of the methods above; nodes are indices into the store's arrays
+
+    def _store_control(self, store, index) -> list:
+        kinds = store.kinds
+        start = store.child_start[index]
+        count = store.child_count[index]
+        child_list = store.child_list
+        kind = kinds[index]
+        control = []
+
+        # Terminal
+        if not count:
+            return [self._store_terminal_value(store, index)]
+
+        # Gamma
+        if kind == NodeKind.GAMMA:
+            left = child_list[start]
+            right = child_list[start + 1]
+            left_kind = kinds[left]
+            left_first = child_list[store.child_start[left]] if store.child_count[left] else -1
+
+            # Curried binary op: gamma(gamma(op, x), y)
+            if (left_kind == NodeKind.GAMMA and store.child_count[left] == 2 and
+                    kinds[left_first] in CURRIED_OPS):
+                control = self._store_control(store, child_list[store.child_start[left] + 1])
+                control += self._store_control(store, right)
+                control.append(LABELS[kinds[left_first]])
+                return control
+
+            # Unary op: gamma(neg, x)
+            if left_kind in UNARY_OPS:
+                control = self._store_control(store, right)
+                control.append(LABELS[left_kind])
+                return control
+
+            # Conditional: gamma(gamma(gamma('->', B), T), E)
+            if (left_kind == NodeKind.GAMMA and kinds[left_first] == NodeKind.GAMMA and
+                    kinds[child_list[store.child_start[left_first]]] == NodeKind.COND):
+                then_id = self.control_counter
+                else_id = self.control_counter + 1
+                self.control_counter += 2
+                self.control_structures[then_id] = self._store_control(store, child_list[store.child_start[left] + 1])
+                self.control_structures[else_id] = self._store_control(store, right)
+                control = self._store_control(store, child_list[store.child_start[left_first] + 1])
+                control.append('β')
+                control.append(f'δ{else_id}')
+                control.append(f'δ{then_id}')
+                return control
+
+            # rec: gamma(Y*, lambda f. lambda x. E)
+            if left_kind == NodeKind.YSTAR and kinds[right] == NodeKind.LAMBDA:
+                rec = self._store_rec_closures(store, right)
+                if rec is not None:
+                    control.append(rec)
+                    return control
+
+            # Standard application
+            if self.lazy and not self._store_is_builtin_call(store, left):
+                control = self._store_lazy_argument(store, right)
+            else:
+                control = self._store_control(store, right)
+            control += self._store_control(store, left)
+            control.append('γ')
+            return control
+
+        children = child_list[start:start + count]
+        # Tuple
+        if kind == NodeKind.TAU:
+            if self.parallel_tuples and sum(1 for child in children if self._store_contains_call(store, child)) >= 2:
+                component_ids = []
+                for child in children:
+                    component_id = self.control_counter
+                    self.control_counter += 1
+                    self.control_structures[component_id] = self._store_control(store, child)
+                    component_ids.append(component_id)
+                control.append('π' + ','.join(map(str, component_ids)))
+                return control
+            for child in reversed(children):
+                control += self._store_lazy_argument(store, child) if self.lazy else self._store_control(store, child)
+            control.append(f'τ{count}')
+            return control
+
+        # Lambda
+        elif kind == NodeKind.LAMBDA:
+            param, body = children
+            lambda_id = self.control_counter
+            self.control_counter += 1
+            self.control_structures[lambda_id] = self._store_control(store, body)
+            if kinds[param] == NodeKind.COMMA or kinds[param] == NodeKind.TAU:
+                vars = ','.join([self._store_terminal_value(store, p) for p in store.children(param)])
             else:
-                return label.split(':')[1].rstrip('>')
-        return label
+                vars = self._store_terminal_value(store, param)
+            control.append(Lambda(f'λ{vars}^{lambda_id}'))
+            return control
+
+        # Binary and Unary Ops
+        elif kind in BINARY_OPS:
+            control = self._store_control(store, children[0])
+            control += self._store_control(store, children[1])
+            control.append(LABELS[kind])
+            return control
+
+        elif kind in UNARY_OPS:
+            control = self._store_control(store, children[0])
+            control.append(LABELS[kind])
+            return control
+
+        # Assignment
+        elif kind == NodeKind.BIND:
+            return self._store_control(store, children[1])
+
+        # Default recursive case
+        for child in children:
+            control += self._store_control(store, child)
+        return control
+
+    def _store_rec_closures(self, store, index):
+        kinds = store.kinds
+        param, body = store.children(index)
+        if kinds[param] == NodeKind.ID and kinds[body] == NodeKind.LAMBDA:
+            names, lambdas = [param], [body]
+        else:
+            names, lambdas = store.children(param), store.children(body)
+            if not (kinds[param] in (NodeKind.COMMA, NodeKind.TAU) and kinds[body] == NodeKind.TAU and
+                    len(names) == len(lambdas) and
+                    all(kinds[n] == NodeKind.ID for n in names) and
+                    all(kinds[b] == NodeKind.LAMBDA for b in lambdas)):
+                return None
+        headers = [self._store_control(store, lambda_index)[0][1:] for lambda_index in lambdas]
+        return Rec(f"ρ{','.join(self._store_terminal_value(store, n) for n in names)}:{';'.join(headers)}")
+
+    def _store_is_builtin_call(self, store, rator):
+        if store.kinds[rator] == NodeKind.GAMMA:
+            rator = store.child_list[store.child_start[rator]]
+        return store.kinds[rator] == NodeKind.ID and store.value(rator) in BUILTIN_FUNCTIONS
+
+    def _store_lazy_argument(self, store, index):
+        kinds = store.kinds
+        kind = kinds[index]
+        if kind == NodeKind.ID and store.value(index) not in BUILTIN_FUNCTIONS:
+            return [Delay(f'θ{store.value(index)}')]
+        if not store.child_count[index] or kind == NodeKind.LAMBDA:
+            return self._store_control(store, index)
+        if kind == NodeKind.GAMMA and kinds[store.child_list[store.child_start[index]]] == NodeKind.YSTAR:
+            return self._store_control(store, index)
+        delta_id = self.control_counter
+        self.control_counter += 1
+        self.control_structures[delta_id] = self._store_control(store, index)
+        return [Delay(f'θ{delta_id}')]
+
+    def _store_contains_call(self, store, index):
+        kinds = store.kinds
+        child_list = store.child_list
+        child_start = store.child_start
+        child_count = store.child_count
+        pending = [index]
+        while pending:
+            current = pending.pop()
+            kind = kinds[current]
+            if kind == NodeKind.LAMBDA:
+                continue
+            if kind == NodeKind.GAMMA:
+                left = child_list[child_start[current]]
+                left_kind = kinds[left]
+                left_first = kinds[child_list[child_start[left]]] if child_count[left] else None
+                if left_kind in UNARY_OPS or left_kind == NodeKind.COND:
+                    pass
+                elif left_kind == NodeKind.GAMMA and (left_first in CURRIED_OPS or left_first == NodeKind.COND):
+                    pass
+                elif (left_kind == NodeKind.GAMMA and left_first == NodeKind.GAMMA and
+                      kinds[child_list[child_start[child_list[child_start[left]]]]] == NodeKind.COND):
+                    pass
+                else:
+                    return True
+            pending.extend(store.children(current))
+        return False
+
+    def _store_terminal_value(self, store, index):
+        kind = store.kinds[index]
+        if kind == NodeKind.ID:
+            value = store.value(index)
+            return value if value in BUILTIN_FUNCTIONS else Variable(value)
+        if kind == NodeKind.INT:
+            return store.value(index)
+        elif kind == NodeKind.STR:
+            return "'" + decode_string_literal(store.value(index)) + "'"
+        return LABELS[kind]
 
     def print_control_structures(self):
         for delta_id, control in self.control_structures.items():
@@ -0,0 +1,77 @@
+'''
+Control instructions that carry symbol ids (see utils/symbols.py).
+
+OptimizedFlattener emits variable references, λ and ρ headers and θ
+references as these classes. Each still equals the text it stands for, so
+-optflat, traces and comparisons see the usual control structures, while
+the CSE machine reads the ids straight off the instruction. Plain strings
+(STFlattener output, hand-written controls) are decoded to them once, when
+a machine loads the program.
+
+Ids are only meaningful within a process, so each class pickles as its
+text and is interned again by the process that loads it.
+'''
+
+from utils.symbols import intern
+
+
+class Variable(str):
+    """A variable reference (it still equals the name), with the name's symbol id."""
+    def __new__(cls, name):
+        variable = super().__new__(cls, name)
+        variable.symbol = intern(name)
+        return variable
+
+    def __reduce__(self):
+        return (Variable, (str(self),))
+
+
+class Lambda(str):
+    """A λ instruction such as 'λx,y^3' (it still equals it), with its parameters as symbol ids."""
+    def __new__(cls, instr):
+        header = super().__new__(cls, instr)
+        param_part, delta_part = instr[1:].split('^')
+        header.params = [intern(param) for param in param_part.split(',')]
+        header.delta_id = int(delta_part)
+        return header
+
+    def __reduce__(self):
+        return (Lambda, (str(self),))
+
+
+class Rec(str):
+    """
+    A ρ instruction such as 'ρf:n^1' or 'ρf,g:x^4;y^6' (it still equals it):
+    the symbol ids of the names and the (params, delta id) of each lambda.
+    """
+    def __new__(cls, instr):
+        rec = super().__new__(cls, instr)
+        name_part, lambda_part = instr[1:].split(':')
+        rec.names = [intern(name) for name in name_part.split(',')]
+        rec.lambdas = []
+        for lambda_header in lambda_part.split(';'):
+            param_part, delta_part = lambda_header.split('^')
+            rec.lambdas.append(([intern(param) for param in param_part.split(',')], int(delta_part)))
+        rec.simultaneous = len(rec.names) > 1
+        return rec
+
+    def __reduce__(self):
+        return (Rec, (str(self),))
+
+
+class Delay(str):
+    """
+    A lazy argument (it still equals it): 'θ12' delays δ12 (delta_id),
+    'θx' passes x's binding on unforced (name and symbol).
+    """
+    def __new__(cls, instr):
+        delay = super().__new__(cls, instr)
+        ref = instr[1:]
+        if ref.isdigit():
+            delay.delta_id, delay.name, delay.symbol = int(ref), None, None
+        else:
+            delay.delta_id, delay.name, delay.symbol = None, ref, intern(ref)
+        return delay
+
+    def __reduce__(self):
+        return (Delay, (str(self),))
@@ -0,0 +1,221 @@
+'''
+Peephole pass that fuses frequent instruction sequences of OptimizedFlattener
+output into superinstructions the CSE machine executes in one dispatch.
+
+The patterns were picked from opcode pair/triple frequencies over the
+benchmark workloads (python benchmarks/opcode_pairs.py):
+
+    n 1 -                VarConst          variable (op) constant
+    n 0 eq β δ3 δ4       VarConstBranch    compare with a constant and branch
+    f γ                  VarApply          look up a function and apply it
+    2 T γ                ConstVarApply     apply to a constant; tuple selection
+                                           when T is a tuple
+
+The machine adds one more when it decodes a program, since only it knows
+every builtin (including registered ones) and its arity:
+
+    'b' 'a' Conc γ γ     BuiltinApply      a builtin applied to all its arguments
+
+Every superinstruction keeps the instructions it replaced (expansion). The
+machine runs them instead of the fused forms when tracing, so -cse shows
+the usual instructions. It also runs them where a step() slice or max_steps
+ends partway through a superinstruction, and where the fast path finds an
+unforced lazy thunk. Fusion saves dispatch work, not steps: each
+superinstruction is charged cost steps, as many as its expansion takes (β
+pops its two δ without a step of their own), so a program takes the same
+steps and stops at the same max_steps fused or not. --cse-profile
+profiles the fused forms, counting each under its class name.
+'''
+
+from flattener.flat import BUILTIN_FUNCTIONS
+from utils.symbols import intern
+
+# Operators the machine applies with apply_binary
+FUSABLE_OPS = {'+', '-', '*', '/', '**', 'eq', 'ne', 'ls', 'le', 'gr', 'ge', '<', '>', '<=', '>='}
+COMPARISONS = {'eq', 'ne', 'ls', 'le', 'gr', 'ge', '<', '>', '<=', '>='}
+NOT_VARIABLES = {'true', 'false', 'dummy', 'aug', 'or', 'not', 'neg'} | FUSABLE_OPS | BUILTIN_FUNCTIONS
+INSTRUCTION_HEADS = set('λρτδπθβγ<\'"')
+
+
+def is_variable(instr):
+    return (isinstance(instr, str) and instr not in NOT_VARIABLES and instr[0] not in INSTRUCTION_HEADS
+            and (instr[0].isalpha() or instr[0] == '_'))
+
+
+class Superinstruction:
+    """
+    Base of the fused instructions. Each subclass pickles through __reduce__
+    as its constructor arguments, so it is rebuilt rather than copied and its
+    symbol id is interned again in the receiving process.
+    """
+    __slots__ = ('expansion', 'cost')
+
+    def names(self):
+        """Identifiers this instruction looks up."""
+        return [instr for instr in self.expansion if is_variable(instr)]
+
+    def refs(self):
+        """Deltas this instruction may run."""
+        return []
+
+    def __repr__(self):
+        return '⟨' + ' '.join(str(instr) for instr in self.expansion) + '⟩'
+
+
+class VarConst(Superinstruction):
+    __slots__ = ('name', 'symbol', 'const', 'op')
+
+    def __init__(self, name, const, op):
+        self.name = name
+        self.symbol = intern(name)
+        self.const = const
+        self.op = op
+        self.expansion = [name, const, op]
+        self.cost = 3
+
+    def __reduce__(self):
+        return (VarConst, (self.name, self.const, self.op))
+
+
+class VarConstBranch(Superinstruction):
+    __slots__ = ('name', 'symbol', 'const', 'op', 'then_id', 'else_id')
+
+    def __init__(self, name, const, op, then_id, else_id):
+        self.name = name
+        self.symbol = intern(name)
+        self.const = const
+        self.op = op
+        self.then_id = then_id
+        self.else_id = else_id
+        self.expansion = [name, const, op, 'β', f'δ{else_id}', f'δ{then_id}']
+        self.cost = 4
+
+    def refs(self):
+        return [self.then_id, self.else_id]
+
+    def __reduce__(self):
+        return (VarConstBranch, (self.name, self.const, self.op, self.then_id, self.else_id))
+
+
+class VarApply(Superinstruction):
+    __slots__ = ('name', 'symbol', 'site')
+
+    def __init__(self, name, site='γ'):
+        self.name = name
+        self.symbol = intern(name)
+        self.site = site  # The machine gives each copy its own CallSite
+        self.expansion = [name, site]
+        self.cost = 2
+
+    def with_site(self, site):
+        return VarApply(self.name, site)
+
+    def __reduce__(self):
+        return (VarApply, (self.name, self.site))
+
+
+class ConstVarApply(Superinstruction):
+    __slots__ = ('const', 'name', 'symbol', 'site')
+
+    def __init__(self, const, name, site='γ'):
+        self.const = const
+        self.name = name
+        self.symbol = intern(name)
+        self.site = site
+        self.expansion = [const, name, site]
+        self.cost = 3
+
+    def with_site(self, site):
+        return ConstVarApply(self.const, self.name, site)
+
+    def __reduce__(self):
+        return (ConstVarApply, (self.const, self.name, self.site))
+
+
+class BuiltinApply(Superinstruction):
+    __slots__ = ('name', 'arity')
+
+    def __init__(self, name, arity):
+        self.name = name
+        self.arity = arity
+        self.expansion = [name] + ['γ'] * arity
+        self.cost = 1 + arity
+
+    def __reduce__(self):
+        return (BuiltinApply, (self.name, self.arity))
+
+    def names(self):
+        return []
+
+
+def _branch_target(instr):
+    if isinstance(instr, str) and instr.startswith('δ'):
+        return int(instr[1:])
+    return None
+
+
+def fuse_control(control):
+    """Fuse one control structure; returns a new list."""
+    fused = []
+    i = 0
+    n = len(control)
+    while i < n:
+        instr = control[i]
+        if is_variable(instr) and i + 1 < n:
+            following = control[i + 1]
+            if type(following) is int and i + 2 < n and control[i + 2] in FUSABLE_OPS:
+                op = control[i + 2]
+                if (op in COMPARISONS and i + 5 < n and control[i + 3] == 'β' and
+                        _branch_target(control[i + 4]) is not None and _branch_target(control[i + 5]) is not None):
+                    fused.append(VarConstBranch(instr, following, op,
+                                                _branch_target(control[i + 5]), _branch_target(control[i + 4])))
+                    i += 6
+                    continue
+                fused.append(VarConst(instr, following, op))
+                i += 3
+                continue
+            if following == 'γ':
+                fused.append(VarApply(instr))
+                i += 2
+                continue
+        elif (type(instr) is int and i + 2 < n and is_variable(control[i + 1]) and control[i + 2] == 'γ'):
+            fused.append(ConstVarApply(instr, control[i + 1]))
+            i += 3
+            continue
+        fused.append(instr)
+        i += 1
+    return fused
+
+
+def fuse_builtin_calls(control, arities):
+    """
+    Fuse saturated builtin calls (a builtin name followed by as many γ as
+    its arity) in one control structure; returns a new list.
+
+    Args:
+        control: The control structure
+        arities: Builtin name -> number of arguments
+    """
+    fused = []
+    i = 0
+    n = len(control)
+    while i < n:
+        instr = control[i]
+        arity = arities.get(instr) if type(instr) is str else None
+        if arity is not None and control[i + 1:i + 1 + arity] == ['γ'] * arity:
+            fused.append(BuiltinApply(instr, arity))
+            i += 1 + arity
+            continue
+        fused.append(instr)
+        i += 1
+    return fused
+
+
+def fuse_superinstructions(control_structures):
+    """
+    Apply the peephole pass to every control structure.
+
+    Returns:
+        A new dict of control structures; the input is left unchanged
+    """
+    return {delta_id: fuse_control(control) for delta_id, control in control_structures.items()}
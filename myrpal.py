@@ -1,27 +1,56 @@
 import sys
-from utils.file_io import read_source_file
-from Lexer.lexer import tokenize
+import tempfile
+
+# Hand the invocation to a running fork server before paying for the pipeline imports.
+# If none is reachable, fall through and run in this process as usual.
+if __name__ == "__main__" and "--via-forkserver" in sys.argv:
+    from Server.forkclient import run_via_forkserver
+    sys.argv.remove("--via-forkserver")
+    exit_code = run_via_forkserver(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+from utils.file_io import open_source, SourceError
 from Parser.parser import Parser
-from Standardizer.standardizer import standardize
-from utils.node import deep_copy_ast
+from Standardizer.standardizer import standardize, standardize_store
+from utils.node import count_nodes
+from utils.tree_store import TreeStore
+from utils.phase_profile import PhaseProfiler, NullProfiler, REPORT_FORMATS
 from flattener.flat import STFlattener, OptimizedFlattener
+from flattener.peephole import fuse_superinstructions
 from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.stdlib import STDLIB
 
 def print_help():
     help_text = """
 Usage: python myrpal.py <file_name> [options]
+       python myrpal.py - [options]      (read the program from stdin)
+       python myrpal.py -repl
 
 Options:
   -h, --help       Show this help message
+  -repl            Start the interactive REPL
   -ast             Print the original Abstract Syntax Tree (AST)
   -st              Print the standardized tree (after standardization)
   -flat            Print the standard flattened control structure
   -optflat         Print the optimized flattened control structure
   -cse             Print the execution trace from the CSE machine
+  --trace-file=F   Write a compact execution trace to file F (python -m CSE_Machine.trace F)
   -allt            Print both AST and standardized tree
+  --via-forkserver Run through a warm fork server (python -m Server.forkserver)
+  --tree-store     Keep the AST and standardized tree in compact arrays
+  --parallel[=N]   Evaluate independent tuple components in N worker processes
+  --max-steps=N    CSE step budget (default 100000); parallel tuples count every component's steps
+  --lazy           Call-by-need: evaluate arguments and bindings only when used
+  --no-fuse        Run the optimized controls without superinstruction fusion
+  --stdlib         Add the native standard library (Map, Fold, Range, Split, ...)
+  --profile        Report per-phase time, memory and sizes on stderr
+  --profile=json   Same report as JSON
+  --cse-profile    Report hot opcodes, deltas, functions and builtins on stderr
+  --flamegraph=F   Write collapsed call stacks (flame graph input) to file F
 
-Testing: To run sample test cases and get results, use the following command:
-  python test_rpal.py
+Testing: run the test suite from the project root with:
+  python -m pytest -q tests
   """
     print(help_text)
 
@@ -30,26 +59,99 @@ def main():
     if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
         print_help()
         return
+    if sys.argv[1] in ("-repl", "--repl"):
+        from Repl.repl import Repl
+        Repl().loop()
+        return
 
     file_name = sys.argv[1]
     flags = sys.argv[2:]  # All optional flags
 
-    # Step 1: Read and tokenize
-    source_code = read_source_file(file_name)
-    tokens = tokenize(source_code)
+    # --profile prints a text report, --profile=json a JSON one (both to stderr)
+    profile_format = None
+    for flag in flags:
+        if flag == "--profile":
+            profile_format = "text"
+        elif flag.startswith("--profile="):
+            profile_format = flag.split("=", 1)[1]
+    if profile_format is not None and profile_format not in REPORT_FORMATS:
+        print(f"Error: Unknown profile format: {profile_format} (expected {' or '.join(REPORT_FORMATS)})")
+        sys.exit(1)
+    profiler = PhaseProfiler() if profile_format else NullProfiler()
+
+    # --cse-profile reports hot opcodes/deltas/functions, --flamegraph=FILE writes collapsed stacks
+    flamegraph_file = None
+    for flag in flags:
+        if flag.startswith("--flamegraph="):
+            flamegraph_file = flag.split("=", 1)[1]
+    execution_profiler = None
+    if "--cse-profile" in flags or flamegraph_file:
+        from CSE_Machine.profiler import ExecutionProfiler
+        execution_profiler = ExecutionProfiler()
+
+    # --max-steps=N raises (or lowers) the CSE step budget
+    max_steps = None
+    for flag in flags:
+        if flag.startswith("--max-steps="):
+            value = flag.split("=", 1)[1]
+            if not value.isdigit() or int(value) < 1:
+                print(f"Error: --max-steps expects a positive integer, not {value!r}")
+                sys.exit(1)
+            max_steps = int(value)
+
+    # --parallel[=N] evaluates independent tuple components in a process pool
+    parallel = None
+    for flag in flags:
+        if flag == "--parallel" or flag.startswith("--parallel="):
+            from CSE_Machine.parallel import ParallelEvaluator
+            workers = flag.split("=", 1)[1] if "=" in flag else None
+            parallel = ParallelEvaluator(int(workers) if workers else None)
+
+    # Step 1: Read and tokenize ('-' reads the program from stdin)
+    try:
+        with profiler.phase("read"):
+            source = open_source(file_name)
+        with source, profiler.phase("lex"):
+            tokens = source.tokens()
+    except SourceError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
     # Step 2: Parse and standardize
-    parser = Parser(tokens)
-    ast = parser.parse()
-    ast_copy = deep_copy_ast(ast)
-    standardized_tree = standardize(ast_copy)
+    if "--tree-store" in flags:
+        # Array-backed trees; AST and ST share the store and stay usable together
+        store = TreeStore()
+        with profiler.phase("parse"):
+            ast_root = Parser(tokens, store).parse()
+        with profiler.phase("standardize"):
+            st_root = standardize_store(store, ast_root)
+        ast = store.node(ast_root)
+        standardized_tree = store.node(st_root)
+    else:
+        with profiler.phase("parse"):
+            parser = Parser(tokens)
+            ast = parser.parse()
+        # standardize shares unchanged subtrees and never modifies ast, so -ast still sees the original
+        with profiler.phase("standardize"):
+            standardized_tree = standardize(ast)
 
     # Step 3: Flatten and optimize
-    flattener = STFlattener()
-    controls = flattener.flatten(standardized_tree)
+    with profiler.phase("flatten"):
+        flattener = STFlattener()
+        controls = flattener.flatten(standardized_tree)
 
-    opt_flattener = OptimizedFlattener()
-    optimized_controls = opt_flattener.flatten(standardized_tree)
+    with profiler.phase("optflatten"):
+        opt_flattener = OptimizedFlattener(parallel_tuples=parallel is not None, lazy="--lazy" in flags)
+        if "--tree-store" in flags:
+            optimized_controls = opt_flattener.flatten_store(store, st_root)
+        else:
+            optimized_controls = opt_flattener.flatten(standardized_tree)
+
+    # -optflat shows the flattener's output; the machine runs the fused controls
+    executed_controls = optimized_controls
+    if "--no-fuse" not in flags:
+        with profiler.phase("peephole"):
+            executed_controls = fuse_superinstructions(optimized_controls)
 
     # Step 4: Optional visualizations
     if "-ast" in flags:
@@ -73,13 +175,48 @@ def main():
         standardized_tree.print_ast()
 
     # Step 5: Run CSE machine
-    cse = CSEMachineExecutor(optimized_controls)
-    result = cse.run()
+    # Traces are recorded as per-step changes in a file (see CSE_Machine/trace.py), so memory stays bounded;
+    # -cse on its own uses a temporary one
+    trace_file = None
+    for flag in flags:
+        if flag.startswith("--trace-file="):
+            trace_file = flag.split("=", 1)[1]
+    if trace_file is None and "-cse" in flags:
+        trace_file = tempfile.TemporaryFile()
+    with profiler.phase("execute"):
+        cse = CSEMachineExecutor(executed_controls, max_steps=max_steps, trace=trace_file is not None,
+                                 trace_file=trace_file, track_peaks=profile_format is not None,
+                                 profiler=execution_profiler, parallel=parallel, lazy="--lazy" in flags,
+                                 builtins=STDLIB if "--stdlib" in flags else None)
+        try:
+            result = cse.run()
+        finally:
+            if parallel is not None:
+                parallel.close()
+    if "--cse-profile" in flags:
+        execution_profiler.report()
+    if flamegraph_file:
+        execution_profiler.write_collapsed(flamegraph_file)
     if "-cse" in flags:
         print("\nCSE Machine Execution Trace:")
         cse.print_trace()
     # elif not flags:
     #     print("Program Output:", result)
     # print(result)
+
+    if profile_format:
+        profiler.stop()
+        profiler.count("source_size", source.size)
+        profiler.count("tokens", len(tokens))
+        profiler.count("ast_nodes", count_nodes(ast))
+        profiler.count("st_nodes", count_nodes(standardized_tree))
+        profiler.count("deltas", len(optimized_controls))
+        profiler.count("control_length", sum(len(c) for c in optimized_controls.values()))
+        profiler.count("cse_steps", cse.steps)
+        profiler.count("environments_created", len(cse.environments))
+        profiler.count("peak_stack", cse.peak_stack)
+        profiler.count("peak_control", cse.peak_control)
+        profiler.count("peak_live_environments", cse.peak_envs)
+        profiler.report(profile_format)
 if __name__ == "__main__":
     main()
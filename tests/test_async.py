@@ -0,0 +1,126 @@
+'''
+Tests for the asyncio evaluation API (utils/async_pipeline.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import asyncio
+import unittest
+
+from utils.async_pipeline import AsyncEvaluator, Limits, evaluate
+from utils.pipeline import evaluate_source
+
+FIB = "let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in "
+LOOP = "let rec loop n = loop (n + 1) in loop 0"
+# Small slices so every path is taken by short programs
+OFFLOAD = Limits(slice_steps=100, inline_steps=300, worker_slice_steps=1000)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class AsyncEvaluatorTest(unittest.TestCase):
+    def check_matches_sync(self, result, source, lazy=False):
+        expected = evaluate_source(source, lazy=lazy)
+        self.assertEqual((result.output, result.result, result.steps, result.error),
+                         (expected['output'], expected['result'], expected['steps'], expected['error']))
+
+    def test_inline(self):
+        source = "Print (1, 'a') , 2"
+        result = run(evaluate(source))
+        self.check_matches_sync(result, source)
+        self.assertIsNone(result.offloaded)
+
+    def test_offloaded_runs_match_inline(self):
+        source = FIB + "(Print (fib 12), fib 10)"
+        for offload in ('thread', 'process'):
+            for lazy in (False, True):
+                with self.subTest(offload=offload, lazy=lazy):
+                    evaluator = AsyncEvaluator(offload=offload, workers=2)
+                    try:
+                        result = run(evaluator.evaluate(source, OFFLOAD, lazy=lazy))
+                    finally:
+                        evaluator.close()
+                    self.assertEqual(result.offloaded, offload)
+                    self.check_matches_sync(result, source, lazy)
+
+    def test_errors_and_limits_are_reported(self):
+        self.assertTrue(run(evaluate("let x = in x")).error.startswith('SyntaxError'))
+        self.assertEqual(run(evaluate("1 / 0")).error, 'ZeroDivisionError: integer division or modulo by zero')
+        result = run(evaluate(LOOP, Limits(max_steps=5000)))
+        self.assertTrue(result.step_limit_exceeded)
+        result = run(evaluate(LOOP, Limits(max_steps=10 ** 9, timeout=0.2)))
+        self.assertTrue(result.timed_out)
+        self.assertEqual(result.error, 'TimeoutError: time limit exceeded')
+
+    def test_concurrency_limit(self):
+        evaluator = AsyncEvaluator(max_concurrent=2)
+        active = peak = 0
+        run_machine = evaluator._run
+
+        async def counting(*args):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            try:
+                return await run_machine(*args)
+            finally:
+                active -= 1
+
+        evaluator._run = counting
+
+        async def main():
+            return await asyncio.gather(*(evaluator.evaluate(FIB + f"fib {n}", Limits(slice_steps=50))
+                                          for n in range(2, 10)))
+
+        results = run(main())
+        evaluator.close()
+        self.assertEqual([r.result for r in results], ['1', '2', '3', '5', '8', '13', '21', '34'])
+        self.assertEqual(peak, 2)
+
+    def test_cancellation(self):
+        async def main():
+            task = asyncio.create_task(evaluate(LOOP, Limits(max_steps=10 ** 9, inline_steps=None)))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return await evaluate("Print 'still running'")  # The loop is still usable
+
+        self.assertEqual(run(main()).output, 'still running')
+
+    def test_cancelled_process_runs_free_their_worker(self):
+        evaluator = AsyncEvaluator(offload='process', workers=1)
+
+        async def main():
+            for _ in range(3):
+                task = asyncio.create_task(evaluator.evaluate(LOOP, Limits(max_steps=10 ** 9, inline_steps=100,
+                                                                           worker_slice_steps=1000)))
+                while evaluator.pool is None or len(evaluator.free_slots) == len(evaluator.cancel_flags):
+                    await asyncio.sleep(0.01)  # Until it is running in the worker
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+            # The only worker is free again, well before the loops' step limit
+            return await asyncio.wait_for(evaluator.evaluate(FIB + "fib 15", OFFLOAD), timeout=10)
+
+        try:
+            result = run(main())
+        finally:
+            evaluator.close()
+        self.assertEqual((result.offloaded, result.result), ('process', '610'))
+
+    def test_long_sources_compile_off_the_loop(self):
+        source = FIB + "fib 10" + " + 0" * 2000
+        evaluator = AsyncEvaluator()
+        try:
+            result = run(evaluator.evaluate(source))
+            self.assertIsNotNone(evaluator.compile_pool)
+        finally:
+            evaluator.close()
+        self.check_matches_sync(result, source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+'''
+Tests for builtin arities, partial application and registered builtins
+(Builtin, Partial and register_builtin in CSE_Machine/cse_machine.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import unittest
+
+from utils.pipeline import compile_source, evaluate_source
+from CSE_Machine.cse_machine import CSEMachineExecutor, Builtin, Partial, BUILTINS, register_builtin
+from CSE_Machine.output import OutputWriter, CaptureSink
+
+
+def output(source, **options):
+    report = evaluate_source(source, **options)
+    return report['error'] or report['output']
+
+
+class PartialApplicationTest(unittest.TestCase):
+    def test_partial_builtins_are_values(self):
+        self.assertEqual(output("let c = Conc 'a' in Print (c 'b', c 'c')"), '(ab, ac)')
+        self.assertEqual(output("let twice f x = f (f x) in Print (twice (Conc 'x') 'y')"), 'xxy')
+        self.assertEqual(output("let fs = (Conc 'a', Order, Stem) in Print (fs 1 'b', fs 2 (1, 2), fs 3 'xyz')"),
+                         '(ab, 2, x)')
+        self.assertEqual(output("Print (Isfunction (Conc 'a'), Isfunction 'a')"), '(true, false)')
+
+    def test_lazy_and_unfused(self):
+        source = "let c = Conc 'a' in let apply f x = f x in Print (apply c 'b', apply (Conc 'q') 'r')"
+        self.assertEqual(output(source, lazy=True), '(ab, qr)')
+        controls = compile_source(source, fuse=False)
+        machine = CSEMachineExecutor(controls, trace=True, output=OutputWriter(CaptureSink()),
+                                     trailing_newline=False)
+        machine.run()
+        self.assertEqual(machine.output.getvalue(), '(ab, qr)')
+
+    def test_partial_value(self):
+        machine = CSEMachineExecutor(compile_source("Conc 'a'"), trace=False, output=OutputWriter(CaptureSink()))
+        value = machine.run()
+        self.assertIs(type(value), Partial)
+        self.assertEqual((value.name, value.args), ('Conc', ['a']))
+
+
+class RegisteredBuiltinTest(unittest.TestCase):
+    def tearDown(self):
+        BUILTINS.pop('Twice', None)
+
+    def test_register_builtin(self):
+        register_builtin('Twice', lambda a, b: a + 2 * b, arity=2)
+        self.assertEqual(output("let t = Twice 1 in Print (Twice 3 4, t 5)"), '(11, 11)')
+
+    def test_machine_builtins(self):
+        controls = compile_source("Print (Add3 1 2 3)")
+        machine = CSEMachineExecutor(controls, trace=False, output=OutputWriter(CaptureSink()),
+                                     builtins={'Add3': Builtin('Add3', 3, lambda a, b, c: a + b + c)})
+        machine.run()
+        self.assertEqual(machine.output.getvalue(), '6\n')
+        self.assertNotIn('Add3', BUILTINS)
+
+
+if __name__ == '__main__':
+    unittest.main()
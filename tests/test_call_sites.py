@@ -0,0 +1,58 @@
+'''
+Tests for the inline caches of γ call sites (CallSite in CSE_Machine/cse_machine.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import pickle
+import unittest
+
+from utils.pipeline import compile_source, evaluate_source
+from CSE_Machine.cse_machine import CSEMachineExecutor, CallSite, Closure
+from CSE_Machine.output import OutputWriter, CaptureSink
+from CSE_Machine.profiler import ExecutionProfiler
+
+
+def machine(source, profiler=None):
+    return CSEMachineExecutor(compile_source(source, fuse=False), trace=False, profiler=profiler,
+                              output=OutputWriter(CaptureSink()), trailing_newline=False)
+
+
+def call_sites(m):
+    return [instr for control in m.control_structures.values() for instr in control if type(instr) is CallSite]
+
+
+class InlineCacheTest(unittest.TestCase):
+    def test_recursive_calls_hit(self):
+        profiler = ExecutionProfiler()
+        m = machine("let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in fib 15", profiler)
+        self.assertEqual(m.run(), 610)
+        cached = [site for site in call_sites(m) if site.kind is Closure]
+        self.assertTrue(cached)
+        hits = sum(h for h, _ in profiler.call_sites.values())
+        misses = sum(miss for _, miss in profiler.call_sites.values())
+        self.assertGreater(hits, 100 * misses)
+
+    def test_sites_that_see_several_functions(self):
+        # One site applies different lambdas, and one lambda closed over different environments
+        source = """
+        let apply f x = f x in
+        let add n = fn x. x + n in
+        let a = add 1 and b = add 10 in
+        Print (apply (fn x. x + 1) 1, apply (fn x. x * 2) 5, apply a 1, apply b 1, apply a 2, b 3,
+               apply Order (1, 2), apply (Conc 'a') 'b')
+        """
+        self.assertEqual(evaluate_source(source)['output'], '(2, 10, 2, 11, 3, 13, 2, ab)')
+
+    def test_caches_are_not_pickled(self):
+        m = machine("let f x = x in (f 1, f 2)")
+        m.run()
+        site = next(site for site in call_sites(m) if site.kind is not None)
+        copy = pickle.loads(pickle.dumps(site))
+        self.assertEqual((copy, copy.delta_id, copy.position), ('γ', site.delta_id, site.position))
+        self.assertIsNone(copy.kind)
+        self.assertIsNone(copy.body)
+
+
+if __name__ == '__main__':
+    unittest.main()
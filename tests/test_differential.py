@@ -0,0 +1,75 @@
+'''
+Tests for the differential execution harness (benchmarks/differential.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+
+from benchmarks import differential
+
+CORPUS = os.path.join(differential.ROOT, 'benchmarks', 'corpus')
+
+
+def subtracting_engine(source):
+    """The reference engine with every + compiled as - (a known miscompilation)."""
+    controls, kwargs = differential.opt_engine(source)
+    return {delta_id: ['-' if instr == '+' else instr for instr in control]
+            for delta_id, control in controls.items()}, kwargs
+
+
+def looping_engine(source):
+    """Runs forever: δ0 applies λx. x x to itself."""
+    return {0: ['λx^1', 'λx^1', 'γ'], 1: ['x', 'x', 'γ']}, {}
+
+
+def unrepresentable_engine(source):
+    raise differential.Unrepresentable("not supported here")
+
+
+class DifferentialTest(unittest.TestCase):
+    def run_harness(self, *args):
+        out = io.StringIO()
+        engines = {'broken': subtracting_engine, 'looping': looping_engine, 'partial': unrepresentable_engine}
+        with mock.patch.dict(differential.ENGINES, engines), contextlib.redirect_stdout(out):
+            status = differential.main([*args, '--repeats', '1'])
+        return status, out.getvalue()
+
+    def rows(self, report):
+        return {line.split()[0]: line for line in report.splitlines()[1:] if line.strip()}
+
+    def test_corpus_agrees_across_engines(self):
+        status, report = self.run_harness(CORPUS, '--engines', 'opt,fused,st')
+        self.assertEqual(status, 0, report)
+        self.assertIn("0 program(s) diverged or failed", report)
+        self.assertIn("fused: same, 1.00x steps", self.rows(report)['recursion'])
+
+    def test_known_divergence_is_reported(self):
+        status, report = self.run_harness(CORPUS, '--engines', 'opt,broken', '-v')
+        self.assertEqual(status, 1)
+        rows = self.rows(report)
+        self.assertIn("broken: DIVERGES", rows['arithmetic'])
+        self.assertIn("broken: same", rows['booleans'])  # No + to break
+        diverged = report.split("diverged or failed: ")[1].splitlines()[0].split(', ')
+        self.assertIn('arithmetic', diverged)
+        self.assertIn('within', diverged)
+        self.assertNotIn('booleans', diverged)
+
+    def test_runaway_engine_fails_at_its_step_budget(self):
+        status, report = self.run_harness(os.path.join(CORPUS, 'booleans.rpal'), '--engines', 'opt,looping')
+        self.assertEqual(status, 1)
+        self.assertIn("looping: step limit", self.rows(report)['booleans'])
+
+    def test_unrepresentable_programs_are_skipped(self):
+        status, report = self.run_harness(os.path.join(CORPUS, 'booleans.rpal'), '--engines', 'opt,partial')
+        self.assertEqual(status, 0)
+        self.assertIn("partial: skipped, not supported here", report)
+        self.assertIn("1 run(s) skipped: booleans (partial)", report)
+
+
+if __name__ == '__main__':
+    unittest.main()
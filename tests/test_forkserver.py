@@ -0,0 +1,70 @@
+'''
+Tests for the fork server (Server/forkserver.py, myrpal.py --via-forkserver).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROGRAM = "let rec fact n = n eq 0 -> 1 | n * fact (n - 1) in Print (fact 5, 'x')"
+
+
+@unittest.skipUnless(hasattr(socket, 'send_fds') and hasattr(os, 'fork'), "needs fork and fd passing")
+class ForkServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls.tmp.name, 'fork.sock')
+        cls.program = os.path.join(cls.tmp.name, 'fact.rpal')
+        with open(cls.program, 'w') as f:
+            f.write(PROGRAM)
+        cls.server = subprocess.Popen([sys.executable, '-m', 'Server.forkserver', '--socket', cls.socket_path],
+                                      cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        cls.server.stdout.readline()  # 'listening on ...' once it accepts connections
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait()
+        cls.server.stdout.close()
+        cls.tmp.cleanup()
+
+    def myrpal(self, *args, socket_path=None, stdin=None):
+        env = dict(os.environ, RPAL_FORKSERVER_SOCKET=socket_path or self.socket_path)
+        return subprocess.run([sys.executable, 'myrpal.py', *args], cwd=ROOT, env=env, input=stdin,
+                              capture_output=True, text=True, timeout=60)
+
+    def test_output_matches_a_normal_run(self):
+        for flags in ([], ['-ast'], ['--lazy']):
+            with self.subTest(flags=flags):
+                direct = self.myrpal(self.program, *flags)
+                forked = self.myrpal('--via-forkserver', self.program, *flags)
+                self.assertEqual((forked.returncode, forked.stdout), (direct.returncode, direct.stdout))
+                self.assertIn('(120, x)', forked.stdout)
+
+    def test_exit_code_and_stdin_are_passed_through(self):
+        missing = self.myrpal('--via-forkserver', os.path.join(self.tmp.name, 'missing.rpal'))
+        self.assertEqual(missing.returncode, self.myrpal(os.path.join(self.tmp.name, 'missing.rpal')).returncode)
+        self.assertNotEqual(missing.returncode, 0)
+        piped = self.myrpal('--via-forkserver', '-', stdin="Print (1 + 2)")
+        self.assertEqual((piped.returncode, piped.stdout.strip()), (0, '3'))
+
+    def test_server_keeps_serving(self):
+        results = [self.myrpal('--via-forkserver', self.program).stdout for _ in range(3)]
+        self.assertEqual(len(set(results)), 1)
+        self.assertIsNone(self.server.poll())
+
+    def test_falls_back_without_a_server(self):
+        result = self.myrpal('--via-forkserver', self.program,
+                             socket_path=os.path.join(self.tmp.name, 'nobody.sock'))
+        self.assertEqual((result.returncode, result.stdout), (0, self.myrpal(self.program).stdout))
+
+
+if __name__ == '__main__':
+    unittest.main()
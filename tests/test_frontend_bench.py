@@ -0,0 +1,87 @@
+'''
+Tests for the program generator and front-end scaling benchmark
+(benchmarks/generate.py, benchmarks/frontend_bench.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+from benchmarks import frontend_bench
+from benchmarks.generate import SHAPES, generate
+from utils.pipeline import evaluate_source
+
+FLAGS = ['--shapes', 'aug_chain', '--start', '10', '--steps', '4', '--repeats', '1']
+
+
+def timings(exponent):
+    """A measure() stand-in whose phases all take size**exponent microseconds."""
+    def measure(source):
+        size = source.count(' aug ')
+        return {phase: size ** exponent * 1e-6 for phase in frontend_bench.PHASES}, None
+    return measure
+
+
+class GenerateTest(unittest.TestCase):
+    def test_every_shape_runs(self):
+        for shape in SHAPES:
+            with self.subTest(shape=shape):
+                result = evaluate_source(generate(shape, 5))
+                self.assertIsNone(result['error'])
+                self.assertTrue(result['output'])
+
+    def test_unknown_shape(self):
+        with self.assertRaises(ValueError):
+            generate('spiral', 5)
+
+
+class FrontendBenchTest(unittest.TestCase):
+    def bench(self, measure):
+        out = io.StringIO()
+        with mock.patch.object(frontend_bench, 'measure', measure), contextlib.redirect_stdout(out):
+            status = frontend_bench.main(FLAGS)
+        return status, out.getvalue()
+
+    def test_fit_exponent(self):
+        self.assertAlmostEqual(frontend_bench.fit_exponent([(n, 3e-6 * n) for n in (10, 20, 40, 80)]), 1.0)
+        self.assertAlmostEqual(frontend_bench.fit_exponent([(n, 1e-7 * n * n) for n in (10, 20, 40)]), 2.0)
+        self.assertAlmostEqual(frontend_bench.fit_exponent([(10, 0.0), (10, 1e-5), (20, 2e-5)]), 1.0)
+        self.assertIsNone(frontend_bench.fit_exponent([(10, 1e-5), (20, 0.0)]))
+
+    def test_known_superlinear_phase_is_reported(self):
+        status, report = self.bench(timings(2))
+        self.assertEqual(status, 1)
+        self.assertIn("Superlinear: aug_chain/lex, aug_chain/parse", report)
+
+    def test_linear_phases_pass(self):
+        status, report = self.bench(timings(1))
+        self.assertEqual(status, 0)
+        self.assertNotIn("Superlinear", report)
+
+    def test_recursion_limit_is_skipped_not_failed(self):
+        linear = timings(1)
+
+        def measure(source):
+            found, _ = linear(source)
+            if source.count(' aug ') >= 40:
+                return {'lex': found['lex']}, "RecursionError in parse"
+            return found, None
+
+        status, report = self.bench(measure)
+        self.assertEqual(status, 0)
+        self.assertIn("skipped from size 40: RecursionError in parse", report)
+        self.assertIn("Skipped at the recursion limit: aug_chain (from size 40)", report)
+
+    def test_real_sweep(self):
+        rows = frontend_bench.sweep('wide_tuple', [20, 40], 1)
+        self.assertEqual([row['size'] for row in rows], [20, 40])
+        for row in rows:
+            self.assertIsNone(row['skipped'])
+            self.assertEqual(set(row['timings']), set(frontend_bench.PHASES))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+'''
+Tests for compact integer tuples (CSE_Machine/int_tuple.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import pickle
+import unittest
+from unittest import mock
+
+from utils.pipeline import compile_source, evaluate_source
+from CSE_Machine import int_tuple
+from CSE_Machine.int_tuple import IntTuple, COMPACT_LENGTH, compact, append
+from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.output import OutputWriter, CaptureSink
+
+BUILD = "let rec build n = n eq 0 -> nil | (build (n - 1) aug n) in "
+BULK = [
+    "VAdd (Range 1 40) (Range 41 80)",
+    "VSub (Range 1 40) 5",
+    "VMul (Range 1 40) (Range 1 40)",
+    "Dot (Range 1 40) (Range 1 40)",
+    "VEq (Range 1 20) (Reverse (Range 1 20))",
+    "VLs (Range 1 20) 10",
+    "VGr (Range 1 20) (Range 2 21)",
+    "Select (Range 101 140) (Range 5 25)",
+    "Sum (Range 1 1000)",
+    "VMul (Range 1 20) 4611686018427387904",  # Overflows 64 bits
+    "VAdd (Append (Range 1 19) (9223372036854775807, 1)) 1",
+    "Dot (Range 3037000000 3037000020) (Range 3037000000 3037000020)",
+]
+
+
+def run(source):
+    m = CSEMachineExecutor(compile_source(source), trace=False, output=OutputWriter(CaptureSink()),
+                           builtins=None)
+    return m.run()
+
+
+class IntTupleTest(unittest.TestCase):
+    def test_aug_builds_compact_tuples(self):
+        value = run(BUILD + "build 40")
+        self.assertIs(type(value), IntTuple)
+        self.assertEqual(value, list(range(1, 41)))
+        self.assertIs(type(run(BUILD + "build %d" % (COMPACT_LENGTH - 1))), list)
+        self.assertIs(type(run(BUILD + "build 40 aug 'x'")), list)  # A string component
+
+    def test_behaves_like_a_tuple(self):
+        source = BUILD + "let t = build 30 in let f (a, b) = a + b in " \
+                         "Print (t 30, Order t, Null t, Istuple t, t eq build 30, t ne build 29, " \
+                         "f (build 2), (build 20) 20)"
+        self.assertEqual(evaluate_source(source)['output'], '(30, 30, false, true, true, true, 3, 20)')
+        self.assertEqual(evaluate_source(BUILD + "Print (build 20)")['output'],
+                         '(' + ', '.join(map(str, range(1, 21))) + ')')
+
+    def test_values_that_do_not_fit_fall_back_to_lists(self):
+        self.assertIs(type(compact([2 ** 63] + [1] * 20)), list)
+        tup = compact(list(range(20)))
+        self.assertEqual(append(tup, 2 ** 64), list(range(20)) + [2 ** 64])
+        self.assertIs(type(append(tup, 5)), IntTuple)
+        self.assertEqual(pickle.loads(pickle.dumps(tup)), tup)
+
+    def test_tuple_expressions_are_compact(self):
+        literal = '(' + ', '.join(map(str, range(1, 21))) + ')'
+        self.assertIs(type(run(literal)), IntTuple)
+        self.assertIs(type(run("(1, 2, 3)")), list)
+        self.assertIs(type(run(literal[:-1] + ", 'x')")), list)
+        self.assertIs(type(run(literal[:-1] + ", 9223372036854775808)")), list)  # Does not fit 64 bits
+        source = ("let t = %s in let f (a, b, c, d, e, f, g, h, i, j, k, l, m, n, o, p, q, r, s, u) = a + u in "
+                  "Print (t 20, Order t, t eq %s, f t, t aug 21)" % (literal, literal))
+        self.assertEqual(evaluate_source(source)['output'],
+                         '(20, 20, true, 21, (' + ', '.join(map(str, range(1, 22))) + '))')
+
+    def test_aug_checks_only_the_tuple_reaching_compact_length(self):
+        checked = []
+
+        def counting(values):
+            checked.append(len(values))
+            return compact(values)
+
+        with mock.patch('CSE_Machine.cse_machine.compact', counting):
+            self.assertIs(type(run(BUILD + "build 200")), IntTuple)
+            self.assertIs(type(run(BUILD + "(build 10 aug 'x') aug 1 aug 2 aug 3 aug 4 aug 5 aug 6 aug 7 aug 8")),
+                          list)
+        self.assertEqual(checked, [COMPACT_LENGTH, COMPACT_LENGTH])
+
+    def test_bulk_builtins_without_numpy(self):
+        expected = {
+            "Sum (Range 1 1000)": '500500',
+            "Dot (Range 1 40) (Range 1 40)": str(sum(i * i for i in range(1, 41))),
+            "VSub (Range 1 40) 5": '(' + ', '.join(str(i - 5) for i in range(1, 41)) + ')',
+            "VMul (Range 1 20) 4611686018427387904": '(' + ', '.join(str(i * 2 ** 62) for i in range(1, 21)) + ')',
+            "VLs (Range 1 20) 10": '(' + ', '.join('true' if i < 10 else 'false' for i in range(1, 21)) + ')',
+            "Select (Range 101 140) (Range 5 25)": '(' + ', '.join(str(i + 100) for i in range(5, 26)) + ')',
+        }
+        with mock.patch.object(int_tuple, 'numpy', None):
+            for source, result in expected.items():
+                with self.subTest(source=source):
+                    self.assertEqual(evaluate_source(source, stdlib=True)['result'], result)
+
+
+@unittest.skipIf(int_tuple.numpy is None, "NumPy is not installed")
+class NumPyTest(unittest.TestCase):
+    def test_numpy_matches_python_loops(self):
+        for source in BULK:
+            with self.subTest(source=source):
+                with mock.patch.object(int_tuple, 'numpy', None):
+                    loops = evaluate_source(source, stdlib=True)
+                self.assertIsNone(loops['error'])
+                self.assertEqual(evaluate_source(source, stdlib=True)['result'], loops['result'])
+
+    def test_numpy_path_is_taken(self):
+        tup = compact(list(range(COMPACT_LENGTH)))
+        self.assertIsNotNone(int_tuple._vector(tup))
+        with mock.patch.object(int_tuple, '_from_vector', wraps=int_tuple._from_vector) as from_vector:
+            self.assertEqual(list(int_tuple.elementwise('VAdd', '+', tup, 1)), list(range(1, COMPACT_LENGTH + 1)))
+        from_vector.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+'''
+Tests for call-by-need evaluation (--lazy).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import unittest
+
+from utils.pipeline import evaluate_source
+
+STREAMS = '''
+let rec from n = (n, from (n + 1)) in
+let rec filter p s = p (s 1) -> (s 1, filter p (s 2)) | filter p (s 2) in
+let rec nth k s = k eq 1 -> s 1 | nth (k - 1) (s 2) in
+'''
+FIB = "let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in "
+
+
+def lazy(source):
+    return evaluate_source(source, lazy=True)
+
+
+class LazyEvaluationTest(unittest.TestCase):
+    def test_bindings_are_evaluated_once(self):
+        report = lazy("let x = Print 'once' in let f y = (y, y) in Order (f x) + Order (f x)")
+        self.assertIsNone(report['error'])
+        self.assertEqual(report['output'], '')  # Order never needs x
+        report = lazy("let x = Print 'once' in let f y = (y, y) in Istuple (f x) -> (f x) 1 | (f x) 2")
+        self.assertEqual((report['output'], report['result']), ('once', 'once'))
+        report = lazy("let x = Print 'once' in let f y = y in Print (f x, f x, x)")
+        self.assertEqual(report['output'], 'once(once, once, once)')
+
+    def test_unused_components_are_not_evaluated(self):
+        report = lazy("let t = (1 / 0, 2, Print 'no') in t 2")
+        self.assertIsNone(report['error'])
+        self.assertEqual((report['output'], report['result']), ('', '2'))
+        self.assertIsNotNone(evaluate_source("let t = (1 / 0, 2) in t 2")['error'])
+
+    def test_infinite_streams(self):
+        source = STREAMS + "Print (nth 5 (filter (fn x. x / 2 * 2 eq x) (from 1)), nth 10 (from 1))"
+        self.assertEqual(lazy(source)['output'], '(10, 10)')
+        self.assertTrue(evaluate_source(source)['step_limit_exceeded'])
+
+    def test_results_and_output_match_strict(self):
+        for source in [FIB + "Print (fib 10, (fib 5, 'a'), nil)",
+                       FIB + "let t = (fib 3, fib 4) in (t, t eq (2, 3), Order t)",
+                       "let rec f n = n eq 0 -> dummy | (f (n-1), Print n, Print ' ') in f 5",
+                       "let (a, b) = (1 + 1, (2, 3)) in Print (a, b, b 2)"]:
+            with self.subTest(source=source):
+                strict = evaluate_source(source)
+                self.assertEqual({k: lazy(source)[k] for k in ('output', 'result', 'error')},
+                                 {k: strict[k] for k in ('output', 'result', 'error')})
+
+    def test_step_overhead(self):
+        strict = evaluate_source(FIB + "fib 12")
+        delayed = lazy(FIB + "fib 12")
+        self.assertEqual(delayed['result'], strict['result'])
+        self.assertLess(delayed['steps'], 2 * strict['steps'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+'''
+Tests for the shared AST node (utils/node.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import contextlib
+import io
+import unittest
+
+from Lexer.lexer import tokenize
+from Parser.parser import Parser
+from utils.node import ASTNode, NodeKind, LABELS, KINDS_BY_LABEL, node_label, count_nodes
+
+
+def parse(source):
+    return Parser(tokenize(source)).parse()
+
+
+def printed(node):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        node.print_ast()
+    return out.getvalue().splitlines()
+
+
+class NodeTest(unittest.TestCase):
+    def test_parser_builds_typed_leaves(self):
+        tree = parse("let x = 42 in Conc x 'a\\nb'")
+        self.assertEqual(tree.kind, NodeKind.LET)
+        binding, body = tree.children
+        name, number = binding.children
+        self.assertEqual((name.kind, name.value, name.pos), (NodeKind.ID, 'x', 4))
+        self.assertEqual((number.kind, number.value), (NodeKind.INT, 42))
+        self.assertIs(type(number.value), int)
+        string = body.children[1]
+        self.assertEqual((string.kind, string.value), (NodeKind.STR, 'a\\nb'))  # As written
+        self.assertFalse(hasattr(tree, '__dict__'))
+
+    def test_labels(self):
+        self.assertEqual(printed(parse("let f x = x + 1 -> 'y' | true in f nil")),
+                         ['let', '.function_form', '..<ID:f>', '..<ID:x>', '..->', '...+', '....<ID:x>',
+                          '....<INT:1>', "...<STR:'y'>", '...true', '.gamma', '..<ID:f>', '..<nil>'])
+        self.assertEqual(node_label(NodeKind.STR, "it\\'s"), "<STR:'it\\'s'>")
+        self.assertEqual(ASTNode(NodeKind.YSTAR).label, '<Y*>')
+        for kind, label in LABELS.items():
+            if kind > NodeKind.STR:
+                self.assertEqual(KINDS_BY_LABEL[label], kind)
+
+    def test_count_nodes_of_deep_trees(self):
+        node = ASTNode(NodeKind.INT, value=0)
+        for _ in range(100000):
+            node = ASTNode(NodeKind.NEG, [node])
+        self.assertEqual(count_nodes(node), 100001)
+        self.assertEqual(count_nodes(None), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+'''
+Tests for Print and the buffered output layer (CSE_Machine/output.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import io
+import unittest
+
+from utils.pipeline import compile_source, evaluate_source
+from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.output import OutputWriter, CaptureSink
+
+
+def run(source):
+    output = OutputWriter(CaptureSink())
+    machine = CSEMachineExecutor(compile_source(source), trace=False, output=output, trailing_newline=False)
+    return machine.run(), output.getvalue()
+
+
+class PrintTest(unittest.TestCase):
+    def test_print_returns_its_argument(self):
+        # Print leaves the value it was given, not the text it wrote
+        self.assertEqual(run("Print (3, 4)"), ([3, 4], '(3, 4)'))
+        self.assertEqual(run("Print 'a'"), ('a', 'a'))
+        self.assertEqual(run("Print nil"), ([], 'nil\n'))
+        self.assertEqual(run("let x = Print (1, (2, 3)) in Order x"), (2, '(1, (2, 3))'))
+
+    def test_escapes_are_decoded_at_compile_time(self):
+        # \n, \t, \\ and \' are single characters everywhere, not only when printed
+        self.assertEqual(run("Order 'a\\nb'")[0], 3)
+        self.assertEqual(run("Order 'a\\\\b'")[0], 3)
+        self.assertEqual(run("Order 'it\\'s'")[0], 4)
+        self.assertEqual(run("Stem (Stern 'x\\ty')")[0], '\t')
+        self.assertEqual(evaluate_source("Print (Conc 'a\\tb' 'c\\\\d\\n')")['output'], 'a\tbc\\d\n')
+
+
+class OutputWriterTest(unittest.TestCase):
+    def test_buffers_until_the_limit(self):
+        sink = io.StringIO()
+        writer = OutputWriter(sink, buffer_size=8)
+        writer.write('abc')
+        self.assertEqual(sink.getvalue(), '')
+        writer.write('defgh')
+        self.assertEqual(sink.getvalue(), 'abcdefgh')
+        writer.write('i')
+        writer.flush()
+        self.assertEqual(sink.getvalue(), 'abcdefghi')
+
+    def test_deep_tuples_are_written_without_recursion(self):
+        value = [1]
+        for _ in range(5000):
+            value = [value, 2]
+        writer = OutputWriter(CaptureSink())
+        writer.write_value(value)
+        text = writer.getvalue()
+        self.assertTrue(text.startswith('(' * 5001 + '1), 2)'))
+        self.assertEqual(text.count('('), text.count(')'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+'''
+Tests for parallel tuple evaluation (CSE_Machine/parallel.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import pickle
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from Lexer.lexer import tokenize
+from Parser.parser import Parser
+from Standardizer.standardizer import standardize
+from flattener.flat import OptimizedFlattener
+from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.output import OutputWriter, CaptureSink
+from CSE_Machine import parallel
+from CSE_Machine.parallel import ParallelEvaluator
+
+FIB = "let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in "
+
+
+def machine(source, parallel=None, lazy=False):
+    controls = OptimizedFlattener(parallel_tuples=True, lazy=lazy).flatten(
+        standardize(Parser(tokenize(source)).parse()))
+    return CSEMachineExecutor(controls, trace=False, output=OutputWriter(CaptureSink()), parallel=parallel,
+                              max_steps=1000000, lazy=lazy)
+
+
+def run(source, parallel=None, lazy=False):
+    m = machine(source, parallel, lazy)
+    return m.run(), m.output.getvalue()
+
+
+class ParallelTuplesTest(unittest.TestCase):
+    def setUp(self):
+        self.evaluator = None
+
+    def tearDown(self):
+        if self.evaluator is not None:
+            self.evaluator.close()
+
+    def test_cheap_tuples_stay_sequential(self):
+        source = FIB + "let t = (fib 5, fib 6) in let u = (fib 4, fib 7) in Print (t, u)"
+        self.evaluator = ParallelEvaluator(2)
+        self.assertEqual(run(source, self.evaluator), run(source))
+        self.assertIsNone(self.evaluator.pool)
+        self.assertEqual(self.evaluator.tuples, 0)
+        self.assertGreater(self.evaluator.inline, 0)
+
+    def test_one_heavy_component_stays_sequential(self):
+        source = FIB + "Print (fib 15, fib 2)"
+        self.evaluator = ParallelEvaluator(2, min_steps=1000)
+        self.assertEqual(run(source, self.evaluator), run(source))
+        self.assertIsNone(self.evaluator.pool)
+
+    def test_heavy_components_use_the_pool(self):
+        source = FIB + "Print (fib 15, fib 14, fib 2)"
+        self.evaluator = ParallelEvaluator(2, min_steps=1000)
+        self.assertEqual(run(source, self.evaluator), run(source))
+        self.assertIsNotNone(self.evaluator.pool)
+        self.assertEqual(self.evaluator.tuples, 1)
+
+    def test_printing_components_are_not_probed(self):
+        # Print (fib 3) is fused into one instruction; it must still keep the tuple sequential
+        source = FIB + "let t = (fib 5, Print (fib 3), fib 6) in t 1"
+        self.evaluator = ParallelEvaluator(2)
+        self.assertEqual(run(source, self.evaluator), run(source))
+        self.assertEqual((self.evaluator.inline, self.evaluator.fallbacks), (0, 1))
+        self.assertIsNone(self.evaluator.local)  # Turned down before any component ran
+
+    def test_lazy_tuples(self):
+        source = FIB + "let t = (fib 5, fib 6) in let u = (fib 15, fib 14, fib 2) in Print (t, u)"
+        self.evaluator = ParallelEvaluator(2, min_steps=1000)
+        self.assertEqual(run(source, self.evaluator, lazy=True), run(source))
+        self.assertGreater(self.evaluator.inline, 0)
+
+    def test_lazy_probe_keeps_forced_closures_callable(self):
+        # The probe forces f, whose value is a closure over an environment the probe created
+        source = ("let g a = fn y. a + y in let f = g 10 in let h z = z in let t = (h 1, f 1) in "
+                  "let s = Order t in Print (s eq 2 -> f 2 | 0)")
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                evaluator = ParallelEvaluator(2)
+                try:
+                    self.assertEqual(run(source, evaluator, lazy=lazy), (12, '12\n'))
+                finally:
+                    evaluator.close()
+
+    def test_component_closures_are_called_later(self):
+        source = ("let add a = fn b. a + b in let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in "
+                  "let p = (add (fib 5), add (fib 6)) in Print (p 1 2, p 2 3)")
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                evaluator = ParallelEvaluator(2)
+                try:
+                    self.assertEqual(run(source, evaluator, lazy=lazy), run(source))
+                    self.assertEqual(run(source)[1], '(7, 11)\n')
+                finally:
+                    evaluator.close()
+
+    def test_the_pool_carries_on_from_the_probe(self):
+        source = FIB + "Print (fib 15, fib 14, fib 2)"
+        self.evaluator = ParallelEvaluator(2, min_steps=1000)
+        self.evaluator.pool = ThreadPoolExecutor(2)  # Runs the worker function in this process
+        evaluate_component = parallel._evaluate_component
+        resumed_at = []
+
+        def resume(payload, position, *args):
+            parallel._worker_controls = self.evaluator.machine.control_structures
+            resumed_at.append(pickle.loads(payload)[1][position][4])  # The steps its state has run
+            return evaluate_component(payload, position, *args)
+
+        with mock.patch.object(parallel, '_evaluate_component', resume):
+            pooled = machine(source, self.evaluator)
+            pooled.run()
+        sequential = machine(source)
+        sequential.run()
+        self.assertEqual(resumed_at, [1000, 1000])
+        self.assertEqual(self.evaluator.tuples, 1)
+        # No step is run twice, and the step count matches a sequential run
+        self.assertEqual((pooled.output.getvalue(), pooled.steps), (sequential.output.getvalue(), sequential.steps))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+'''
+Tests for superinstruction fusion (flattener/peephole.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import glob
+import os
+import pickle
+import unittest
+
+from flattener.peephole import (Superinstruction, VarConst, VarConstBranch, VarApply, ConstVarApply,
+                                BuiltinApply, fuse_control)
+from utils.pipeline import compile_source
+from utils.symbols import intern
+from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.output import OutputWriter, CaptureSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = sorted(glob.glob(os.path.join(ROOT, 'benchmarks', 'corpus', '*.rpal')))
+
+
+def expand(control):
+    return [part for instr in control
+            for part in (instr.expansion if isinstance(instr, Superinstruction) else [instr])]
+
+
+def run(controls, lazy=False, trace=False, max_steps=None):
+    m = CSEMachineExecutor(controls, trace=trace, output=OutputWriter(CaptureSink()), lazy=lazy, max_steps=max_steps)
+    result = m.run()
+    return result, m.output.getvalue(), m.steps
+
+
+class FusionTest(unittest.TestCase):
+    def test_patterns(self):
+        control = ['n', 1, '-', 'f', 'γ', 'n', 0, 'eq', 'β', 'δ4', 'δ3', 2, 'T', 'γ', 'x', 'y', '+']
+        fused = fuse_control(control)
+        self.assertEqual([type(instr) for instr in fused],
+                         [VarConst, VarApply, VarConstBranch, ConstVarApply, str, str, str])
+        self.assertEqual((fused[2].then_id, fused[2].else_id), (3, 4))
+        self.assertEqual(expand(fused), control)
+
+    def test_pickle_round_trip(self):
+        for instr in [VarConst('n', 1, '-'), VarConstBranch('n', 0, 'eq', 3, 4), VarApply('f'),
+                      ConstVarApply(2, 'T'), BuiltinApply('Conc', 2)]:
+            with self.subTest(instr=instr):
+                copy = pickle.loads(pickle.dumps(instr))
+                self.assertIs(type(copy), type(instr))
+                self.assertEqual(copy.expansion, instr.expansion)
+                if hasattr(instr, 'symbol'):
+                    self.assertEqual(copy.symbol, intern(instr.name))
+        controls = compile_source("let rec f n = n eq 0 -> 1 | n * f (n - 1) in let t = (5, 7) in Print (f 6, t 2)")
+        self.assertEqual(run(pickle.loads(pickle.dumps(controls))), run(controls))
+
+    def test_fused_and_unfused_agree(self):
+        for path in CORPUS:
+            with open(path) as f:
+                source = f.read()
+            for lazy in (False, True):
+                with self.subTest(program=os.path.basename(path), lazy=lazy):
+                    fused = run(compile_source(source, lazy=lazy), lazy)
+                    plain = run(compile_source(source, lazy=lazy, fuse=False), lazy)
+                    self.assertEqual(fused, plain)  # Superinstructions are charged their expansion's steps
+
+    def test_traces_show_the_expansion(self):
+        source = "let rec f n = n eq 0 -> 0 | f (n - 1) in f 3"
+        controls = compile_source(source)
+        self.assertTrue(any(isinstance(instr, Superinstruction) for control in controls.values() for instr in control))
+        m = CSEMachineExecutor(controls, trace=True, output=OutputWriter(CaptureSink()))
+        self.assertFalse(any(isinstance(instr, Superinstruction)
+                             for control in m.control_structures.values() for instr in control))
+        self.assertEqual(m.run(), 0)
+        self.assertEqual(m.steps, run(compile_source(source, fuse=False))[2])
+
+    def test_step_limit_does_not_depend_on_fusion(self):
+        source = "let rec f n = n eq 0 -> 0 | f (n-1) in Print (f 20)"
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                fused = compile_source(source, lazy=lazy)
+                plain = compile_source(source, lazy=lazy, fuse=False)
+                steps = run(plain, lazy)[2]
+                self.assertEqual(run(fused, lazy)[2], steps)
+                for max_steps in (steps, steps - 1, steps - 2, steps // 2):
+                    finished = max_steps >= steps
+                    for controls, trace in ((fused, False), (plain, False), (fused, True)):
+                        result, output, used = run(controls, lazy, trace, max_steps)
+                        self.assertEqual((output == '0\n', used), (finished, min(steps, max_steps)))
+
+
+if __name__ == '__main__':
+    unittest.main()
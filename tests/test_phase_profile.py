@@ -0,0 +1,83 @@
+'''
+Tests for the per-phase profile (utils/phase_profile.py, myrpal.py --profile).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from Lexer.lexer import tokenize
+from utils.phase_profile import PhaseProfiler
+from utils.pipeline import compile_source
+from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.output import OutputWriter, CaptureSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = "let rec sum n = n eq 0 -> 0 | n + sum (n - 1) in Print (sum 10)\n"
+
+
+class PhaseProfilerTest(unittest.TestCase):
+    def test_phases_and_sizes(self):
+        profiler = PhaseProfiler()
+        with profiler.phase('build'):
+            kept = [bytes(1024) for _ in range(64)]
+        profiler.count('items', len(kept))
+        profiler.stop()
+        [phase] = profiler.phases
+        self.assertEqual(phase['phase'], 'build')
+        self.assertGreater(phase['retained_kib'], 64)
+        self.assertGreaterEqual(phase['peak_kib'], phase['retained_kib'])
+        out = io.StringIO()
+        profiler.report('json', out)
+        self.assertEqual(json.loads(out.getvalue()), profiler.as_dict())
+        out = io.StringIO()
+        profiler.report('text', out)
+        self.assertIn('build', out.getvalue())
+        self.assertIn('items', out.getvalue())
+
+    def test_unknown_formats_are_rejected(self):
+        with self.assertRaises(ValueError):
+            PhaseProfiler().report('xml', io.StringIO())
+
+
+class ProfileFlagTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.program = os.path.join(self.tmp.name, 'sum.rpal')
+        with open(self.program, 'w') as f:
+            f.write(SOURCE)
+
+    def myrpal(self, *flags):
+        return subprocess.run([sys.executable, 'myrpal.py', self.program, *flags], cwd=ROOT,
+                              capture_output=True, text=True, timeout=60)
+
+    def test_json_report_matches_the_run(self):
+        run = self.myrpal('--profile=json')
+        self.assertEqual(run.returncode, 0, run.stderr)
+        self.assertEqual(run.stdout.strip(), '55')  # The report stays on stderr
+        report = json.loads(run.stderr)
+        phases = [p['phase'] for p in report['phases']]
+        for phase in ('read', 'lex', 'parse', 'standardize', 'optflatten', 'execute'):
+            self.assertIn(phase, phases)
+        m = CSEMachineExecutor(compile_source(SOURCE), trace=False, output=OutputWriter(CaptureSink()))
+        m.run()
+        sizes = report['sizes']
+        self.assertEqual(sizes['source_size'], len(SOURCE))
+        self.assertEqual(sizes['tokens'], len(tokenize(SOURCE)))
+        self.assertEqual(sizes['cse_steps'], m.steps)
+
+    def test_unknown_format_exits_with_an_error(self):
+        run = self.myrpal('--profile=xml')
+        self.assertEqual(run.returncode, 1)
+        self.assertIn('Unknown profile format: xml', run.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
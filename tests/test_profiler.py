@@ -0,0 +1,63 @@
+'''
+Tests for the instruction-level CSE profiler (CSE_Machine/profiler.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import unittest
+
+from utils.pipeline import compile_source
+from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.output import OutputWriter, CaptureSink
+from CSE_Machine.profiler import ExecutionProfiler
+
+SUM = "let rec sum n = n eq 0 -> 0 | n + sum (n - 1) in Print (sum 10)"
+FIB = "let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in fib 12"
+
+
+def profile(source, lazy=False, fuse=True, max_steps=None):
+    profiler = ExecutionProfiler()
+    m = CSEMachineExecutor(compile_source(source, lazy=lazy, fuse=fuse), trace=False, profiler=profiler,
+                           output=OutputWriter(CaptureSink()), lazy=lazy, max_steps=max_steps)
+    m.run()
+    return m, profiler
+
+
+class ExecutionProfilerTest(unittest.TestCase):
+    def test_steps_match_the_machine(self):
+        for source in (SUM, FIB):
+            for lazy in (False, True):
+                for fuse in (False, True):
+                    with self.subTest(source=source, lazy=lazy, fuse=fuse):
+                        m, profiler = profile(source, lazy=lazy, fuse=fuse)
+                        self.assertEqual(profiler.steps, m.steps)
+                        self.assertEqual(sum(profiler.by_opcode.values()), m.steps)
+                        self.assertEqual(sum(profiler.by_delta.values()), m.steps)
+                        self.assertEqual(sum(profiler.collapsed.values()), m.steps)
+
+    def test_steps_match_at_the_step_limit(self):
+        for limit in (7, 50, 101):
+            with self.subTest(limit=limit):
+                m, profiler = profile(FIB, max_steps=limit)
+                self.assertTrue(m.step_limit_exceeded)
+                self.assertEqual(profiler.steps, m.steps)
+                self.assertEqual(sum(profiler.by_opcode.values()), m.steps)
+
+    def test_functions_are_named_and_counted(self):
+        m, profiler = profile(SUM)
+        [(delta_id, stats)] = [(d, s) for d, s in profiler.functions.items() if profiler.names.get(d) == 'sum']
+        self.assertEqual(stats.calls, 11)
+        self.assertTrue(profiler.function_name(delta_id).startswith('sum (λn^'))
+        self.assertLessEqual(stats.exclusive, m.steps)
+        self.assertEqual(profiler.builtin_calls, {'Print': 1})
+        self.assertIn('VarConstBranch', profiler.by_opcode)
+
+    def test_collapsed_stacks_add_up_to_the_steps(self):
+        m, profiler = profile(FIB)
+        lines = profiler.collapsed_stacks()
+        self.assertTrue(any(';fib (λn^1);fib (λn^1) ' in line for line in lines))
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in lines), m.steps)
+
+
+if __name__ == '__main__':
+    unittest.main()
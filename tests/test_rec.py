@@ -0,0 +1,61 @@
+'''
+Tests for compiling rec to self-referential closures ('ρ' instructions).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import unittest
+from unittest import mock
+
+from flattener.flat import OptimizedFlattener
+from flattener.instructions import Rec
+from utils.pipeline import compile_source, evaluate_source
+
+SIMULTANEOUS = ("let rec (even n = n eq 0 -> true | odd (n - 1) and odd n = n eq 0 -> false | even (n - 1)) "
+                "in Print (even 10, odd 7, even 3)")
+PROGRAMS = [
+    "let rec fact n = n eq 0 -> 1 | n * fact (n - 1) in Print (fact 10)",
+    "let rec f (a, b) = a eq 0 -> b | f (a - 1, b + a) in Print (f (100, 0))",
+    "let make k = let rec g n = n eq 0 -> k | g (n - 1) in g in let h = make 7 in Print (h 5, (make 8) 1)",
+    "let rec count n acc = n eq 0 -> acc | count (n - 1) (acc aug n) in Print (Order (count 50 nil))",
+    "let rec gcd a b = b eq 0 -> a | gcd b (a - a / b * b) in let rec sum n = n eq 0 -> 0 | n + sum (n - 1) "
+    "in Print (gcd 1071 462, sum 200)",
+]
+
+
+def without_rho(source, lazy=False):
+    """Run source with rec compiled the old way: Y* applied to a lambda, called through Eta."""
+    with mock.patch.object(OptimizedFlattener, '_rec_closures', return_value=None):
+        return evaluate_source(source, lazy=lazy)
+
+
+class RecClosureTest(unittest.TestCase):
+    def test_compiles_to_rho(self):
+        controls = compile_source(SIMULTANEOUS)
+        recs = [instr for control in controls.values() for instr in control if type(instr) is Rec]
+        self.assertEqual([str(rec).split(':')[0] for rec in recs], ['ρeven,odd'])
+        self.assertTrue(recs[0].simultaneous)
+
+    def test_output_matches_y_star(self):
+        for source in PROGRAMS:
+            for lazy in (False, True):
+                with self.subTest(source=source, lazy=lazy):
+                    rho = evaluate_source(source, lazy=lazy)
+                    eta = without_rho(source, lazy)
+                    self.assertIsNone(rho['error'])
+                    self.assertEqual((rho['output'], rho['result']), (eta['output'], eta['result']))
+                    self.assertLess(rho['steps'], eta['steps'])
+
+    def test_simultaneous_definitions(self):
+        # Y* cannot bind a tuple of functions; one ρ binds both names
+        self.assertIsNotNone(without_rho(SIMULTANEOUS)['error'])
+        for lazy in (False, True):
+            self.assertEqual(evaluate_source(SIMULTANEOUS, lazy=lazy)['output'], '(true, true, false)')
+
+    def test_deep_recursion(self):
+        report = evaluate_source("let rec f n = n eq 0 -> 0 | 1 + f (n - 1) in f 20000", max_steps=10 ** 6)
+        self.assertEqual((report['error'], report['result']), (None, '20000'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+'''
+Tests for the interactive REPL (Repl/repl.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+from Repl.repl import Repl
+
+
+class ReplTest(unittest.TestCase):
+    def setUp(self):
+        self.repl = Repl()
+
+    def run_line(self, text):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.repl.run_line(text)
+        return out.getvalue()
+
+    def session(self, lines):
+        out = io.StringIO()
+        with mock.patch('builtins.input', side_effect=lines + [EOFError]), contextlib.redirect_stdout(out):
+            self.repl.loop()
+        return out.getvalue().splitlines()[1:]  # After the banner
+
+    def test_definitions_persist(self):
+        self.assertEqual(self.run_line("rec fact n = n eq 0 -> 1 | n * fact (n - 1)"), "fact defined\n")
+        self.assertEqual(self.run_line("a = 3 and b = 4"), "a, b defined\n")
+        self.assertEqual(self.run_line("fact (a + b)"), "5040\n")
+        self.assertEqual(self.run_line("a = 10"), "a defined\n")  # Shadows the earlier a
+        self.assertEqual(self.run_line("(a, b)"), "(10, 4)\n")
+
+    def test_earlier_deltas_are_not_recompiled(self):
+        self.run_line("f x = x + 1")
+        controls = dict(self.repl.flattener.control_structures)
+        self.run_line("f 2")
+        for delta_id, control in controls.items():
+            self.assertIs(self.repl.flattener.control_structures[delta_id], control)
+
+    def test_print_output_and_result_lines(self):
+        self.assertEqual(self.run_line("Print 'hi'"), "hi\nhi\n")
+        self.assertEqual(self.run_line("Print 1, 2"), "1\n(1, 2)\n")
+
+    def test_errors_keep_the_session(self):
+        self.assertEqual(self.run_line("undefined_name"), "NameError: Unbound identifier: undefined_name\n")
+        self.assertEqual(self.run_line("1 / 0"), "ZeroDivisionError: integer division or modulo by zero\n")
+        self.assertEqual(self.run_line("x = 2"), "x defined\n")
+        self.assertEqual(self.run_line("x * x"), "4\n")
+
+    def test_loop_with_continuations_and_meta_commands(self):
+        lines = self.session(["rec f n = n eq 0 ->", "  0 | n + f (n - 1)", "f \\", "10",
+                              ":env", ":steps f 3", ":reset", ":env", ":quit"])
+        self.assertEqual(lines[:3], ["f defined", "55", "f"])
+        self.assertEqual(lines[3], "6")
+        self.assertTrue(lines[4].startswith("[steps: "))
+        self.assertEqual(lines[5:], ["Environment cleared", "(empty)"])
+
+
+if __name__ == '__main__':
+    unittest.main()
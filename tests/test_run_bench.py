@@ -0,0 +1,92 @@
+'''
+Tests for the runtime benchmark suite (benchmarks/run_bench.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import contextlib
+import copy
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks import run_bench
+
+
+def entry(median_s, steps=1000, peak_kib=100.0, output_sha1='same'):
+    return {'median_s': median_s, 'steps': steps, 'peak_kib': peak_kib, 'output_sha1': output_sha1}
+
+
+BASELINE = {
+    'meta': {},
+    'workloads': {
+        'steady': entry(0.010),
+        'slower': entry(0.010),
+        'hungry': entry(0.010),
+        'wrong': entry(0.010),
+        'failed': {'error': 'RuntimeError: workload exceeded the benchmark step budget'},
+        'untimed': entry(0.0),
+    },
+}
+
+
+class CompareTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def compare(self, old, new, *flags):
+        paths = []
+        for name, results in (('old.json', old), ('new.json', new)):
+            paths.append(os.path.join(self.tmp.name, name))
+            with open(paths[-1], 'w') as f:
+                json.dump(results, f)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = run_bench.main(['compare', *paths, *flags])
+        return status, out.getvalue()
+
+    def test_known_regressions_are_reported(self):
+        new = copy.deepcopy(BASELINE)
+        new['workloads']['steady'] = entry(0.0105)  # Within the threshold
+        new['workloads']['slower'] = entry(0.020)
+        new['workloads']['hungry'] = entry(0.010, peak_kib=150.0)
+        new['workloads']['wrong'] = entry(0.010, output_sha1='different')
+        status, report = self.compare(BASELINE, new)
+        self.assertEqual(status, 1)
+        self.assertIn("Regressions above 10%: slower, hungry, wrong", report)
+        rows = {line.split()[0]: line for line in report.splitlines() if line.strip()}
+        self.assertIn('SLOWER', rows['slower'])
+        self.assertIn('+100.0%', rows['slower'])
+        self.assertIn('MORE MEMORY', rows['hungry'])
+        self.assertIn('OUTPUT CHANGED', rows['wrong'])
+        self.assertNotIn('SLOWER', rows['steady'])
+        self.assertIn('not comparable', rows['failed'])
+        self.assertIn('not comparable', rows['untimed'])
+
+    def test_threshold_and_unchanged_runs(self):
+        status, report = self.compare(BASELINE, BASELINE)
+        self.assertEqual(status, 0)
+        self.assertIn("No regressions", report)
+        new = copy.deepcopy(BASELINE)
+        new['workloads']['slower'] = entry(0.020)
+        self.assertEqual(self.compare(BASELINE, new, '--threshold', '150')[0], 0)
+
+    def test_suite_results_compare_against_themselves(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            results = run_bench.run_suite(1, 'naive')
+        [(name, result)] = results['workloads'].items()
+        self.assertEqual(name, 'naive_recursion')
+        self.assertGreater(result['steps'], 0)
+        slowed = copy.deepcopy(results)
+        slowed['workloads'][name]['median_s'] *= 2
+        with contextlib.redirect_stdout(out):
+            self.assertEqual(run_bench.compare(results, results, 10.0), [])
+            self.assertEqual(run_bench.compare(results, slowed, 10.0), [name])
+
+
+if __name__ == '__main__':
+    unittest.main()
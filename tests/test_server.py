@@ -0,0 +1,130 @@
+'''
+Tests for the local evaluation server (Server/server.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import http.client
+import json
+import threading
+import unittest
+from unittest import mock
+
+from Server.server import EvalServer, WorkerPool
+
+
+def start_server(pool):
+    server = EvalServer(0, pool, max_steps=100000, timeout=10.0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def post(server, payload):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=30)
+    try:
+        conn.request('POST', '/eval', json.dumps(payload), {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def post_raw(server, body, headers):
+    """POST body with exactly the given headers (no Content-Length unless listed)."""
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=30)
+    try:
+        conn.putrequest('POST', '/eval')
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.endheaders(body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+class EvalServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = WorkerPool(size=1)
+        cls.server = start_server(cls.pool)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.pool.shutdown()
+
+    def post(self, payload):
+        return post(self.server, payload)
+
+    def test_eval(self):
+        status, report = self.post({'source': 'Print (1 + 2)', 'max_steps': 50, 'timeout': 5})
+        self.assertEqual(status, 200)
+        self.assertEqual(report['output'], '3')
+
+    def test_bad_limits_are_rejected(self):
+        for field, value in [('max_steps', 'abc'), ('max_steps', None), ('max_steps', 0), ('max_steps', -5),
+                             ('max_steps', 2.5), ('max_steps', True), ('timeout', None), ('timeout', 'abc'),
+                             ('timeout', 0), ('timeout', -1.0), ('timeout', [1])]:
+            with self.subTest(field=field, value=value):
+                status, report = self.post({'source': 'Print 1', field: value})
+                self.assertEqual(status, 400)
+                self.assertIn(field, report['error'])
+
+    def test_bad_fields_are_rejected(self):
+        for payload, field in [({'source': 'Print 1', 'lazy': 'false'}, 'lazy'),
+                               ({'source': 'Print 1', 'lazy': 1}, 'lazy'),
+                               ({'source': 'Print 1', 'stdlib': 'true'}, 'stdlib'),
+                               ({'source': 'Print 1', 'stdlib': None}, 'stdlib'),
+                               ({'source': 42}, 'source'),
+                               ({'source': ['Print 1']}, 'source')]:
+            with self.subTest(payload=payload):
+                status, report = self.post(payload)
+                self.assertEqual(status, 400)
+                self.assertIn(field, report['error'])
+        status, report = self.post({'source': 'Print (Sum (1, 2))', 'lazy': True, 'stdlib': True})
+        self.assertEqual((status, report['output']), (200, '3'))
+        status, report = self.post({'source': 'Print 1', 'lazy': False, 'stdlib': False})
+        self.assertEqual((status, report['output']), (200, '1'))
+
+    def test_bad_bodies_are_rejected(self):
+        for headers, body in [({'Content-Type': 'text/plain'}, None),
+                              ({'Content-Type': 'text/plain', 'Content-Length': 'abc'}, None),
+                              ({'Content-Type': 'text/plain', 'Content-Length': '-1'}, None),
+                              ({'Content-Type': 'text/plain', 'Content-Length': '2'}, b'\xff\xfe'),
+                              ({'Content-Type': 'application/json', 'Content-Length': '2'}, b'\xff\xfe')]:
+            with self.subTest(headers=headers, body=body):
+                status, report = post_raw(self.server, body, headers)
+                self.assertEqual(status, 400)
+                self.assertIn('error', report)
+        status, report = post_raw(self.server, b'Print 7', {'Content-Type': 'text/plain', 'Content-Length': '7'})
+        self.assertEqual((status, report['output']), (200, '7'))
+
+
+class WorkerRespawnTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(size=1, max_jobs=1)  # Every job replaces its worker
+        self.server = start_server(self.pool)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.pool.shutdown()
+
+    def test_failed_spawn_keeps_the_slot(self):
+        with mock.patch.object(self.pool, '_spawn', side_effect=RuntimeError("Worker process failed to start")):
+            status, report = post(self.server, {'source': 'Print 1'})
+            self.assertEqual((status, report['output']), (200, '1'))  # The replacement failed after the job
+            status, report = post(self.server, {'source': 'Print 2'})
+            self.assertEqual(status, 503)
+            self.assertIn('No worker available', report['error'])
+            self.assertEqual(self.pool.idle_count(), 1)
+        status, report = post(self.server, {'source': 'Print 3'})
+        self.assertEqual((status, report['output']), (200, '3'))
+        self.assertEqual(self.pool.idle_count(), 1)
+        self.assertEqual(self.server.metrics.snapshot()['unavailable'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
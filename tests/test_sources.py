@@ -0,0 +1,105 @@
+'''
+Tests for source input (utils/file_io.py) and streamed lexing.
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import io
+import os
+import tempfile
+import unittest
+
+from Lexer.lexer import tokenize, tokenize_stream
+from utils.file_io import (FileSource, StreamSource, TextSource, open_source, SourceError,
+                           SourceNotFoundError, SourceDecodeError)
+
+SOURCE = """// A comment that runs to the end of the line
+let rec f n = n eq 0 -> 'done\\n' | (Print 'it\\'s ', f (n - 1)) 2
+and g (x, y) = x ** 2 >= y & not (x ne 3) in
+Print (f 3, g (4, 12), 'tab\\there', -12345, true, nil aug 'x')  // trailing
+"""
+UNICODE = "Print ('héllo ☃', 'café' , 'x') // üñî\n"
+
+
+def triples(tokens):
+    return [(token.type, token.value, token.pos) for token in tokens]
+
+
+def pairs(tokens):
+    return [(token.type, token.value) for token in tokens]
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class SourceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, text, name='prog.rpal'):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_streamed_tokens_match_whole_text(self):
+        expected = triples(tokenize(SOURCE))
+        for size in (1, 2, 3, 5, 8, 13, 64, len(SOURCE)):
+            with self.subTest(size=size):
+                self.assertEqual(triples(tokenize_stream(chunked(SOURCE, size))), expected)
+
+    def test_file_sources_match_text(self):
+        path = self.write(SOURCE)
+        expected = triples(TextSource(SOURCE).tokens())
+        for use_mmap in (True, False):
+            with self.subTest(use_mmap=use_mmap), open_source(path, use_mmap=use_mmap) as source:
+                self.assertEqual(source.map is not None, use_mmap)
+                self.assertEqual(triples(source.tokens()), expected)
+
+    def test_multibyte_characters_split_across_reads(self):
+        expected = pairs(tokenize(UNICODE))
+        data = UNICODE.encode('utf-8')
+        for size in (1, 2, 3, 7):
+            with self.subTest(size=size):
+                self.assertEqual(pairs(StreamSource(io.BytesIO(data), chunk_size=size).tokens()), expected)
+        with FileSource(self.write(UNICODE)) as source:
+            self.assertEqual(pairs(source.tokens()), expected)
+
+    def test_empty_file(self):
+        with open_source(self.write('', 'empty.rpal')) as source:
+            self.assertEqual(pairs(source.tokens()), pairs(tokenize('')))
+
+    def test_errors(self):
+        with self.assertRaises(SourceNotFoundError):
+            open_source(os.path.join(self.tmp.name, 'missing.rpal'))
+        with self.assertRaises(SourceError):
+            open_source(self.tmp.name)  # A directory
+
+    def test_invalid_utf8_is_a_source_error(self):
+        path = os.path.join(self.tmp.name, 'bad.rpal')
+        for data, offset in [(b"Print 'caf\xc3", 10),            # Truncated character
+                             (b"Print 1,\n'ab\xffcd'", 12),       # Invalid byte in a string
+                             (b"Print '\xe2\x82' // \xff", 7)]:   # Invalid sequence
+            with open(path, 'wb') as f:
+                f.write(data)
+            for size in (1, 2, 3, 100):
+                with self.subTest(data=data, size=size):
+                    with self.assertRaises(SourceDecodeError) as caught:
+                        StreamSource(io.BytesIO(data), 'bad.rpal', chunk_size=size).tokens()
+                    self.assertEqual((caught.exception.name, caught.exception.offset), ('bad.rpal', offset))
+            for use_mmap in (True, False):
+                with self.subTest(data=data, use_mmap=use_mmap), open_source(path, use_mmap=use_mmap) as source:
+                    with self.assertRaises(SourceError) as caught:
+                        source.tokens()
+                    self.assertEqual(str(caught.exception), f"'{path}' is not valid UTF-8 (byte {offset}).")
+        with self.assertRaises(UnicodeDecodeError) as caught:
+            tokenize(b"Print 1, 'a\xff'")  # Bytes lexed directly: the offset is in the whole source
+        self.assertEqual(caught.exception.start, 11)
+        with self.assertRaises(SourceDecodeError):
+            StreamSource(io.TextIOWrapper(io.BytesIO(b"'\xff'"), encoding='utf-8')).tokens()
+
+
+if __name__ == '__main__':
+    unittest.main()
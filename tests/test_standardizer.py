@@ -0,0 +1,72 @@
+'''
+Tests for standardization with structural sharing (Standardizer/standardizer.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import unittest
+
+from Lexer.lexer import tokenize
+from Parser.parser import Parser
+from Standardizer.standardizer import standardize
+from utils.node import NodeKind
+from utils.pipeline import evaluate_source
+
+PROGRAM = """
+let rec fact n = n eq 0 -> 1 | n * fact (n - 1)
+and pair = (1, 'a', 3 * 2)
+in let f (x, y) = x + y within g z = f (z, z)
+in Print (fact 5, pair, g 4, (h 2 where h = fn q. q * q), not true, 'a' @Conc 'b')
+"""
+
+
+def parse(source):
+    return Parser(tokenize(source)).parse()
+
+
+def shape(node):
+    return (node.kind, node.value, node.pos, tuple(shape(child) for child in node.children))
+
+
+def nodes(root):
+    found, pending = [], [root]
+    while pending:
+        node = pending.pop()
+        found.append(node)
+        pending.extend(node.children)
+    return found
+
+
+class StandardizeTest(unittest.TestCase):
+    def test_ast_is_left_unchanged(self):
+        ast = parse(PROGRAM)
+        before = shape(ast)
+        standardize(ast)
+        standardize(ast)
+        self.assertEqual(shape(ast), before)
+
+    def test_unchanged_subtrees_are_shared(self):
+        ast = parse("(f x, 1 eq 2, (3, 'a'))")
+        st = standardize(ast)
+        self.assertIs(st, ast)  # Already standard: nothing is copied
+        ast = parse("let x = 1 in (f x, (3, 'a'))")
+        st = standardize(ast)
+        body = ast.children[1]
+        self.assertIs(st.children[0].children[1], body)
+        self.assertIs(st.children[1], ast.children[0].children[1])
+
+    def test_leaves_are_never_copied(self):
+        ast = parse(PROGRAM)
+        st = standardize(ast)
+        ast_leaves = {id(node) for node in nodes(ast) if node.kind in (NodeKind.ID, NodeKind.INT, NodeKind.STR)}
+        st_leaves = {id(node) for node in nodes(st) if node.kind in (NodeKind.ID, NodeKind.INT, NodeKind.STR)}
+        self.assertTrue(st_leaves <= ast_leaves)
+        operators = [node for node in nodes(st) if node.kind == NodeKind.PLUS]
+        self.assertEqual(len({id(node) for node in operators}), 1)  # One shared '+' leaf
+
+    def test_evaluation_is_unaffected(self):
+        self.assertEqual(evaluate_source(PROGRAM)['output'], '(120, (1, a, 6), 8, 4, false, ab)')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+'''
+Tests for the native standard library (CSE_Machine/stdlib.py, --stdlib).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import unittest
+
+from utils.pipeline import evaluate_source
+
+
+def stdlib(source, **options):
+    report = evaluate_source(source, stdlib=True, **options)
+    return report['error'] or report['result']
+
+
+class StdlibTest(unittest.TestCase):
+    def test_sequences(self):
+        cases = {
+            "Reverse (1, 'a', 3)": "(3, a, 1)",
+            "Append (1, 2) (3, 'x')": "(1, 2, 3, x)",
+            "Range 3 7": "(3, 4, 5, 6, 7)",
+            "Range 3 2": "nil",
+            "(Sum (Range 1 100), Product (1, 2, 3, 4), Min (5, -2, 9), Max (5, -2, 9))": "(5050, 24, -2, 9)",
+            "Split ',' 'a,b,,c'": "(a, b, , c)",
+            "Join '-' ('x', 'y', 'z')": "x-y-z",
+            "(StoI '42' + 1, Chars 'abc')": "(43, (a, b, c))",
+        }
+        for source, expected in cases.items():
+            with self.subTest(source=source):
+                self.assertEqual(stdlib(source), expected)
+
+    def test_higher_order(self):
+        self.assertEqual(stdlib("Map (fn x. x * x) (Range 1 5)"), "(1, 4, 9, 16, 25)")
+        self.assertEqual(stdlib("Filter (fn x. x / 2 * 2 eq x) (Range 1 10)"), "(2, 4, 6, 8, 10)")
+        self.assertEqual(stdlib("Fold (fn a. fn b. a - b) 100 (1, 2, 3)"), "94")
+        self.assertEqual(stdlib("let sq = Map (fn x. x * x) in (sq (1, 2), sq nil)"), "((1, 4), nil)")
+        self.assertEqual(stdlib("let rec f n = n < 2 -> n | f (n-1) + f (n-2) in Map f (Range 1 10)", lazy=True),
+                         "(1, 1, 2, 3, 5, 8, 13, 21, 34, 55)")
+
+    def test_function_calls_count_against_the_budget(self):
+        source = "Map (fn x. x + 1) (Range 1 1000)"
+        self.assertGreater(evaluate_source(source, stdlib=True)['steps'], 1000)
+        self.assertTrue(evaluate_source(source, stdlib=True, max_steps=500)['step_limit_exceeded'])
+        self.assertLess(evaluate_source("Sum (Range 1 100000)", stdlib=True)['steps'], 10)
+
+    def test_errors(self):
+        self.assertEqual(stdlib("Min nil"), "ValueError: Min of an empty tuple")
+        self.assertTrue(stdlib("Sum 'abc'").startswith("TypeError"))
+        self.assertTrue(stdlib("Filter (fn x. x) (1, 2)").startswith("TypeError"))
+
+    def test_opt_in(self):
+        # Without --stdlib the names are ordinary identifiers
+        self.assertEqual(evaluate_source("let Sum x = x + 1 in Sum 2")['result'], "3")
+        self.assertTrue(evaluate_source("Sum (1, 2)")['error'].startswith("NameError"))
+
+
+if __name__ == '__main__':
+    unittest.main()
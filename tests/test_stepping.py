@@ -0,0 +1,109 @@
+'''
+Tests for step-sliced execution (CSEMachineExecutor.step and slices) and
+evaluate_delta.
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import unittest
+
+from utils.pipeline import compile_source
+from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.output import OutputWriter, CaptureSink
+
+PROGRAMS = [
+    "let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in Print (fib 12)",
+    "let rec f n = n eq 0 -> 'done' | (Print n, Print ' ', f (n-1)) 3 in f 20",
+    "let rec from n = (n, from (n + 1)) in let rec nth k s = k eq 1 -> s 1 | nth (k - 1) (s 2) in nth 30 (from 1)",
+]
+
+
+def machine(source, lazy=False, max_steps=None):
+    return CSEMachineExecutor(compile_source(source, lazy=lazy), max_steps=max_steps, trace=False,
+                              output=OutputWriter(CaptureSink()), lazy=lazy)
+
+
+def state(m):
+    return m.result, m.output.getvalue(), m.steps, m.step_limit_exceeded
+
+
+class SteppingTest(unittest.TestCase):
+    def test_slices_resume_where_they_stopped(self):
+        for source in PROGRAMS:
+            for lazy in (False, True):
+                with self.subTest(source=source, lazy=lazy):
+                    whole = machine(source, lazy)
+                    whole.run()
+                    for n in (1, 7, 1000):
+                        sliced = machine(source, lazy)
+                        while not sliced.step(n):
+                            pass
+                        self.assertEqual(state(sliced), state(whole))
+
+    def test_slices_generator(self):
+        m = machine(PROGRAMS[0])
+        counts = []
+        generator = m.slices(500)
+        try:
+            while True:
+                counts.append(next(generator))
+        except StopIteration as stop:
+            result = stop.value
+        whole = machine(PROGRAMS[0])
+        self.assertEqual(result, whole.run())
+        self.assertEqual(counts, list(range(500, whole.steps, 500))[:len(counts)])
+        self.assertGreater(len(counts), 1)
+
+    def test_interleaved_programs(self):
+        machines = [machine(source) for source in PROGRAMS[:2]]
+        expected = []
+        for source in PROGRAMS[:2]:
+            m = machine(source)
+            m.run()
+            expected.append(state(m))
+        running = list(machines)
+        while running:
+            running = [m for m in running if not m.step(50)]
+        self.assertEqual([state(m) for m in machines], expected)
+
+    def test_lazy_results_are_forced_in_slices(self):
+        source = "let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in (fib 12, (fib 10, 'x'))"
+        m = machine(source, lazy=True)
+        counts = [0]
+        while not m.step(50):
+            counts.append(m.steps)
+        self.assertTrue(all(b - a <= 50 for a, b in zip(counts, counts[1:])))
+        self.assertGreater(len(counts), 10)
+        self.assertEqual(m.result, [144, [55, 'x']])
+
+    def test_step_limit_stops_slicing(self):
+        m = machine(PROGRAMS[0], max_steps=300)
+        slices = 0
+        while not m.step(100):
+            slices += 1
+        self.assertTrue(m.step_limit_exceeded)
+        self.assertEqual((slices, m.steps), (2, 300))
+        self.assertTrue(m.step(100))  # Finished machines stay finished
+
+
+class EvaluateDeltaTest(unittest.TestCase):
+    def test_rec_environments_stay_active(self):
+        # The ρ env outlives the evaluation in the closure it binds
+        m = machine("let rec f n = n eq 0 -> 0 | f (n - 1) in f")
+        f = m.evaluate_delta(0, m.environments[0])
+        rec_env = m.find_env_by_index(f.env_index)
+        self.assertFalse(rec_env.is_removed)
+        self.assertEqual(len(m.environments) - m.envs_removed,
+                         sum(1 for env in m.environments if not env.is_removed))
+
+    def test_interrupted_calls_are_removed(self):
+        m = machine("let rec f n = n eq 0 -> 1 / 0 | f (n - 1) in f 5")
+        with self.assertRaises(ZeroDivisionError):
+            m.evaluate_delta(0, m.environments[0])
+        active = [env.index for env in m.environments if not env.is_removed]
+        self.assertEqual(len(active), 2)  # The global env and f's ρ env
+        self.assertEqual(m.envs_removed, len(m.environments) - 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+'''
+Tests for the symbol table (utils/symbols.py).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import asyncio
+import threading
+import unittest
+
+from utils.symbols import SYMBOLS, SymbolTable
+from utils.pipeline import evaluate_source, compile_source
+from utils.async_pipeline import AsyncEvaluator, Limits
+from flattener.instructions import Variable, Lambda, Delay
+
+
+class SymbolScopeTest(unittest.TestCase):
+    def test_scoped_names_are_dropped(self):
+        table = SymbolTable()
+        kept = table.intern('kept')
+        with table.scope():
+            shared = table.intern('kept')
+            scoped = table.intern('scoped')
+            self.assertEqual(shared, kept)
+            self.assertEqual(table.name(scoped), 'scoped')
+        self.assertIn('kept', table)
+        self.assertNotIn('scoped', table)
+        self.assertNotEqual(table.intern('scoped'), scoped)  # Ids are never reused
+
+    def test_overlapping_scopes(self):
+        table = SymbolTable()
+        outer = table.scope()
+        outer.__enter__()
+        symbol = table.intern('x')
+        with table.scope():
+            self.assertEqual(table.intern('x'), symbol)
+        self.assertEqual(table.name(symbol), 'x')
+        outer.__exit__(None, None, None)
+        self.assertNotIn('x', table)
+
+    def test_names_used_outside_a_scope_are_kept(self):
+        table = SymbolTable()
+        with table.scope():
+            symbol = table.intern('x')
+            thread = threading.Thread(target=table.intern, args=('x',))  # Outside any scope
+            thread.start()
+            thread.join()
+        self.assertEqual(table.name(symbol), 'x')
+
+    def test_keep(self):
+        table = SymbolTable()
+        with table.scope() as scope:
+            symbol = table.intern('f')
+            table.keep(scope)
+        self.assertEqual(table.name(symbol), 'f')
+
+    def test_evaluate_source_does_not_grow_the_table(self):
+        source = "let {} x = x + 1 in Print ({} 2)"
+        evaluate_source(source.format('warm', 'warm'))
+        size = len(SYMBOLS)
+        for i in range(20):
+            name = f'unique_name_{i}'
+            self.assertEqual(evaluate_source(source.format(name, name))['output'], '3')
+            self.assertNotIn(name, SYMBOLS)
+        self.assertEqual(len(SYMBOLS), size)
+
+    def test_async_results_keep_their_names(self):
+        evaluator = AsyncEvaluator()
+        try:
+            report = asyncio.run(evaluator.evaluate("let async_dropped = 1 in async_dropped + 1"))
+            self.assertEqual(report.result, '2')
+            self.assertNotIn('async_dropped', SYMBOLS)
+            report = asyncio.run(evaluator.evaluate("fn async_kept . async_kept + 1", Limits()))
+            self.assertIn('async_kept', str(report.value))
+            self.assertIn('async_kept', SYMBOLS)
+        finally:
+            evaluator.close()
+
+    def test_thread_offload_stays_in_scope(self):
+        # Most of the run happens in the worker thread, outside the task that opened the scope
+        source = ("let f x = x + 1 in let thread_name = 5 in "
+                  "let rec loop n = n eq 0 -> f thread_name | loop (n-1) in loop 50")
+        evaluator = AsyncEvaluator(offload='thread')
+        try:
+            report = asyncio.run(evaluator.evaluate(
+                source, Limits(slice_steps=10, inline_steps=10, worker_slice_steps=20), lazy=True))
+            self.assertEqual(report.offloaded, 'thread')
+            self.assertEqual(report.result, '6')
+            self.assertNotIn('thread_name', SYMBOLS)
+        finally:
+            evaluator.close()
+
+    def test_controls_carry_symbol_ids(self):
+        controls = compile_source("let f x = x + 1 in Print (f 2)", fuse=False)
+        instrs = [instr for control in controls.values() for instr in control]
+        variables = [instr for instr in instrs if type(instr) is Variable]
+        self.assertEqual(sorted(variables), ['f', 'x'])
+        for variable in variables:
+            self.assertEqual(SYMBOLS.name(variable.symbol), variable)
+        header = next(instr for instr in instrs if type(instr) is Lambda)
+        self.assertEqual([SYMBOLS.name(p) for p in header.params], ['x'])
+        self.assertIn('Print', instrs)
+        self.assertNotIn('Print', variables)  # Builtins stay names
+        lazy = compile_source("let f x = x in let y = 2 in f y", lazy=True, fuse=False)
+        delay = next(instr for control in lazy.values() for instr in control if type(instr) is Delay)
+        self.assertEqual((delay, SYMBOLS.name(delay.symbol)), ('θy', 'y'))
+
+
+if __name__ == '__main__':
+    unittest.main()
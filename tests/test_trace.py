@@ -0,0 +1,120 @@
+'''
+Tests for compact execution traces (CSE_Machine/trace.py, -cse, --trace-file).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from utils.pipeline import compile_source
+from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.output import OutputWriter, CaptureSink
+from CSE_Machine.trace import TraceWriter, TraceReader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROGRAMS = [
+    "let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in Print (fib 6, 'x')",
+    "let rec f n = n eq 0 -> nil | (f (n-1) aug n) in let a, b = f 4, Order (f 3) in a 2 + b",
+    "let Sum t = let rec s n = n eq 0 -> 0 | t n + s (n - 1) in s (Order t) in Sum (1, 2, 3) eq 6 -> 'yes' | 'no'",
+]
+
+
+def machine(source, trace=False):
+    return CSEMachineExecutor(compile_source(source), trace=trace, output=OutputWriter(CaptureSink()),
+                              trailing_newline=False)
+
+
+def traced(source, out=None, snapshot_every=7):
+    m = machine(source, trace=True)
+    m.tracer = TraceWriter(m, out, snapshot_every=snapshot_every)
+    m.step(None)
+    return m
+
+
+def live_states(source):
+    """The states a trace should hold, read off a machine stepped one instruction at a time."""
+    m = machine(source, trace=True)
+    m.trace_enabled = False  # The instructions of a traced run, without recording them
+    states = []
+    while m.control:
+        control = list(m.control)
+        states.append({'instr': str(control[-1]), 'control': [repr(item) for item in reversed(control[:-1])],
+                       'stack': [repr(item) for item in m.stack], 'current_env': m.current_env.index,
+                       'active_envs': [f'e{env.index}' for env in m.environments if not env.is_removed]})
+        m.step(1)
+    return states
+
+
+class TraceTest(unittest.TestCase):
+    def test_states_match_a_live_machine(self):
+        for source in PROGRAMS:
+            with self.subTest(source=source):
+                expected = live_states(source)
+                reader = traced(source).tracer.reader()
+                self.assertEqual(reader.steps, len(expected))
+                self.assertEqual([state for _, state in reader.states()], expected)
+                # Any step on its own, from the nearest snapshot
+                for step in (1, 7, 8, 13, len(expected)):
+                    self.assertEqual(reader.state(step), expected[step - 1])
+                self.assertEqual([step for step, _ in reader.states(5, 9)], [5, 6, 7, 8, 9])
+
+    def test_jsonl_round_trip_through_a_file(self):
+        source = PROGRAMS[0]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.jsonl')
+            m = traced(source, path, snapshot_every=10)
+            m.tracer.out.close()
+            with open(path, 'rb') as f:
+                lines = f.read().splitlines()
+            reader = TraceReader(path)
+            try:
+                self.assertEqual(reader.header['snapshot_every'], 10)
+                self.assertEqual(reader.steps, m.steps)
+                # A snapshot every 10 steps, indexed by byte offset in the footer
+                self.assertEqual([step for step, _ in reader.index], list(range(1, m.steps + 1, 10)))
+                for step, offset in reader.index:
+                    reader.stream.seek(offset)
+                    self.assertTrue(reader.stream.readline().startswith(b'{"step":%d,' % step))
+                self.assertTrue(lines[-1].startswith(b'{"index"'))
+                states = list(reader.states())
+            finally:
+                reader.close()
+        self.assertEqual([state for _, state in states], live_states(source))
+
+    def test_a_trace_without_a_footer_is_scanned(self):
+        m = traced(PROGRAMS[1])
+        data = m.tracer.out.getvalue()
+        complete = TraceReader(data)
+        interrupted = TraceReader(data[:data.rstrip(b'\n').rfind(b'\n') + 1])
+        self.assertEqual((interrupted.steps, interrupted.index), (complete.steps, complete.index))
+        self.assertEqual(list(interrupted.states()), list(complete.states()))
+        with self.assertRaises(IndexError):
+            complete.state(complete.steps + 1)
+        with self.assertRaises(ValueError):
+            TraceReader(b'{"format":"other"}\n')
+
+    def test_cse_flag_matches_the_trace_file(self):
+        source = PROGRAMS[0]
+        with tempfile.TemporaryDirectory() as directory:
+            program = os.path.join(directory, 'program.rpal')
+            path = os.path.join(directory, 'trace.jsonl')
+            with open(program, 'w') as f:
+                f.write(source)
+            env = dict(os.environ, PYTHONPATH=ROOT)
+            printed = subprocess.run([sys.executable, 'myrpal.py', program, '-cse'], cwd=ROOT, env=env,
+                                     capture_output=True, text=True, check=True).stdout
+            subprocess.run([sys.executable, 'myrpal.py', program, '--trace-file=' + path], cwd=ROOT, env=env,
+                           capture_output=True, check=True)
+            replayed = subprocess.run([sys.executable, '-m', 'CSE_Machine.trace', path], cwd=ROOT, env=env,
+                                      capture_output=True, text=True, check=True).stdout
+        self.assertIn("\nCSE Machine Execution Trace:\n", printed)
+        self.assertTrue(replayed.startswith("\nStep 1:\n  Instruction: "))
+        self.assertTrue(printed.endswith(replayed))
+
+
+if __name__ == '__main__':
+    unittest.main()
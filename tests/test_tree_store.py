@@ -0,0 +1,83 @@
+'''
+Tests for the array-backed trees (utils/tree_store.py, --tree-store).
+
+Run from the project root with: python -m pytest -q tests
+'''
+
+import unittest
+
+from Lexer.lexer import tokenize
+from Parser.parser import Parser
+from Standardizer.standardizer import standardize, standardize_store
+from flattener.flat import OptimizedFlattener
+from utils.node import NodeKind
+from utils.tree_store import TreeStore
+
+PROGRAMS = [
+    "let rec fib n = n < 2 -> n | fib (n-1) + fib (n-2) in Print (fib 10, fib 5)",
+    "let f (x, y) = x + y and g = fn z. -z in Print (f (1, 2), g 3, not true)",
+    "let t = (1, 'a\\nb', nil aug 3) in t @Conc 'x' where Conc = fn a. fn b. a",
+    "let c = 3 within f x = x + c in Print (f 1, (f 2, f 3), Order (1, 2) eq 2 & true or false)",
+    "let rec even n = n eq 0 -> true | odd (n - 1) and odd n = n eq 0 -> false | even (n - 1) in even 10",
+]
+
+
+def build(source):
+    store = TreeStore()
+    ast_root = Parser(tokenize(source), store).parse()
+    return store, ast_root
+
+
+def snapshot(store, root):
+    """The tree below root as nested tuples, to check it was left as it was."""
+    return (store.kinds[root], store.value(root), tuple(snapshot(store, c) for c in store.children(root)))
+
+
+def shape(node):
+    return (node.kind, node.value, tuple(shape(child) for child in node.children))
+
+
+class TreeStoreTest(unittest.TestCase):
+    def test_standardizing_shares_rows(self):
+        store, ast_root = build(PROGRAMS[0])
+        before = snapshot(store, ast_root)
+        leaves = [i for i in range(len(store.kinds)) if not store.child_count[i]]
+        st_root = standardize_store(store, ast_root)
+        self.assertEqual(snapshot(store, ast_root), before)  # The AST is unchanged
+        # Every identifier and constant of the standardized tree is a row of the AST
+        pending, st_leaves = [st_root], set()
+        while pending:
+            index = pending.pop()
+            children = store.children(index)
+            if not children and store.kinds[index] in (NodeKind.ID, NodeKind.INT, NodeKind.STR):
+                st_leaves.add(index)
+            pending.extend(children)
+        self.assertTrue(st_leaves <= set(leaves))
+
+    def test_operator_leaves_are_shared(self):
+        store, ast_root = build("(1 + 2, 3 + 4, 5 + 6)")
+        size = len(store.kinds)
+        standardize_store(store, ast_root)
+        plus = [i for i in range(size, len(store.kinds)) if store.kinds[i] == NodeKind.PLUS]
+        self.assertEqual(plus, [store.leaf(NodeKind.PLUS)])
+
+    def test_matches_the_object_trees(self):
+        for source in PROGRAMS:
+            with self.subTest(source=source):
+                store, ast_root = build(source)
+                st = standardize(Parser(tokenize(source)).parse())
+                self.assertEqual(snapshot(store, standardize_store(store, ast_root)), shape(st))
+
+    def test_flatten_store_matches_flatten(self):
+        for source in PROGRAMS:
+            for options in ({}, {'lazy': True}, {'parallel_tuples': True}):
+                with self.subTest(source=source, options=options):
+                    store, ast_root = build(source)
+                    st_root = standardize_store(store, ast_root)
+                    st = standardize(Parser(tokenize(source)).parse())
+                    self.assertEqual(OptimizedFlattener(**options).flatten_store(store, st_root),
+                                     OptimizedFlattener(**options).flatten(st))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,312 @@
+'''
+asyncio API for running RPAL programs inside an event loop.
+
+    result = await evaluate(source, Limits(max_steps=1_000_000, timeout=5))
+    print(result.output, result.result, result.error)
+
+A program starts inline, in slices of CSE steps with a yield to the event
+loop after each one, so short programs never leave the loop's thread; a
+source longer than COMPILE_INLINE_CHARS is compiled on a worker thread, so
+it does not hold up other coroutines either. One that is still running
+after inline_steps moves to a worker thread (or a process pool) and carries
+on from where it paused. A semaphore caps how many evaluations run at once,
+and cancelling the awaiting task stops the machine after the slice in
+progress, in a worker process too: each offloaded run gets a slot in a
+shared array of cancel flags, which the worker checks between slices.
+Output is always captured, never printed.
+Each evaluation interns its names in a symbol scope (utils/symbols.py), so
+a long-running loop does not accumulate them; they are kept only when the
+returned value is a function or holds one.
+'''
+
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from utils.pipeline import compile_source, format_value
+from utils.symbols import SYMBOLS
+from CSE_Machine.cse_machine import CSEMachineExecutor, Closure, Eta, Thunk, Partial
+from CSE_Machine.output import OutputWriter, CaptureSink
+
+MAX_CONCURRENT = 8
+COMPILE_INLINE_CHARS = 4096  # Longer sources are compiled on a worker thread
+
+_cancel_flags = None  # Worker processes: the pool's shared cancel flags, one per slot
+
+
+class Limits:
+    """
+    Per-evaluation limits.
+
+    Args:
+        max_steps: CSE step budget (None uses the machine's default)
+        timeout: Wall-clock seconds before the evaluation is stopped (None for no limit)
+        slice_steps: Steps per slice while running inline
+        inline_steps: Steps to run inline before moving to a worker (None never moves)
+        worker_slice_steps: Steps per slice in a worker thread; cancellation waits for at most one
+    """
+
+    def __init__(self, max_steps=None, timeout=None, slice_steps=2000, inline_steps=50_000,
+                 worker_slice_steps=50_000):
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.slice_steps = slice_steps
+        self.inline_steps = inline_steps
+        self.worker_slice_steps = worker_slice_steps
+
+
+class EvaluationResult:
+    """Everything an evaluation produced; the fields match evaluate_source's report."""
+
+    def __init__(self):
+        self.output = ''
+        self.result = None               # Formatted the way Print shows it
+        self.value = None                # The raw machine value
+        self.steps = 0
+        self.step_limit_exceeded = False
+        self.timed_out = False
+        self.offloaded = None            # None, 'thread' or 'process'
+        self.error = None
+        self.timings = {'compile': 0.0, 'execute': 0.0}
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return f"<EvaluationResult result={self.result!r} steps={self.steps} error={self.error!r}>"
+
+
+def _holds_symbols(value):
+    """Whether value can reach symbol ids: a closure, thunk or partial application, or a tuple with one."""
+    if isinstance(value, list):
+        return any(_holds_symbols(item) for item in value)
+    return isinstance(value, (Closure, Eta, Thunk, Partial))
+
+
+def _init_process_worker(cancel_flags):
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+
+
+def _finish_machine(data, deadline, slice_steps, slot):
+    """
+    Process worker: run a paused machine (pickled) to the end, or until the
+    deadline or until the parent sets this run's cancel flag; returns the
+    fields the caller needs, with the value pickled. Both cross as bytes so
+    they are loaded and dumped inside the worker's own symbol scope.
+    """
+    with SYMBOLS.scope():
+        machine = pickle.loads(data)
+        error = None
+        timed_out = False
+        try:
+            while not machine.step(slice_steps):
+                if deadline is not None and time.time() > deadline:
+                    timed_out = True
+                    break
+                if _cancel_flags[slot]:
+                    break  # Nobody is waiting for the result
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return {
+            'value': pickle.dumps(machine.result if error is None and not timed_out else None),
+            'output': machine.output.getvalue(),
+            'steps': machine.steps,
+            'step_limit_exceeded': machine.step_limit_exceeded,
+            'timed_out': timed_out,
+            'error': error,
+        }
+
+
+class AsyncEvaluator:
+    """
+    Runs RPAL programs for an event loop.
+
+    Args:
+        max_concurrent: Evaluations allowed to run at once; the rest wait their turn
+        offload: 'thread' or 'process' for programs that outlast inline_steps
+        workers: Size of the thread or process pool
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT, offload='thread', workers=None):
+        if offload not in ('thread', 'process'):
+            raise ValueError(f"offload must be 'thread' or 'process', not {offload!r}")
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.offload = offload
+        self.workers = workers
+        self.pool = None
+        self.compile_pool = None
+        self.cancel_flags = None   # Process offload: shared flags the workers poll
+        self.free_slots = []
+
+    def _pool(self):
+        if self.pool is None:
+            if self.offload == 'process':
+                # A cancelled run keeps its slot until its worker stops, so there is one per
+                # evaluation that may be waiting plus one per worker that may still be finishing
+                slots = self.max_concurrent + (self.workers or os.cpu_count() or 1)
+                self.cancel_flags = multiprocessing.Array('b', slots, lock=False)
+                self.free_slots = list(range(slots))
+                self.pool = ProcessPoolExecutor(self.workers, initializer=_init_process_worker,
+                                                initargs=(self.cancel_flags,))
+            else:
+                self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix='rpal')
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            if self.cancel_flags is not None:
+                self.cancel_flags[:] = [1] * len(self.cancel_flags)  # Stop runs still in progress
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        if self.compile_pool is not None:
+            self.compile_pool.shutdown(wait=False)
+            self.compile_pool = None
+
+    async def evaluate(self, source, limits=None, lazy=False):
+        """
+        Compile and run RPAL source text.
+
+        Args:
+            source: The RPAL program text
+            limits: A Limits instance (defaults apply when omitted)
+            lazy: Use call-by-need evaluation
+
+        Returns:
+            An EvaluationResult; compile and runtime errors are reported in .error
+
+        Raises:
+            asyncio.CancelledError: If the awaiting task is cancelled
+        """
+        limits = limits or Limits()
+        async with self.semaphore:
+            return await self._evaluate(source, limits, lazy)
+
+    async def _evaluate(self, source, limits, lazy):
+        with SYMBOLS.scope() as scope:
+            report = await self._run(source, limits, lazy)
+            if _holds_symbols(report.value):
+                SYMBOLS.keep(scope)  # The caller may still apply or print it
+        return report
+
+    async def _run(self, source, limits, lazy):
+        report = EvaluationResult()
+        deadline = time.time() + limits.timeout if limits.timeout is not None else None
+        start = time.perf_counter()
+        try:
+            controls = await self._compile(source, lazy)
+        except Exception as e:
+            report.error = f"{type(e).__name__}: {e}"
+            return report
+        report.timings['compile'] = time.perf_counter() - start
+
+        machine = CSEMachineExecutor(controls, max_steps=limits.max_steps, trace=False,
+                                     output=OutputWriter(CaptureSink()), trailing_newline=False, lazy=lazy)
+        start = time.perf_counter()
+        try:
+            finished = await self._run_inline(machine, limits, deadline)
+            if not finished and not self._expired(deadline):
+                report.offloaded = self.offload
+                if self.offload == 'process':
+                    fields = await self._run_in_process(machine, limits, deadline)
+                    fields['value'] = pickle.loads(fields['value'])
+                    self._collect(report, fields)
+                    report.timings['execute'] = time.perf_counter() - start
+                    return report
+                finished = await self._run_in_thread(machine, limits, deadline)
+            report.timed_out = not finished
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # Report evaluation failures instead of raising into the caller
+            report.error = f"{type(e).__name__}: {e}"
+        report.timings['execute'] = time.perf_counter() - start
+        self._collect(report, {
+            'value': machine.result if report.error is None and not report.timed_out else None,
+            'output': machine.output.getvalue(),
+            'steps': machine.steps,
+            'step_limit_exceeded': machine.step_limit_exceeded,
+            'timed_out': report.timed_out,
+            'error': report.error,
+        })
+        return report
+
+    async def _compile(self, source, lazy):
+        """Compile inline, or on a worker thread when the source is long enough to stall the loop."""
+        if len(source) <= COMPILE_INLINE_CHARS:
+            return compile_source(source, lazy=lazy)
+        if self.compile_pool is None:
+            self.compile_pool = ThreadPoolExecutor(1, thread_name_prefix='rpal-compile')
+        loop = asyncio.get_running_loop()
+        # In a copy of this task's context, so the names join the evaluation's symbol scope
+        return await loop.run_in_executor(self.compile_pool, contextvars.copy_context().run,
+                                          lambda: compile_source(source, lazy=lazy))
+
+    @staticmethod
+    def _expired(deadline):
+        return deadline is not None and time.time() > deadline
+
+    async def _run_inline(self, machine, limits, deadline):
+        """Slices on the loop's thread; False when the program should move to a worker (or timed out)."""
+        while not machine.step(limits.slice_steps):
+            if self._expired(deadline):
+                return False
+            if limits.inline_steps is not None and machine.steps >= limits.inline_steps:
+                return False
+            await asyncio.sleep(0)
+        return True
+
+    async def _run_in_thread(self, machine, limits, deadline):
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        # One slice per executor call, so cancellation and timeouts are noticed between slices.
+        # Each runs in a copy of this task's context, so names it interns join the evaluation's symbol scope
+        while not await loop.run_in_executor(pool, contextvars.copy_context().run, machine.step,
+                                             limits.worker_slice_steps):
+            if self._expired(deadline):
+                return False
+        return True
+
+    async def _run_in_process(self, machine, limits, deadline):
+        # The paused machine is pickled to the worker, which stops on its own at the deadline,
+        # or after the slice in progress once this evaluation is cancelled
+        pool = self._pool()
+        slot = self.free_slots.pop()
+        self.cancel_flags[slot] = 0
+        future = pool.submit(_finish_machine, pickle.dumps(machine), deadline, limits.worker_slice_steps, slot)
+        future.add_done_callback(lambda _: self.free_slots.append(slot))  # Once the worker has let go of it
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self.cancel_flags[slot] = 1
+            raise
+
+    @staticmethod
+    def _collect(report, fields):
+        report.value = fields['value']
+        report.result = format_value(fields['value']) if fields['value'] is not None else None
+        report.output = fields['output']
+        report.steps = fields['steps']
+        report.step_limit_exceeded = fields['step_limit_exceeded']
+        report.timed_out = fields['timed_out']
+        report.error = fields['error']
+        if report.timed_out and report.error is None:
+            report.error = "TimeoutError: time limit exceeded"
+
+
+_default_evaluator = None
+
+
+async def evaluate(source, limits=None, lazy=False):
+    """
+    Evaluate source with a shared AsyncEvaluator (thread offload,
+    MAX_CONCURRENT evaluations at once). See AsyncEvaluator.evaluate.
+    """
+    global _default_evaluator
+    if _default_evaluator is None:
+        _default_evaluator = AsyncEvaluator()
+    return await _default_evaluator.evaluate(source, limits, lazy)
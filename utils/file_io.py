@@ -1,10 +1,196 @@
-'''Utils.py consists of utility functions for the RPAL interpreter.'''
+'''Utils.py consists of utility functions for the RPAL interpreter.
+
+Source input comes in three forms, all tokenized without keeping a second
+copy of the program text around:
+
+    FileSource('prog.rpal')    # mmap'd file, lexed as bytes
+    StreamSource(sys.stdin)    # text read and lexed in chunks (pipes, stdin)
+    TextSource('Print 1')      # an in-memory string
+
+open_source(path) picks the right one ('-' means stdin). Problems are raised
+as SourceError subclasses rather than exiting the process, including text
+that is not valid UTF-8 (SourceDecodeError, with the offending byte's offset).
+'''
+
+import codecs
+import mmap
+import os
+import sys
+
+from Lexer.lexer import tokenize, tokenize_stream
+
+CHUNK_SIZE = 1 << 20  # Characters per read when streaming
+
+
+class SourceError(Exception):
+    """Raised when RPAL source cannot be read."""
+
+
+class SourceNotFoundError(SourceError, FileNotFoundError):
+    def __init__(self, path):
+        super().__init__(f"File '{path}' not found.")
+        self.path = path
+
+
+class SourceDecodeError(SourceError):
+    def __init__(self, name, offset=None):
+        at = f" (byte {offset})" if offset is not None else ""
+        super().__init__(f"'{name}' is not valid UTF-8{at}.")
+        self.name = name
+        self.offset = offset  # Of the first byte that could not be decoded; None when a text stream decoded it
+
+
+class TextSource:
+    """Source held in memory as a string."""
+
+    def __init__(self, text, name='<string>'):
+        self.text = text
+        self.name = name
+        self.size = len(text)
+
+    def tokens(self):
+        return tokenize(self.text)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FileSource(TextSource):
+    """
+    A source file, memory-mapped so the lexer runs its regex over the file's
+    bytes directly. Empty files and files that cannot be mapped (pipes,
+    character devices) are streamed instead.
+    """
+
+    def __init__(self, path, use_mmap=True):
+        self.name = path
+        self.text = None
+        try:
+            self.file = open(path, 'rb')
+        except FileNotFoundError:
+            raise SourceNotFoundError(path) from None
+        except OSError as e:
+            raise SourceError(f"Cannot read '{path}': {e.strerror}") from None
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = None
+        if use_mmap and self.size > 0:
+            try:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                self.map = None  # Not mappable; tokens() falls back to streaming
+
+    def tokens(self):
+        if self.map is not None:
+            self.check_utf8()
+            try:
+                return tokenize(self.map)
+            except UnicodeDecodeError as e:
+                raise SourceDecodeError(self.name, e.start) from None
+        stream = StreamSource(self.file, self.name)
+        tokens = stream.tokens()
+        self.size = stream.size
+        return tokens
+
+    def check_utf8(self):
+        """
+        Raise SourceDecodeError unless the whole mapped file is UTF-8. The lexer
+        only decodes tokens, and a streamed file is rejected for a bad byte
+        anywhere, even in a comment; the check decodes a chunk at a time and
+        keeps nothing.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        size = len(self.map)
+        for start in range(0, size, CHUNK_SIZE):
+            offset = start - len(decoder.getstate()[0])
+            try:
+                decoder.decode(self.map[start:start + CHUNK_SIZE], final=start + CHUNK_SIZE >= size)
+            except UnicodeDecodeError as e:
+                raise SourceDecodeError(self.name, offset + e.start) from None
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+class StreamSource(TextSource):
+    """Source read from a file object in chunks, e.g. stdin or a pipe."""
+
+    def __init__(self, stream, name='<stdin>', chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.name = name
+        self.chunk_size = chunk_size
+        self.text = None
+        self.size = 0  # Known once the stream has been consumed
+
+    def chunks(self):
+        decoder = codecs.getincrementaldecoder('utf-8')()  # Binary streams may split a character
+        consumed = 0  # Bytes read so far
+        while True:
+            try:
+                chunk = self.stream.read(self.chunk_size)
+            except OSError as e:
+                raise SourceError(f"Cannot read '{self.name}': {e.strerror}") from None
+            except UnicodeDecodeError:
+                raise SourceDecodeError(self.name) from None  # A text stream, decoding as it reads
+            end = not chunk
+            if isinstance(chunk, bytes):
+                # Positions in a decode error count from the bytes the decoder held back
+                start = consumed - len(decoder.getstate()[0])
+                consumed += len(chunk)
+                try:
+                    chunk = decoder.decode(chunk, final=end)  # Raises on a truncated character at the end
+                except UnicodeDecodeError as e:
+                    raise SourceDecodeError(self.name, start + e.start) from None
+            if chunk:
+                self.size += len(chunk)
+                yield chunk
+            if end:
+                return
+
+    def tokens(self):
+        return tokenize_stream(self.chunks())
+
+    def close(self):
+        pass  # The caller owns the stream
+
+
+def open_source(path: str, use_mmap=True):
+    """
+    Open RPAL source for tokenizing.
+
+    Args:
+        path: A file path, or '-' for standard input
+        use_mmap: Memory-map regular files (otherwise they are streamed)
+
+    Returns:
+        A FileSource or StreamSource; use it as a context manager
+
+    Raises:
+        SourceNotFoundError: If the file does not exist
+        SourceError: If it cannot be read (SourceDecodeError, from tokens(), if it is not valid UTF-8)
+    """
+    if path == '-':
+        return StreamSource(getattr(sys.stdin, 'buffer', sys.stdin))  # Bytes, so errors have an offset
+    return FileSource(path, use_mmap=use_mmap)
+
 
 def read_source_file(file_path: str) -> str:
-    """Reads the RPAL source code from a file and returns it as a string."""
+    """
+    Reads the RPAL source code from a file and returns it as a string.
+
+    Raises:
+        SourceNotFoundError: If the file does not exist
+    """
     try:
         with open(file_path, 'r') as file:
             return file.read()
     except FileNotFoundError:
-        print(f"Error: File '{file_path}' not found.")
-        exit(1)
+        raise SourceNotFoundError(file_path) from None
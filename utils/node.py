@@ -1,8 +1,104 @@
+class NodeKind:
+    """
+    Integer node kinds. A plain namespace rather than an Enum: kind checks sit
+    on the hot path of every tree pass, and Enum member lookup is several
+    times slower than reading a class attribute.
+    """
+    # Leaves that carry a value
+    ID = 1
+    INT = 2
+    STR = 3
+    # Constant leaves
+    TRUE = 4
+    FALSE = 5
+    NIL = 6
+    DUMMY = 7
+    YSTAR = 8
+    EMPTY = 9           # '()' in a binding
+    # Expressions
+    LET = 10
+    LAMBDA = 11
+    WHERE = 12
+    TAU = 13
+    AUG = 14
+    COND = 15           # '->'
+    OR = 16
+    AMP = 17
+    NOT = 18
+    GR = 19
+    GE = 20
+    LS = 21
+    LE = 22
+    EQ = 23
+    NE = 24
+    PLUS = 25
+    MINUS = 26
+    NEG = 27
+    TIMES = 28
+    DIVIDE = 29
+    POWER = 30
+    AT = 31
+    GAMMA = 32
+    # Definitions
+    WITHIN = 33
+    AND = 34
+    REC = 35
+    FUNCTION_FORM = 36
+    BIND = 37           # '='
+    COMMA = 38
+
+
+# How each kind is printed by -ast/-st (and named in control structures)
+LABELS = {
+    NodeKind.ID: 'ID', NodeKind.INT: 'INT', NodeKind.STR: 'STR',
+    NodeKind.TRUE: 'true', NodeKind.FALSE: 'false', NodeKind.NIL: '<nil>',
+    NodeKind.DUMMY: 'dummy', NodeKind.YSTAR: '<Y*>', NodeKind.EMPTY: '()',
+    NodeKind.LET: 'let', NodeKind.LAMBDA: 'lambda', NodeKind.WHERE: 'where',
+    NodeKind.TAU: 'tau', NodeKind.AUG: 'aug', NodeKind.COND: '->',
+    NodeKind.OR: 'or', NodeKind.AMP: '&', NodeKind.NOT: 'not',
+    NodeKind.GR: 'gr', NodeKind.GE: 'ge', NodeKind.LS: 'ls', NodeKind.LE: 'le',
+    NodeKind.EQ: 'eq', NodeKind.NE: 'ne',
+    NodeKind.PLUS: '+', NodeKind.MINUS: '-', NodeKind.NEG: 'neg',
+    NodeKind.TIMES: '*', NodeKind.DIVIDE: '/', NodeKind.POWER: '**',
+    NodeKind.AT: '@', NodeKind.GAMMA: 'gamma',
+    NodeKind.WITHIN: 'within', NodeKind.AND: 'and', NodeKind.REC: 'rec',
+    NodeKind.FUNCTION_FORM: 'function_form', NodeKind.BIND: '=', NodeKind.COMMA: ',',
+}
+KINDS_BY_LABEL = {label: kind for kind, label in LABELS.items() if kind > NodeKind.STR}
+
+VALUE_KINDS = (NodeKind.ID, NodeKind.INT, NodeKind.STR)
+
+
+def node_label(kind, value):
+    """The node as -ast/-st print it, e.g. 'gamma', '<ID:x>', "<STR:'a'>"."""
+    if kind == NodeKind.ID or kind == NodeKind.INT:
+        return f"<{LABELS[kind]}:{value}>"
+    if kind == NodeKind.STR:
+        return f"<STR:'{value}'>"
+    return LABELS[kind]
+
+
 class ASTNode:
-    def __init__(self, label, children=None):
-        self.label = label
+    """
+    A node of the AST or standardized tree, shared by every stage.
+
+    kind is a NodeKind. Leaves of kind ID, INT and STR also carry a value: the
+    identifier name, the integer (already converted) or the text between the
+    quotes of a string literal, exactly as written. pos is the source offset
+    of the token a leaf came from, or None.
+    """
+    __slots__ = ('kind', 'value', 'children', 'pos')
+
+    def __init__(self, kind, children=None, value=None, pos=None):
+        self.kind = kind
+        self.value = value
         self.children = children or []
-    
+        self.pos = pos
+
+    @property
+    def label(self):
+        return node_label(self.kind, self.value)
+
     def __repr__(self):
         return f"<{self.label}>"
 
@@ -11,23 +107,22 @@ class ASTNode:
         for child in self.children:
             child.print_ast(level + 1)
 
-def deep_copy_ast(node):
+def count_nodes(node):
     """
-    Create a deep copy of an AST node and all its children.
-    
+    Count the nodes in a tree without recursing, so very deep trees are safe.
+
     Args:
-        node: The root node of the AST to copy
-        
+        node: The root node of the tree
+
     Returns:
-        A new AST with the same structure as the original
+        The number of nodes reachable from the root
     """
     if node is None:
-        return None
-        
-    # Create a new node with the same label
-    new_node = ASTNode(node.label)
-    
-    # Recursively copy all children
-    new_node.children = [deep_copy_ast(child) for child in node.children]
-    
-    return new_node
\ No newline at end of file
+        return 0
+    count = 0
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        count += 1
+        pending.extend(current.children)
+    return count
@@ -0,0 +1,102 @@
+'''Per-phase wall/CPU time and tracemalloc peak memory for the --profile flag.'''
+
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+REPORT_FORMATS = ('text', 'json')
+
+
+class PhaseProfiler:
+    """
+    Collects timings and memory for named pipeline phases plus size counters.
+
+    Usage:
+        profiler = PhaseProfiler()
+        with profiler.phase('lex'):
+            tokens = tokenize(source)
+        profiler.count('tokens', len(tokens))
+        profiler.report()
+    """
+
+    def __init__(self):
+        self.phases = []
+        self.counters = {}
+        self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()  # Python 3.9+
+        base, _ = tracemalloc.get_traced_memory()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            current, peak = tracemalloc.get_traced_memory()
+            self.phases.append({
+                'phase': name,
+                'wall_ms': wall * 1000,
+                'cpu_ms': cpu * 1000,
+                'peak_kib': max(peak - base, 0) / 1024,
+                'retained_kib': (current - base) / 1024,
+            })
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def as_dict(self):
+        return {'phases': self.phases, 'sizes': self.counters}
+
+    def report(self, fmt='text', stream=None):
+        """
+        Write the profile as a text table or JSON (default stream: stderr).
+
+        Raises:
+            ValueError: If fmt is not one of REPORT_FORMATS
+        """
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown profile format: {fmt} (expected {' or '.join(REPORT_FORMATS)})")
+        stream = stream or sys.stderr
+        if fmt == 'json':
+            json.dump(self.as_dict(), stream, indent=2)
+            stream.write('\n')
+            return
+
+        stream.write("\nProfile:\n")
+        stream.write(f"  {'phase':<14}{'wall ms':>12}{'cpu ms':>12}{'peak KiB':>12}{'kept KiB':>12}\n")
+        for p in self.phases:
+            stream.write(f"  {p['phase']:<14}{p['wall_ms']:>12.3f}{p['cpu_ms']:>12.3f}"
+                         f"{p['peak_kib']:>12.1f}{p['retained_kib']:>12.1f}\n")
+        total_wall = sum(p['wall_ms'] for p in self.phases)
+        total_cpu = sum(p['cpu_ms'] for p in self.phases)
+        stream.write(f"  {'total':<14}{total_wall:>12.3f}{total_cpu:>12.3f}\n")
+        stream.write("\nSizes:\n")
+        for name, value in self.counters.items():
+            stream.write(f"  {name:<26}{value:>12}\n")
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; every call is a no-op."""
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def count(self, name, value):
+        pass
+
+    def stop(self):
+        pass
@@ -0,0 +1,93 @@
+'''Pipeline helpers for running RPAL source text end to end without the CLI.'''
+
+import time
+
+from Lexer.lexer import tokenize
+from Parser.parser import Parser
+from Standardizer.standardizer import standardize
+from flattener.flat import OptimizedFlattener
+from flattener.peephole import fuse_superinstructions
+from CSE_Machine.cse_machine import CSEMachineExecutor
+from CSE_Machine.stdlib import STDLIB
+from CSE_Machine.int_tuple import TUPLE_TYPES
+from CSE_Machine.output import OutputWriter, CaptureSink
+from utils.symbols import SYMBOLS
+
+
+def compile_source(source_code: str, lazy=False, fuse=True) -> dict:
+    """
+    Compile RPAL source text into optimized control structures.
+
+    Args:
+        source_code: The RPAL program text
+        lazy: Compile for call-by-need evaluation (run with lazy=True too)
+        fuse: Fuse common instruction sequences into superinstructions
+
+    Returns:
+        The control structures produced by OptimizedFlattener (after the peephole pass)
+    """
+    tokens = tokenize(source_code)
+    ast = Parser(tokens).parse()
+    standardized_tree = standardize(ast)
+    controls = OptimizedFlattener(lazy=lazy).flatten(standardized_tree)
+    return fuse_superinstructions(controls) if fuse else controls
+
+
+def format_value(value) -> str:
+    """Format a CSE machine value the way Print shows it."""
+    if isinstance(value, TUPLE_TYPES):
+        if not value:
+            return 'nil'
+        return '(' + ', '.join(format_value(item) for item in value) + ')'
+    return str(value)
+
+
+def evaluate_source(source_code: str, max_steps=None, lazy=False, stdlib=False) -> dict:
+    """
+    Compile and run RPAL source text, capturing everything it prints.
+
+    Args:
+        source_code: The RPAL program text
+        max_steps: Optional CSE step budget (defaults to the machine's own limit)
+        lazy: Use call-by-need evaluation
+        stdlib: Make the native standard library available (see CSE_Machine/stdlib.py)
+
+    Returns:
+        A dict with 'output', 'result', 'steps', 'step_limit_exceeded', 'error'
+        and 'timings' (seconds spent compiling and executing)
+    """
+    # The report holds only text, so the program's names can leave the symbol table with it
+    with SYMBOLS.scope():
+        return _evaluate_source(source_code, max_steps, lazy, stdlib)
+
+
+def _evaluate_source(source_code, max_steps, lazy, stdlib):
+    output = OutputWriter(CaptureSink())
+    report = {
+        'output': '',
+        'result': None,
+        'steps': 0,
+        'step_limit_exceeded': False,
+        'error': None,
+        'timings': {'compile': 0.0, 'execute': 0.0},
+    }
+    cse = None
+    try:
+        start = time.perf_counter()
+        controls = compile_source(source_code, lazy=lazy)
+        report['timings']['compile'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cse = CSEMachineExecutor(controls, max_steps=max_steps, trace=False,
+                                 output=output, trailing_newline=False, lazy=lazy,
+                                 builtins=STDLIB if stdlib else None)
+        result = cse.run()
+        report['timings']['execute'] = time.perf_counter() - start
+        report['result'] = format_value(result) if result is not None else None
+    except Exception as e:  # Report any evaluation failure instead of crashing the caller
+        report['error'] = f"{type(e).__name__}: {e}"
+    if cse is not None:
+        report['steps'] = cse.steps
+        report['step_limit_exceeded'] = cse.step_limit_exceeded
+    report['output'] = output.getvalue()
+    return report
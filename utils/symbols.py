@@ -0,0 +1,124 @@
+'''
+Symbol table that interns identifiers to small integer ids.
+
+The lexer interns every identifier it reads, so each name gets an id (in
+order of first appearance) and every occurrence shares one string object.
+The tree keeps the names, so -ast and -st print as before. OptimizedFlattener
+emits variable references, λ/ρ headers and θ references as instructions that
+carry the ids and still equal their text (flattener/instructions.py), so
+-optflat does too. The CSE machine decodes plain-string controls to the same
+instructions once per program, and environments bind ids, so lookups while
+a program runs never hash or compare strings.
+
+The table is shared by the whole process, since environments, closures and
+control structures outlive any one compilation (the REPL, parallel tuples).
+Ids are only meaningful within a process: anything that holds them pickles
+the names instead and interns them again when it is loaded. symbol_name is
+the reverse map for traces and error messages.
+
+A host that runs many unrelated programs (the server workers, the asyncio
+API) would otherwise grow the table with every name any program ever used,
+so it runs each program inside SYMBOLS.scope(). A scope records the ids
+interned while it is active (in the same thread or asyncio task), and when
+it closes, the names no other open scope holds are dropped. Ids are never
+reused, so a dropped id cannot come back meaning another name. A name
+interned outside any scope is kept for good, since whoever asked for it may
+hold the id indefinitely; so is every name of a scope passed to keep(),
+for when a value that refers to them outlives the run.
+'''
+
+import contextlib
+import contextvars
+import sys
+import threading
+
+
+class SymbolScope:
+    """The ids interned during one SymbolTable.scope() block."""
+    __slots__ = ('symbols',)
+
+    def __init__(self):
+        self.symbols = set()
+
+
+class SymbolTable:
+    def __init__(self):
+        self.ids = {}     # Name -> id
+        self.names = {}   # Id -> name
+        self.next_id = 0
+        self.holders = {}  # Id -> open scopes that interned it; names outside any scope are absent (kept)
+        self.lock = threading.Lock()  # Machines may compile on several threads (utils/async_pipeline.py)
+        self.current = contextvars.ContextVar('symbol_scope', default=None)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def intern(self, name):
+        """Id of name, adding it to the table if needed."""
+        symbol = self.ids.get(name)
+        scope = self.current.get()
+        if symbol is not None and (symbol in scope.symbols if scope is not None else symbol not in self.holders):
+            return symbol
+        with self.lock:
+            symbol = self.ids.get(name)  # A closing scope may have dropped it meanwhile
+            if symbol is None:
+                symbol = self.next_id
+                self.next_id += 1
+                name = sys.intern(str(name))  # Also for str subclasses such as Variable
+                self.names[symbol] = name
+                self.ids[name] = symbol
+                if scope is not None:
+                    self.holders[symbol] = 0
+            if scope is None:
+                self.holders.pop(symbol, None)
+            elif symbol not in scope.symbols:
+                scope.symbols.add(symbol)
+                if symbol in self.holders:
+                    self.holders[symbol] += 1
+        return symbol
+
+    def name(self, symbol):
+        """The identifier an id stands for."""
+        return self.names[symbol]
+
+    @contextlib.contextmanager
+    def scope(self):
+        """
+        Run a program inside this block to drop its names from the table
+        afterwards. Nothing that holds one of its ids may be used after the
+        block ends, unless keep() was called.
+        """
+        scope = SymbolScope()
+        token = self.current.set(scope)
+        try:
+            yield scope
+        finally:
+            self.current.reset(token)
+            self.release(scope)
+
+    def keep(self, scope):
+        """Keep every name scope interned, as if it had been interned outside any scope."""
+        with self.lock:
+            for symbol in scope.symbols:
+                self.holders.pop(symbol, None)
+
+    def release(self, scope):
+        with self.lock:
+            for symbol in scope.symbols:
+                count = self.holders.get(symbol)
+                if count is None:
+                    continue
+                if count > 1:
+                    self.holders[symbol] = count - 1
+                else:
+                    del self.holders[symbol]
+                    del self.ids[self.names.pop(symbol)]
+            scope.symbols.clear()
+
+
+SYMBOLS = SymbolTable()
+intern = SYMBOLS.intern
+symbol_name = SYMBOLS.name
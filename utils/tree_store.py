@@ -0,0 +1,176 @@
+'''
+Array-backed (struct-of-arrays) storage for very large ASTs and standardized trees.
+
+Every node is an integer index into parallel arrays instead of an object:
+
+    kinds[i]         NodeKind code
+    values[i]        index into the constant pool (identifier names, ints,
+                     string literal bodies), or -1
+    child_start[i]   where the node's children start in child_list
+    child_count[i]   how many children it has
+    positions[i]     source offset, or -1
+
+child_list holds the child indices of every node, each node's as one run.
+A node's children are fixed when it is added and a child does not record
+its parent or siblings, so any number of nodes can share a subtree. The
+standardized tree shares every subtree standardization leaves unchanged
+with the AST, and one operator leaf per kind, the way standardize() does
+with objects. (First-child/next-sibling links would tie each row to a
+single parent and force a copy of every leaf the trees have in common.)
+
+The parser can build straight into a store (Parser(tokens, store=...)),
+standardize_store rewrites it without recursion, and
+OptimizedFlattener.flatten_store reads the arrays directly. StoredNode gives
+any index the ASTNode interface (kind, value, children, label, print_ast),
+so the -ast/-st printers and STFlattener work on it unchanged.
+'''
+
+from array import array
+
+from utils.node import ASTNode, node_label
+
+
+class TreeStore:
+    def __init__(self):
+        self.kinds = array('B')
+        self.values = array('i')
+        self.child_start = array('i')
+        self.child_count = array('i')
+        self.child_list = array('i')
+        self.positions = array('q')
+        self.constants = []          # Interned constant pool
+        self.constant_ids = {}       # Names and string bodies -> pool index
+        self.int_ids = {}            # Integers -> pool index, kept apart from '1'
+        self.leaves = {}             # Kind -> shared valueless leaf (operators, ->, Y*)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def intern(self, value):
+        """Index of value in the constant pool, adding it if needed."""
+        ids = self.int_ids if type(value) is int else self.constant_ids
+        index = ids.get(value)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            ids[value] = index
+        return index
+
+    def add(self, kind, children=None, value=None, pos=None):
+        """
+        Append a node; children are node indices, which may already belong
+        to other nodes. Same signature as ASTNode, so it can stand in for it
+        in the parser.
+
+        Returns:
+            The index of the new node
+        """
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.values.append(-1 if value is None else self.intern(value))
+        self.positions.append(-1 if pos is None else pos)
+        self.child_start.append(len(self.child_list))
+        if children:
+            self.child_count.append(len(children))
+            self.child_list.extend(children)
+        else:
+            self.child_count.append(0)
+        return index
+
+    def leaf(self, kind):
+        """The shared leaf of a kind without a value or position, e.g. an operator."""
+        index = self.leaves.get(kind)
+        if index is None:
+            index = self.leaves[kind] = self.add(kind)
+        return index
+
+    def value(self, index):
+        value_id = self.values[index]
+        return None if value_id < 0 else self.constants[value_id]
+
+    def pos(self, index):
+        pos = self.positions[index]
+        return None if pos < 0 else pos
+
+    def children(self, index):
+        """Child indices of a node, in order (an array slice)."""
+        start = self.child_start[index]
+        return self.child_list[start:start + self.child_count[index]]
+
+    def node(self, index):
+        return StoredNode(self, index)
+
+    def from_ast(self, root):
+        """Copy an ASTNode tree into the store; returns the root index."""
+        # Children are added before their parent, so walk in reverse pre-order
+        order = []
+        pending = [root]
+        while pending:
+            current = pending.pop()
+            order.append(current)
+            pending.extend(current.children)
+        indices = {}
+        for current in reversed(order):
+            if id(current) not in indices:  # Subtrees shared in the object tree stay shared
+                indices[id(current)] = self.add(current.kind, [indices[id(c)] for c in current.children],
+                                                current.value, current.pos)
+        return indices[id(root)]
+
+    def to_ast(self, index):
+        """Build an ASTNode tree from a stored subtree."""
+        root = ASTNode(self.kinds[index], value=self.value(index), pos=self.pos(index))
+        pending = [(index, root)]
+        while pending:
+            current, node = pending.pop()
+            for child in self.children(current):
+                child_node = ASTNode(self.kinds[child], value=self.value(child), pos=self.pos(child))
+                node.children.append(child_node)
+                pending.append((child, child_node))
+        return root
+
+    def nbytes(self):
+        """Memory used by the arrays (excluding the constant pool)."""
+        return sum(a.itemsize * len(a) for a in (self.kinds, self.values, self.child_start,
+                                                 self.child_count, self.child_list, self.positions))
+
+
+class StoredNode:
+    """A node of a TreeStore seen through the ASTNode interface."""
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def kind(self):
+        return self.store.kinds[self.index]
+
+    @property
+    def value(self):
+        return self.store.value(self.index)
+
+    @property
+    def pos(self):
+        return self.store.pos(self.index)
+
+    @property
+    def children(self):
+        store = self.store
+        return [StoredNode(store, child) for child in store.children(self.index)]
+
+    @property
+    def label(self):
+        return node_label(self.kind, self.value)
+
+    def __repr__(self):
+        return f"<{self.label}>"
+
+    def print_ast(self, level=0):
+        # Iterative, so deep stored trees print without hitting the recursion limit
+        store = self.store
+        pending = [(self.index, level)]
+        while pending:
+            index, depth = pending.pop()
+            print('.' * depth + StoredNode(store, index).label)
+            pending.extend((child, depth + 1) for child in reversed(store.children(index)))